@@ -0,0 +1,207 @@
+import collections
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from backends import load_backend
+
+
+class RunningMoments:
+    # Count, mean and variance merged batch by batch (Chan et al.), so the mean + k * std
+    # threshold never needs the history again
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if len(values) == 0:
+            return self
+        n, mean = len(values), values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self._m2 += m2 + delta ** 2 * self.count * n / total
+        self.count = total
+        return self
+
+    @property
+    def std(self):
+        # Population std, as np.std in the notebook's find_threshold
+        return math.sqrt(self._m2 / self.count) if self.count else float('nan')
+
+
+class QuantileSketch:
+    # Streaming quantiles of non-negative values with bounded relative error: values fall into
+    # logarithmic buckets (x within a factor gamma of its bucket), so memory grows with the
+    # log of the value range, not the number of values, and updates are one bincount
+    def __init__(self, relative_accuracy=0.01, min_value=1e-12):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.count = 0
+        self._zeros = 0
+        self._offset = 0
+        self._counts = np.zeros(0, dtype=np.int64)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        small = values < self.min_value
+        self._zeros += int(small.sum())
+        self.count += len(values)
+        values = values[~small]
+        if len(values) == 0:
+            return self
+        index = np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+        lo, hi = index.min(), index.max()
+        if len(self._counts) == 0:
+            self._offset, self._counts = lo, np.zeros(hi - lo + 1, dtype=np.int64)
+        elif lo < self._offset or hi >= self._offset + len(self._counts):
+            new_lo = min(lo, self._offset)
+            grown = np.zeros(max(hi, self._offset + len(self._counts) - 1) - new_lo + 1, dtype=np.int64)
+            grown[self._offset - new_lo:self._offset - new_lo + len(self._counts)] = self._counts
+            self._offset, self._counts = new_lo, grown
+        self._counts += np.bincount(index - self._offset, minlength=len(self._counts))
+        return self
+
+    def quantile(self, q):
+        if self.count == 0:
+            return float('nan')
+        rank = q * (self.count - 1)
+        if rank < self._zeros:
+            return 0.0
+        bucket = int(np.searchsorted(np.cumsum(self._counts), rank - self._zeros, side='right'))
+        return 2 * self.gamma ** (bucket + self._offset) / (self.gamma + 1)
+
+
+def keras_error_fn(model, n_features):
+    # Reconstruction error per window from one compiled graph call, with the notebook's
+    # argument order msle(reconstruction, input); the batch dimension is left open so
+    # micro-batches of any size reuse the same trace
+    tf = load_backend('tensorflow')
+
+    @tf.function(input_signature=[tf.TensorSpec([None, n_features], tf.float32)])
+    def errors(x):
+        return tf.keras.losses.msle(model(x, training=False), x)
+
+    return lambda x: errors(tf.constant(x, dtype=tf.float32)).numpy()
+
+
+class StreamingAnomalyScorer:
+    # Online scoring around a trained autoencoder. Windows are queued and scored in micro-batches
+    # of batch_size, or sooner once the oldest queued window has waited max_latency seconds.
+    # Thresholds come from running statistics: 'meanstd' (mean + k * std, the notebook's method
+    # one) or 'quantile' (the q-quantile, method two). Both are maintained at once, so switching
+    # method or k/q is free. Errors of the last `history` windows are kept, so re-thresholding
+    # the recent past needs no model call. With adapt=True windows scored as normal also update
+    # the statistics; anomalies never do.
+    def __init__(self, model=None, error_fn=None, method='meanstd', k=1.0, q=0.95, batch_size=256,
+                 max_latency=0.05, adapt=False, history=100000, relative_accuracy=0.01):
+        self.model = model
+        self.error_fn = error_fn
+        self.method = method
+        self.k = k
+        self.q = q
+        self.batch_size = batch_size
+        self.max_latency = max_latency
+        self.adapt = adapt
+        self.moments = RunningMoments()
+        self.sketch = QuantileSketch(relative_accuracy)
+        self._queue = collections.deque()
+        self._ids = collections.deque(maxlen=history)
+        self._errors = collections.deque(maxlen=history)
+        self._next_id = 0
+        self.latencies = collections.deque(maxlen=10000)
+
+    def _errors_of(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        if self.error_fn is None:
+            self.error_fn = keras_error_fn(self.model, X.shape[1])
+        return np.asarray(self.error_fn(X), dtype=float)
+
+    @property
+    def threshold(self):
+        if self.method == 'quantile':
+            return self.sketch.quantile(self.q)
+        return self.moments.mean + self.k * self.moments.std
+
+    def fit_baseline(self, X, chunk_size=4096):
+        # Statistics from reference (normal) windows, one model call per chunk
+        for start in range(0, len(X), chunk_size):
+            errors = self._errors_of(X[start:start + chunk_size])
+            self.moments.update(errors)
+            self.sketch.update(errors)
+        return self
+
+    def submit(self, windows, ids=None):
+        # Queue windows (n, n_features); returns whatever became due, possibly an empty frame
+        windows = np.atleast_2d(np.asarray(windows, dtype=np.float32))
+        if ids is None:
+            ids = range(self._next_id, self._next_id + len(windows))
+        self._next_id += len(windows)
+        now = time.perf_counter()
+        for window_id, window in zip(ids, windows):
+            self._queue.append((window_id, window, now))
+        return self.poll()
+
+    def poll(self):
+        # Scores full micro-batches and any batch whose oldest window is older than max_latency
+        batches = []
+        now = time.perf_counter()
+        while self._queue and (len(self._queue) >= self.batch_size or now - self._queue[0][2] >= self.max_latency):
+            batches.append(self._score(self.batch_size))
+        return pd.concat(batches, ignore_index=True) if batches else self._empty()
+
+    def flush(self):
+        batches = []
+        while self._queue:
+            batches.append(self._score(self.batch_size))
+        return pd.concat(batches, ignore_index=True) if batches else self._empty()
+
+    def _score(self, size):
+        items = [self._queue.popleft() for _ in range(min(size, len(self._queue)))]
+        ids = [item[0] for item in items]
+        errors = self._errors_of(np.stack([item[1] for item in items]))
+        threshold = self.threshold
+        anomaly = errors > threshold
+        done = time.perf_counter()
+        latency = np.array([done - item[2] for item in items])
+        self.latencies.extend(latency)
+        self._ids.extend(ids)
+        self._errors.extend(errors)
+        if self.adapt:
+            self.moments.update(errors[~anomaly])
+            self.sketch.update(errors[~anomaly])
+        return pd.DataFrame({'id': ids, 'error': errors, 'threshold': threshold, 'anomaly': anomaly,
+                             'latency_seconds': latency})
+
+    def _empty(self):
+        return pd.DataFrame(columns=['id', 'error', 'threshold', 'anomaly', 'latency_seconds'])
+
+    def stream(self, batches):
+        # Generator over an iterable of window arrays; yields each non-empty result frame
+        for windows in batches:
+            result = self.submit(windows)
+            if len(result):
+                yield result
+        result = self.flush()
+        if len(result):
+            yield result
+
+    def rescore(self, threshold=None):
+        # Cached errors of the recent windows against a new threshold; no model calls
+        threshold = self.threshold if threshold is None else threshold
+        errors = np.fromiter(self._errors, dtype=float, count=len(self._errors))
+        return pd.DataFrame({'id': list(self._ids), 'error': errors, 'anomaly': errors > threshold})
+
+    def latency_report(self):
+        latency = np.fromiter(self.latencies, dtype=float, count=len(self.latencies))
+        if len(latency) == 0:
+            return {}
+        return {'windows': len(latency), 'p50_seconds': float(np.percentile(latency, 50)),
+                'p99_seconds': float(np.percentile(latency, 99)), 'max_seconds': float(latency.max())}
@@ -1,12 +1,16 @@
+import time
+import uuid
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from prophet import Prophet
-from sklearn.metrics import mean_squared_error, mean_absolute_error, mean_squared_log_error, r2_score
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import accuracy_score
 import numpy as np
+from preprocessing import index_by_date, preprocess_data
+from dataset_store import load_dataset
+from forecast_jobs import ForecastJobRunner
+from forecast_server import ForecastClient, ServerError
+from model_pipeline import compact_forecast
+from backends import load_backend
 
 st.set_page_config(
     page_title='Nvidia Stock',
@@ -19,29 +23,25 @@ st.title('Nvidia Stock Price')
 # Sottotitolo
 st.markdown("### Dataset Visualization")
 
-@st.cache_data 
+@st.cache_resource
 def load_data():
-    data = pd.read_csv(r'C:\Users\ALBER\OneDrive\Desktop\streamlit\NVDA.csv')
-    data['Date'] = pd.to_datetime(data['Date'])
-    return data
+    # Memory-mapped columnar copy of NVDA.csv, rebuilt automatically when the CSV changes
+    data = load_dataset('nvda')
+    return index_by_date(data)
 
 
 data = load_data()
 
 # Imposta la data più recente come valore predefinito per il widget date_input
-default_end_date = data['Date'].max()
+default_end_date = data.index[-1]
 
 # Sidebar per selezionare un range di date
 st.sidebar.subheader("Seleziona un range di date")
-start_date = st.sidebar.date_input("Data di inizio", min_value=data['Date'].min(), max_value=default_end_date, value=data['Date'].min())
+start_date = st.sidebar.date_input("Data di inizio", min_value=data.index[0], max_value=default_end_date, value=data.index[0])
 end_date = st.sidebar.date_input("Data di fine", min_value=start_date, max_value=default_end_date, value=default_end_date)
 
-# Converti start_date e end_date in datetime64[ns]
-start_date = pd.to_datetime(start_date)
-end_date = pd.to_datetime(end_date)
-
 # Filtraggio dei dati in base al range di date selezionato
-filtered_data = data[(data['Date'] >= start_date) & (data['Date'] <= end_date)]
+filtered_data = preprocess_data(data, start_date, end_date)
 
 # Mostra i dati del DataFrame
 if st.checkbox("Mostra i dati", False):
@@ -110,10 +110,10 @@ window = st.sidebar.slider("Valore per la media mobile", min_value=2, max_value=
 
 # Calcolo della media mobile e visualizzazione sul grafico a linea
 st.markdown("### Media mobile di Close")
-filtered_data['Close_Moving_Avg'] = filtered_data['Close'].rolling(window=window).mean()
+close_moving_avg = filtered_data['Close'].rolling(window=window).mean()
 fig_avg = go.Figure()
 fig_avg.add_trace(go.Scatter(x=filtered_data['Date'], y=filtered_data['Close'], mode='lines', name='Close'))
-fig_avg.add_trace(go.Scatter(x=filtered_data['Date'], y=filtered_data['Close_Moving_Avg'], mode='lines', name='Moving Average'))
+fig_avg.add_trace(go.Scatter(x=filtered_data['Date'], y=close_moving_avg, mode='lines', name='Moving Average'))
 fig_avg.update_layout(xaxis_rangeslider_visible=False)
 st.plotly_chart(fig_avg)
 
@@ -128,7 +128,6 @@ if growth_selection == 'logistic':
     st.sidebar.info('Configure logistic growth saturation as a percentage of latest Close')
     cap = st.sidebar.slider('Constant carrying capacity', min_value=1.0, max_value=1.5, value=1.2)
     cap_close = cap*data['Close'].iloc[-1]
-    data['cap']=cap_close
 seasonality_selection = st.sidebar.radio(label='Seasonality', options=['additive', 'multiplicative'])
 with st.sidebar.expander('Seasonality components'):
     weekly_selection = st.checkbox('Weekly')
@@ -141,31 +140,74 @@ holiday_country_selection = st.sidebar.selectbox(label="Holiday country", option
 
 
 st.header('Prophet Forecasting')
-# Prophet model fitting
-with st.spinner('Model fitting..'):
-    prophet_df = data.rename(columns={'Date': 'ds', 'Close': 'y'})
-    model = Prophet(
-        seasonality_mode=seasonality_selection,
-        weekly_seasonality=weekly_selection,
-        yearly_seasonality=yearly_selection,
-        growth=growth_selection,
+
+def local_forecast(prophet_df, horizon, growth, seasonality, weekly, monthly, yearly, holiday_country, cap_close):
+    # Prophet model fitting
+    model = load_backend('prophet').Prophet(
+        seasonality_mode=seasonality,
+        weekly_seasonality=weekly,
+        yearly_seasonality=yearly,
+        growth=growth,
         )
-    if holiday_country_selection != 'None':
-        model.add_country_holidays(country_name=holiday_country_selection)      
-    if monthly_selection:
+    if holiday_country != 'None':
+        model.add_country_holidays(country_name=holiday_country)
+    if monthly:
         model.add_seasonality(name='monthly', period=30.5, fourier_order=5)
     model.fit(prophet_df)
 
-# Prophet model forecasting
-with st.spinner('Making predictions..'):
-    future = model.make_future_dataframe(periods=horizon_selection, freq='D')
-    if growth_selection == 'logistic':
+    # Prophet model forecasting
+    future = model.make_future_dataframe(periods=horizon, freq='D')
+    if growth == 'logistic':
         future['cap'] = cap_close
-    forecast = model.predict(future)
-
-# Prophet forecast plot
-fig = px.scatter(prophet_df, x='ds', y='y', labels={'ds': 'Day', 'y': 'Close'})
-fig.add_scatter(x=forecast['ds'], y=forecast['yhat'], name='yhat')
-fig.add_scatter(x=forecast['ds'], y=forecast['yhat_lower'], name='yhat_lower')
-fig.add_scatter(x=forecast['ds'], y=forecast['yhat_upper'], name='yhat_upper')
-st.plotly_chart(fig)
\ No newline at end of file
+    return model.predict(future)
+
+def fit_and_forecast(prophet_df, horizon, growth, seasonality, weekly, monthly, yearly, holiday_country, cap_close):
+    # Il modello vive nel forecast server (python forecast_server.py), condiviso tra sessioni e processi;
+    # se il server non è attivo o risponde con un errore il fitting avviene qui.
+    # In entrambi i casi la previsione è lo stesso dizionario compatto (ds come datetime64)
+    params = {'growth': growth, 'seasonality_mode': seasonality, 'weekly_seasonality': weekly,
+              'monthly_seasonality': monthly, 'yearly_seasonality': yearly, 'holidays': holiday_country}
+    try:
+        forecast = ForecastClient().forecast(horizon, params, data=prophet_df, cap=cap_close)
+    except (OSError, ServerError):
+        forecast = compact_forecast(local_forecast(prophet_df, horizon, growth, seasonality, weekly, monthly,
+                                                   yearly, holiday_country, cap_close))
+        forecast['source'] = 'local'
+
+    # Prophet forecast plot
+    fig = px.scatter(prophet_df, x='ds', y='y', labels={'ds': 'Day', 'y': 'Close'})
+    fig.add_scatter(x=forecast['ds'], y=forecast['yhat'], name='yhat')
+    fig.add_scatter(x=forecast['ds'], y=forecast['yhat_lower'], name='yhat_lower')
+    fig.add_scatter(x=forecast['ds'], y=forecast['yhat_upper'], name='yhat_upper')
+    return forecast, fig
+
+# Il fitting gira in background: impostazioni identiche tra sessioni condividono un solo job
+@st.cache_resource
+def forecast_runner():
+    return ForecastJobRunner(max_workers=2, debounce=0.4)
+
+prophet_df = data[['Date', 'Close']].rename(columns={'Date': 'ds', 'Close': 'y'})
+if growth_selection != 'logistic':
+    cap_close = None
+else:
+    prophet_df['cap'] = cap_close
+job_args = (horizon_selection, growth_selection, seasonality_selection, weekly_selection,
+            monthly_selection, yearly_selection, holiday_country_selection, cap_close)
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
+status, result = forecast_runner().request(st.session_state['session_id'], job_args, fit_and_forecast,
+                                           prophet_df, *job_args)
+
+# Mostra l'ultima previsione valida finché quella nuova non è pronta
+if status == 'failed':
+    st.error(f'Forecast failed: {result}')
+elif result is not None:
+    st.plotly_chart(result[1])
+    if status == 'pending':
+        st.caption('Model fitting..')
+else:
+    st.info('Model fitting..')
+
+if status == 'pending':
+    time.sleep(0.5)
+    st.rerun()
@@ -0,0 +1,274 @@
+import argparse
+import functools
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backends import load_backend
+from dataset_store import load_dataset
+from windowing import window_batches
+
+# Every augmentation takes a batch of sequences (batch, steps, features) and returns a new array of
+# the same shape; random draws are per sequence and all work is vectorized over the batch.
+
+
+def jitter(x, rng, sigma=0.03):
+    # Gaussian noise scaled by each sequence's own std, so sigma does not depend on the units
+    return x + rng.standard_normal(x.shape) * sigma * x.std(axis=1, keepdims=True)
+
+
+def scaling(x, rng, sigma=0.1):
+    return x * rng.normal(1.0, sigma, (x.shape[0], 1, x.shape[2]))
+
+
+@functools.lru_cache(maxsize=32)
+def _spline_basis(steps, knots):
+    # A cubic spline through fixed knot positions is linear in the knot values: this (steps, knots + 2)
+    # matrix maps knot values to the curve at every step
+    from scipy.interpolate import CubicSpline
+
+    return CubicSpline(np.linspace(0, steps - 1, knots + 2), np.eye(knots + 2), axis=0)(np.arange(steps))
+
+
+def _smooth_curves(rng, batch, steps, features, knots, sigma):
+    # Random cubic splines around 1 through knots + 2 evenly spaced points, evaluated at every step
+    values = rng.normal(1.0, sigma, (knots + 2, batch * features))
+    return (_spline_basis(steps, knots) @ values).reshape(steps, batch, features).transpose(1, 0, 2)
+
+
+def magnitude_warp(x, rng, sigma=0.2, knots=4):
+    return x * _smooth_curves(rng, x.shape[0], x.shape[1], x.shape[2], knots, sigma)
+
+
+def _resample(x, positions):
+    # x read at fractional step positions (batch, steps) by linear interpolation, all sequences at once
+    positions = np.clip(positions, 0, x.shape[1] - 1)
+    lo = np.floor(positions).astype(np.int64)
+    hi = np.minimum(lo + 1, x.shape[1] - 1)
+    frac = (positions - lo)[:, :, None]
+    return (np.take_along_axis(x, lo[:, :, None], axis=1) * (1 - frac)
+            + np.take_along_axis(x, hi[:, :, None], axis=1) * frac)
+
+
+def time_warp(x, rng, sigma=0.2, knots=4):
+    # Smoothly varying playback speed; the warped clock is rescaled to start and end with the sequence
+    speed = np.maximum(_smooth_curves(rng, x.shape[0], x.shape[1], 1, knots, sigma)[:, :, 0], 1e-3)
+    clock = np.cumsum(speed, axis=1) - speed[:, :1]
+    return _resample(x, clock * (x.shape[1] - 1) / clock[:, -1:])
+
+
+def window_warp(x, rng, window_ratio=0.1, scales=(0.5, 2.0)):
+    # One random window per sequence is slowed down or sped up by a factor from scales, and the
+    # result is squeezed back to the original length (Le Guennec et al.)
+    batch, steps = x.shape[:2]
+    width = max(int(round(window_ratio * steps)), 1)
+    start = rng.integers(1, max(steps - width - 1, 2), batch)[:, None].astype(float)
+    scale = rng.choice(scales, batch)[:, None]
+    warped_length = steps + width * (scale - 1)
+    u = np.arange(steps)[None, :] * (warped_length - 1) / (steps - 1)
+    positions = np.where(u < start, u, np.where(u < start + width * scale, start + (u - start) / scale,
+                                                u - width * (scale - 1)))
+    return _resample(x, positions)
+
+
+AUGMENTATIONS = {
+    'jitter': jitter,
+    'scaling': scaling,
+    'magnitude_warp': magnitude_warp,
+    'time_warp': time_warp,
+    'window_warp': window_warp,
+}
+
+
+class Augmenter:
+    # Applies each method to a random subset of the batch (each sequence independently with probability p),
+    # in the order given; params holds keyword arguments per method, e.g. {'jitter': {'sigma': 0.05}}
+    def __init__(self, methods=('jitter', 'scaling', 'magnitude_warp', 'window_warp'), p=0.5, params=None, seed=None):
+        unknown = set(methods) - set(AUGMENTATIONS)
+        if unknown:
+            raise ValueError(f'unknown augmentations {sorted(unknown)}; choose from {sorted(AUGMENTATIONS)}')
+        self.methods = methods
+        self.p = p
+        self.params = params or {}
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, x):
+        x = np.array(x, dtype=np.float32)
+        for name in self.methods:
+            chosen = self.rng.random(len(x)) < self.p
+            if chosen.any():
+                x[chosen] = AUGMENTATIONS[name](x[chosen], self.rng, **self.params.get(name, {}))
+        return x
+
+
+def minmax_scale(values):
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    return (values - lo) / (hi - lo if hi > lo else 1.0)
+
+
+def dataset_windows(name='goog', seq_len=24, stride=1):
+    # Training windows (n, seq_len, 1) in [0, 1]: GOOG's Close, or every walmart store's Weekly_Sales,
+    # each series min-max scaled on its own so stores of different size share one shape space
+    if name == 'goog':
+        series = [load_dataset('goog').sort_values('Date')['Close'].to_numpy(dtype=float)]
+    elif name == 'walmart':
+        frame = load_dataset('walmart').sort_values(['Store', 'Date'])
+        series = [group.to_numpy(dtype=float) for _, group in frame.groupby('Store')['Weekly_Sales']]
+    else:
+        raise ValueError("name must be 'goog' or 'walmart'")
+    windows = [sliding_window_view(minmax_scale(values), seq_len)[::stride] for values in series if len(values) >= seq_len]
+    return np.concatenate(windows)[:, :, None].astype(np.float32)
+
+
+class SequenceGAN:
+    # Recurrent GAN over whole windows scaled to [0, 1], after TimeGAN: a GRU generator turns a latent
+    # sequence into a window, a GRU discriminator scores every step, and TimeGAN's moment loss (mean and
+    # std of each step and feature) keeps samples on the data's scale. Training runs one compiled step
+    # per batch; sample() draws batch_size windows per graph call, with no per-sample Python work.
+    # Simplified: no embedding/recovery networks or supervisor, which TimeGAN adds for long sequences.
+    def __init__(self, seq_len, n_features=1, latent_dim=16, hidden=32, layers=2, learning_rate=1e-3,
+                 moment_weight=100.0, seed=0):
+        self.seq_len = seq_len
+        self.n_features = n_features
+        self.latent_dim = latent_dim
+        self.hidden = hidden
+        self.layers = layers
+        self.learning_rate = learning_rate
+        self.moment_weight = moment_weight
+        self.seed = seed
+
+    def _network(self, input_dim, output_dim, activation):
+        tf = load_backend('tensorflow')
+        return tf.keras.Sequential(
+            [tf.keras.Input(shape=(self.seq_len, input_dim))]
+            + [tf.keras.layers.GRU(self.hidden, return_sequences=True) for _ in range(self.layers)]
+            + [tf.keras.layers.Dense(output_dim, activation=activation)])
+
+    def _build(self):
+        tf = load_backend('tensorflow')
+        tf.random.set_seed(self.seed)
+        self.generator_ = self._network(self.latent_dim, self.n_features, 'sigmoid')
+        self.discriminator_ = self._network(self.n_features, 1, None)
+        g_optimizer = tf.keras.optimizers.Adam(self.learning_rate)
+        d_optimizer = tf.keras.optimizers.Adam(self.learning_rate)
+        bce = tf.keras.losses.BinaryCrossentropy(from_logits=True)
+
+        @tf.function
+        def train_step(real):
+            z = tf.random.normal(tf.stack([tf.shape(real)[0], self.seq_len, self.latent_dim]))
+            with tf.GradientTape() as g_tape, tf.GradientTape() as d_tape:
+                fake = self.generator_(z, training=True)
+                real_logits = self.discriminator_(real, training=True)
+                fake_logits = self.discriminator_(fake, training=True)
+                d_loss = bce(tf.ones_like(real_logits), real_logits) + bce(tf.zeros_like(fake_logits), fake_logits)
+                real_mean, real_var = tf.nn.moments(real, axes=[0])
+                fake_mean, fake_var = tf.nn.moments(fake, axes=[0])
+                moments = (tf.reduce_mean(tf.abs(tf.sqrt(fake_var + 1e-6) - tf.sqrt(real_var + 1e-6)))
+                           + tf.reduce_mean(tf.abs(fake_mean - real_mean)))
+                g_loss = bce(tf.ones_like(fake_logits), fake_logits) + self.moment_weight * moments
+            d_vars = self.discriminator_.trainable_variables
+            g_vars = self.generator_.trainable_variables
+            d_optimizer.apply_gradients(zip(d_tape.gradient(d_loss, d_vars), d_vars))
+            g_optimizer.apply_gradients(zip(g_tape.gradient(g_loss, g_vars), g_vars))
+            return d_loss, g_loss
+
+        @tf.function(input_signature=[tf.TensorSpec([], tf.int32)])
+        def generate(n):
+            return self.generator_(tf.random.normal(tf.stack([n, self.seq_len, self.latent_dim])), training=False)
+
+        self._train_step = train_step
+        self._generate = generate
+
+    def fit(self, windows, epochs=100, batch_size=128, verbose=0):
+        # windows: (n, seq_len, n_features) in [0, 1]; history_ keeps the mean losses of every epoch
+        tf = load_backend('tensorflow')
+        self._build()
+        dataset = (tf.data.Dataset.from_tensor_slices(np.asarray(windows, dtype=np.float32))
+                   .shuffle(len(windows), seed=self.seed, reshuffle_each_iteration=True)
+                   .batch(batch_size, drop_remainder=len(windows) >= batch_size)
+                   .prefetch(tf.data.AUTOTUNE))
+        self.history_ = []
+        for epoch in range(epochs):
+            losses = np.array([[float(loss) for loss in self._train_step(batch)] for batch in dataset])
+            self.history_.append({'epoch': epoch + 1, 'd_loss': losses[:, 0].mean(), 'g_loss': losses[:, 1].mean()})
+            if verbose and (epoch + 1) % verbose == 0:
+                print(f"Epoch {epoch + 1}: D loss {self.history_[-1]['d_loss']:.4f}, G loss {self.history_[-1]['g_loss']:.4f}")
+        return self
+
+    def sample(self, n, batch_size=8192):
+        # (n, seq_len, n_features) float32 windows in [0, 1]
+        out = np.empty((n, self.seq_len, self.n_features), dtype=np.float32)
+        for start in range(0, n, batch_size):
+            size = min(batch_size, n - start)
+            out[start:start + size] = self._generate(np.int32(size)).numpy()
+        return out
+
+
+def _join(X, y):
+    # Window plus its targets as one sequence: targets extend feature 0, other features hold their last value
+    targets = np.repeat(X[:, -1:, :], y.shape[1], axis=1)
+    targets[:, :, 0] = y
+    return np.concatenate([X, targets], axis=1)
+
+
+def augmented_batches(X, y, batch_size=32, augmenter=None, generator=None, synthetic_fraction=0.0,
+                      pool_size=8192, seed=None):
+    # Endless (X_batch, y_batch) stream with window_batches' contract (use it with steps_per_epoch).
+    # Real windows come shuffled from window_batches and are augmented together with their targets;
+    # with a generator, synthetic_fraction of every batch is generated windows (window_size +
+    # horizon steps, split into inputs and targets) mapped from [0, 1] onto the range of X. Generated
+    # windows are drawn pool_size at a time; nothing beyond one pool and one batch is ever held.
+    # The generator's shape is checked here, before the stream starts.
+    X = np.asarray(X)
+    window, horizon = X.shape[1], int(np.prod(np.shape(y)[1:]))
+    if generator is not None:
+        if generator.seq_len != window + horizon:
+            raise ValueError(f'generator.seq_len is {generator.seq_len} but windows need window + horizon = '
+                             f'{window} + {horizon} = {window + horizon} steps')
+        if generator.n_features != X.shape[2]:
+            raise ValueError(f'generator.n_features is {generator.n_features} but X has {X.shape[2]} features')
+    return _augmented_batches(X, y, batch_size, augmenter, generator, synthetic_fraction, pool_size, seed)
+
+
+def _augmented_batches(X, y, batch_size, augmenter, generator, synthetic_fraction, pool_size, seed):
+    y_shape = np.shape(y)[1:]
+    window = X.shape[1]
+    n_synthetic = int(round(batch_size * synthetic_fraction)) if generator is not None else 0
+    real = window_batches(X, y, batch_size - n_synthetic, shuffle=True, seed=seed, repeat=True)
+    lo, hi = float(np.nanmin(X)), float(np.nanmax(X))
+    pool, used = None, 0
+    while True:
+        X_batch, y_batch = next(real)
+        y_batch = y_batch.reshape(len(y_batch), -1)
+        if n_synthetic:
+            if pool is None or used + n_synthetic > len(pool):
+                pool, used = generator.sample(max(pool_size, n_synthetic)) * (hi - lo) + lo, 0
+            generated = pool[used:used + n_synthetic]
+            used += n_synthetic
+            X_batch = np.concatenate([X_batch, generated[:, :window]])
+            y_batch = np.concatenate([y_batch, generated[:, window:window + y_batch.shape[1], 0]])
+        if augmenter is not None:
+            sequences = augmenter(_join(X_batch, y_batch))
+            X_batch, y_batch = sequences[:, :window], sequences[:, window:, 0]
+        yield (np.ascontiguousarray(X_batch, dtype=np.float32),
+               np.ascontiguousarray(y_batch.reshape((len(y_batch),) + y_shape), dtype=np.float32))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Train the sequence GAN on GOOG or walmart windows and time sampling.')
+    parser.add_argument('--dataset', choices=['goog', 'walmart'], default='walmart')
+    parser.add_argument('--seq-len', type=int, default=24)
+    parser.add_argument('--epochs', type=int, default=50)
+    parser.add_argument('--samples', type=int, default=100000)
+    args = parser.parse_args()
+
+    windows = dataset_windows(args.dataset, args.seq_len)
+    start = time.perf_counter()
+    gan = SequenceGAN(args.seq_len).fit(windows, epochs=args.epochs, verbose=10)
+    print(f'{len(windows)} windows, {args.epochs} epochs in {time.perf_counter() - start:.1f}s')
+    start = time.perf_counter()
+    samples = gan.sample(args.samples)
+    print(f'{len(samples)} windows sampled in {time.perf_counter() - start:.2f}s')
+    print(f'real mean/std {windows.mean():.3f}/{windows.std():.3f}, '
+          f'synthetic mean/std {samples.mean():.3f}/{samples.std():.3f}')
@@ -0,0 +1,56 @@
+import importlib
+import subprocess
+import sys
+import threading
+import time
+
+# Model backends and the modules each one needs; nothing here is imported until load_backend is called.
+# The first module listed is the one load_backend returns.
+BACKENDS = {
+    'prophet': ['prophet', 'prophet.serialize'],
+    'statsmodels': ['statsmodels.tsa.statespace.sarimax'],
+    'sklearn': ['sklearn.ensemble', 'sklearn.metrics', 'sklearn.model_selection'],
+    'xgboost': ['xgboost'],
+    'tensorflow': ['tensorflow'],
+}
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def load_backend(name):
+    with _lock:
+        if name not in _loaded:
+            start = time.perf_counter()
+            modules = [importlib.import_module(module) for module in BACKENDS[name]]
+            _loaded[name] = {'module': modules[0], 'seconds': time.perf_counter() - start}
+        return _loaded[name]['module']
+
+
+def import_report():
+    # Import cost paid by this process, per backend (None when not loaded yet)
+    with _lock:
+        return [{'backend': name, 'loaded': name in _loaded,
+                 'seconds': _loaded[name]['seconds'] if name in _loaded else None}
+                for name in BACKENDS]
+
+
+def measure_cold_imports(names=None):
+    # Import each backend in a fresh interpreter so shared dependencies are not already warm
+    report = []
+    for name in names or BACKENDS:
+        code = ('import time; start = time.perf_counter()\n'
+                + ''.join(f'import {module}\n' for module in BACKENDS[name])
+                + 'print(time.perf_counter() - start)')
+        proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        if proc.returncode == 0:
+            report.append({'backend': name, 'seconds': float(proc.stdout.strip().splitlines()[-1]), 'error': None})
+        else:
+            report.append({'backend': name, 'seconds': None, 'error': proc.stderr.strip().splitlines()[-1]})
+    return report
+
+
+if __name__ == '__main__':
+    for row in measure_cold_imports(sys.argv[1:] or None):
+        cost = f"{row['seconds']:.2f}s" if row['seconds'] is not None else f"unavailable ({row['error']})"
+        print(f"{row['backend']:<12} {cost}")
@@ -0,0 +1,196 @@
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.pipeline import Pipeline
+from threadpoolctl import threadpool_limits
+
+from recursive_forecast import LagRingBuffer
+from training_scheduler import _single_threaded, _take
+
+def rolling_origins(n, horizon, initial=None, step=None, window=None):
+    # (train, test) index pairs: every origin forecasts the next `horizon` rows. Training is all
+    # rows before the origin (expanding) or only the last `window` of them (sliding).
+    # initial may be a row count or a fraction of n.
+    initial = n // 2 if initial is None else initial
+    if isinstance(initial, float):
+        initial = int(n * initial)
+    step = horizon if step is None else step
+    if initial + horizon > n:
+        raise ValueError(f'{n} rows are too few for initial={initial} and horizon={horizon}')
+    splits = []
+    for origin in range(initial, n - horizon + 1, step):
+        start = 0 if window is None else max(0, origin - window)
+        splits.append((np.arange(start, origin), np.arange(origin, origin + horizon)))
+    return splits
+
+
+def forecast_errors(actual, predicted):
+    # Metrics for every horizon step from (n_origins, horizon) arrays in one pass; MAPE skips
+    # zero actuals. The summary over all origins and steps is in attrs['summary'].
+    actual, predicted = np.asarray(actual, dtype=float), np.asarray(predicted, dtype=float)
+    err = np.abs(predicted - actual)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = np.where(actual != 0, err / np.abs(actual), np.nan) * 100
+        spct = 2 * err / (np.abs(actual) + np.abs(predicted)) * 100
+    cells = {'MAE': err, 'RMSE': err ** 2, 'MAPE': pct, 'sMAPE': spct}
+    by_step = {name: np.nanmean(values, axis=0) for name, values in cells.items()}
+    by_step['RMSE'] = np.sqrt(by_step['RMSE'])
+    errors = pd.DataFrame(by_step, index=pd.RangeIndex(1, actual.shape[1] + 1, name='step'))
+    summary = {name: float(np.nanmean(values)) for name, values in cells.items()}
+    summary['RMSE'] = float(np.sqrt(summary['RMSE']))
+    errors.attrs['summary'] = summary
+    return errors
+
+
+def _final_step(model):
+    return model.steps[-1][1] if isinstance(model, Pipeline) else model
+
+
+def _lag_positions(X, lags):
+    if hasattr(X, 'columns'):
+        return [X.columns.get_loc(name) for name in lags]
+    return [int(j) for j in lags]
+
+
+def _roll_lags(model, rows, positions):
+    # Step k sees the realized exogenous columns of rows[:k + 1] but lag columns rebuilt from the
+    # ring buffer: observed values before the origin, then the model's own predictions. The prefix
+    # is predicted each step, so models whose k-th output depends on earlier rows (state-space
+    # forecasts with exog) roll correctly too.
+    frame = hasattr(rows, 'iloc')
+    rows = rows.copy()
+    values = rows.to_numpy() if frame else rows
+    ring = LagRingBuffer(np.asarray(values[0, positions], dtype=float)[::-1], len(positions))
+    predicted = np.empty(len(rows))
+    for k in range(len(rows)):
+        if frame:
+            # Stored in each lag column's own dtype, as the training features were
+            for j, value in zip(positions, ring.lags()[0]):
+                rows.iloc[k, j] = rows.dtypes.iloc[j].type(value)
+        else:
+            rows[k, positions] = ring.lags()[0]
+        prefix = rows.iloc[:k + 1] if frame else rows[:k + 1]
+        predicted[k] = np.asarray(model.predict(prefix), dtype=float).ravel()[-1]
+        ring.push(predicted[k])
+    return predicted
+
+
+def _roll_window(model, windows):
+    # (steps, window, features) inputs whose feature 0 is the target: each step's window is the
+    # previous one shifted by a step, ending in the last prediction and that step's other features
+    window = np.array(windows[:1], dtype=float)
+    predicted = np.empty(len(windows))
+    for k in range(len(windows)):
+        predicted[k] = np.asarray(model.predict(window), dtype=float).ravel()[0]
+        if k + 1 < len(windows):
+            last = np.array(windows[k + 1][-1:], dtype=float)
+            last[:, 0] = predicted[k]
+            window = np.concatenate([window[:, 1:], last[None]], axis=1)
+    return predicted
+
+
+def _predict_origin(model, X, test, lags):
+    # Forecast of the rows in test from a model fitted on data before them. Without lags, X[test]
+    # is used as given, which is only honest when every column is known in advance.
+    rows = _take(X, test)
+    if lags is None:
+        return np.asarray(model.predict(rows), dtype=float).ravel()
+    if isinstance(lags, str):
+        if lags != 'window':
+            raise ValueError("lags must be None, 'window' or the lag columns (lag_1 first)")
+        return _roll_window(model, rows)
+    return _roll_lags(model, rows, _lag_positions(X, lags))
+
+
+def _refit_origin(model, X, y, train, test, lags=None):
+    wall = time.perf_counter()
+    with threadpool_limits(1):
+        model = _single_threaded(clone(model)).fit(_take(X, train), _take(y, train))
+        predicted = _predict_origin(model, X, test, lags)
+    return predicted, time.perf_counter() - wall
+
+
+def _extend_origins(model, X, y, splits, lags=None):
+    # One fit at the first origin; every later origin extends the fitted state with the rows
+    # observed since the previous origin (e.g. state-space append) instead of refitting
+    wall = time.perf_counter()
+    train, _ = splits[0]
+    model = clone(model).fit(_take(X, train), _take(y, train))
+    final = _final_step(model)
+    predictions, seen = [], train[-1] + 1
+    for train, test in splits:
+        origin = test[0]
+        if origin > seen:
+            new = np.arange(seen, origin)
+            X_new = _take(X, new)
+            if isinstance(model, Pipeline):
+                X_new = model[:-1].transform(X_new)
+            final.update(X_new, _take(y, new))
+            seen = origin
+        predictions.append(_predict_origin(model, X, test, lags))
+    return predictions, time.perf_counter() - wall
+
+
+def backtest(model, X, y, horizon, initial=None, step=None, window=None, n_jobs=None, reuse=True, verbose=0,
+             lags=None):
+    # Rolling-origin evaluation of any estimator (sklearn pipelines, the notebook wrappers, LSTM
+    # windows). With reuse=True and expanding origins, models whose final step has an
+    # update(X, y) method are fitted once and extended; all others are refitted per origin,
+    # with the origins spread over n_jobs single-threaded workers.
+    # Features built from the target must not come from inside the forecast window: name the lag
+    # columns in lags (lag_1 first, labels or positions) and every origin is rolled forward on its
+    # own predictions, seeded from the lags at the origin; lags='window' does the same for
+    # (rows, steps, features) windows whose feature 0 is the target. Other columns of X[test]
+    # are used as observed, so they should be truly exogenous.
+    # Returns (forecasts, errors): a long frame of origin/step/actual/predicted and the per-step
+    # metrics from forecast_errors, with fits, mode and elapsed_seconds in errors.attrs.
+    start = time.perf_counter()
+    # Only the parameters travel to the workers, never a fitted (possibly unpicklable) model
+    model = clone(model)
+    splits = rolling_origins(len(y), horizon, initial, step, window)
+    extend = reuse and window is None and hasattr(_final_step(model), 'update')
+    if extend:
+        predictions, _ = _extend_origins(model, X, y, splits, lags)
+        fits = 1
+    else:
+        outputs = Parallel(n_jobs=n_jobs, verbose=verbose)(
+            delayed(_refit_origin)(model, X, y, train, test, lags) for train, test in splits)
+        predictions = [predicted for predicted, _ in outputs]
+        fits = len(splits)
+
+    actual = np.stack([np.asarray(_take(y, test), dtype=float).ravel() for _, test in splits])
+    predicted = np.stack(predictions)
+    errors = forecast_errors(actual, predicted)
+    errors.attrs.update(mode='extend' if extend else 'refit', origins=len(splits), fits=fits,
+                        recursive=lags is not None,
+                        elapsed_seconds=time.perf_counter() - start)
+
+    index = y.index if hasattr(y, 'index') else pd.RangeIndex(len(y))
+    origins = np.repeat([index[test[0]] for _, test in splits], horizon)
+    forecasts = pd.DataFrame({
+        'origin': origins,
+        'step': np.tile(np.arange(1, horizon + 1), len(splits)),
+        'timestamp': index[np.concatenate([test for _, test in splits])],
+        'actual': actual.ravel(),
+        'predicted': predicted.ravel(),
+    })
+    return forecasts, errors
+
+
+def compare(models, X, y, horizon, **kwargs):
+    # Backtests several models with the same origin settings; one summary row per model.
+    # X, y and lags may be dicts keyed by model name when models need different inputs (e.g. LSTM windows).
+    lags = kwargs.pop('lags', None)
+    rows, all_errors = {}, {}
+    for name, model in models.items():
+        data = X[name] if isinstance(X, dict) else X
+        target = y[name] if isinstance(y, dict) else y
+        model_lags = lags.get(name) if isinstance(lags, dict) else lags
+        _, errors = backtest(model, data, target, horizon, lags=model_lags, **kwargs)
+        all_errors[name] = errors
+        rows[name] = dict(errors.attrs['summary'], mode=errors.attrs['mode'], fits=errors.attrs['fits'],
+                          seconds=errors.attrs['elapsed_seconds'])
+    return pd.DataFrame(rows).T, all_errors
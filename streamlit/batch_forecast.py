@@ -0,0 +1,133 @@
+import argparse
+import logging
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from model_pipeline import forecast_frame, prophet_forecast
+
+logger = logging.getLogger(__name__)
+
+def read_table(path):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def write_table(frame, path):
+    if path.endswith('.csv'):
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_parquet(path, index=False)
+
+
+def iter_series(source, id_col='series_id', date_col='Date', value_col='Close'):
+    # Yields (series_id, frame or path): one series per file for a directory, grouped rows for a long table
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            stem, ext = os.path.splitext(name)
+            if ext in ('.csv', '.parquet'):
+                yield stem, os.path.join(source, name)
+        return
+    table = read_table(source)
+    for series_id, frame in table.groupby(id_col, sort=False):
+        yield series_id, frame[[date_col, value_col]]
+
+
+def forecast_series(series_id, source, params, date_col='Date', value_col='Close'):
+    # Runs in a worker process; failures are reported rather than raised so the batch keeps going
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    start = time.perf_counter()
+    result = {'series_id': series_id, 'status': 'ok', 'error': None, 'rows': 0,
+              'fit_mode': None, 'fit_seconds': None}
+    try:
+        frame = read_table(source) if isinstance(source, str) else source
+        frame = frame[[date_col, value_col]].rename(columns={date_col: 'Date', value_col: 'Close'})
+        frame['Date'] = pd.to_datetime(frame['Date'])
+        frame = frame.dropna().sort_values('Date')
+        result['rows'] = len(frame)
+        # Compute only: no figure, and just the four forecast columns cross the process boundary
+        computed = prophet_forecast(frame, series_id=series_id, **params)
+        fit_report = computed['fit_report']
+        result['fit_mode'] = fit_report['mode']
+        result['fit_seconds'] = fit_report['seconds']
+        forecast = forecast_frame(computed)
+        forecast.insert(0, 'series_id', series_id)
+    except Exception as exc:
+        result['status'] = 'failed'
+        result['error'] = f'{type(exc).__name__}: {exc}'
+        logger.debug(traceback.format_exc())
+        forecast = None
+    result['total_seconds'] = time.perf_counter() - start
+    return result, forecast
+
+
+def run_batch(source, output, params, workers=None, id_col='series_id', date_col='Date', value_col='Close'):
+    reports, forecasts = [], []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(forecast_series, series_id, series, params, date_col, value_col): series_id
+            for series_id, series in iter_series(source, id_col, date_col, value_col)
+        }
+        for future in as_completed(futures):
+            try:
+                report, forecast = future.result()
+            except Exception as exc:
+                # The worker itself died (e.g. killed for memory); record it and move on
+                report = {'series_id': futures[future], 'status': 'failed', 'error': f'{type(exc).__name__}: {exc}'}
+                forecast = None
+            reports.append(report)
+            if forecast is not None:
+                forecasts.append(forecast)
+            logger.info('%s: %s in %.2fs', report['series_id'], report['status'], report.get('total_seconds') or 0.0)
+
+    report = pd.DataFrame(reports)
+    if forecasts:
+        write_table(pd.concat(forecasts, ignore_index=True), output)
+    root, ext = os.path.splitext(output)
+    write_table(report, f'{root}.report{ext}')
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Fit and forecast many series with prophet_forecast in parallel.')
+    parser.add_argument('source', help='directory with one CSV/Parquet file per series, or a long-format table')
+    parser.add_argument('--output', default='forecasts.parquet', help='.parquet (default) or .csv')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--id-col', default='series_id')
+    parser.add_argument('--date-col', default='Date')
+    parser.add_argument('--value-col', default='Close')
+    parser.add_argument('--horizon', type=int, default=90)
+    parser.add_argument('--growth', choices=['linear', 'logistic'], default='linear')
+    parser.add_argument('--seasonality-mode', choices=['additive', 'multiplicative'], default='additive')
+    parser.add_argument('--no-weekly', dest='weekly_seasonality', action='store_false')
+    parser.add_argument('--no-monthly', dest='monthly_seasonality', action='store_false')
+    parser.add_argument('--no-yearly', dest='yearly_seasonality', action='store_false')
+    parser.add_argument('--holidays', default='None', help="country code, or 'None'")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    params = {
+        'horizon': args.horizon,
+        'growth': args.growth,
+        'seasonality_mode': args.seasonality_mode,
+        'weekly_seasonality': args.weekly_seasonality,
+        'monthly_seasonality': args.monthly_seasonality,
+        'yearly_seasonality': args.yearly_seasonality,
+        'holidays': args.holidays
+    }
+    start = time.perf_counter()
+    report = run_batch(args.source, args.output, params, args.workers, args.id_col, args.date_col, args.value_col)
+    failed = report[report['status'] != 'ok']
+    print(f'{len(report)} series in {time.perf_counter() - start:.1f}s, {len(failed)} failed')
+    if len(report) and 'fit_seconds' in report:
+        print(report['fit_seconds'].describe().to_string())
+    for _, row in failed.iterrows():
+        print(f"  {row['series_id']}: {row['error']}")
+
+
+if __name__ == '__main__':
+    main()
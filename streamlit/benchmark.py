@@ -0,0 +1,414 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# CPU only, whatever the machine has; must be set before TensorFlow is imported
+os.environ.setdefault('CUDA_VISIBLE_DEVICES', '-1')
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, RegressorMixin
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.neural_network import MLPRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from backends import load_backend
+from backtesting import backtest
+from dataset_store import REPO_ROOT, load_dataset
+from lag_features import LagFeatureTransformer
+from model_pipeline import fit_prophet, prophet_forecast, render_forecast
+from profiling import Profiler
+from windowing import sliding_windows, steps_per_epoch, window_batches
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks')
+
+# Bundled dataset -> (series id column or None, date column, value column)
+BENCH_DATASETS = {
+    'nvda': (None, 'Date', 'Close'),
+    'walmart': ('Store', 'Date', 'Weekly_Sales'),
+    'index2018': (None, 'date', 'spx'),
+    'sunspots': (None, 'Date', 'Monthly Mean Total Sunspot Number'),
+}
+
+N_LAGS = 5
+WINDOW_SIZE = 10
+PROPHET_PARAMS = {'growth': 'linear', 'seasonality_mode': 'additive', 'weekly_seasonality': True,
+                  'monthly_seasonality': True, 'yearly_seasonality': True, 'holidays': 'None'}
+
+
+def load_series(name):
+    # Long frame [series_id, ds, y] for one bundled dataset
+    id_col, date_col, value_col = BENCH_DATASETS[name]
+    data = load_dataset(name)
+    frame = pd.DataFrame({
+        'series_id': data[id_col].astype(str) if id_col else name,
+        'ds': data[date_col],
+        'y': data[value_col].astype(float),
+    })
+    return frame.dropna().sort_values(['series_id', 'ds'], kind='stable').reset_index(drop=True)
+
+
+def upscale(frame, length=1, series=1, seed=0):
+    # Synthetic version with `length` times longer and `series` times more series. Longer series
+    # repeat the step changes of the original with a little noise, continuing from where the
+    # previous copy ended; extra series are rescaled, noisy copies. Deterministic for a seed.
+    if length == 1 and series == 1:
+        return frame
+    rng = np.random.default_rng(seed)
+    parts = []
+    for series_id, group in frame.groupby('series_id', sort=False):
+        y, ds = group['y'].to_numpy(), group['ds'].to_numpy()
+        step = np.median(np.diff(ds))
+        dy = np.diff(y)
+        n = len(y) * length
+        diffs = np.tile(dy, length + 1)[:n - 1]
+        diffs = diffs + rng.normal(0, 0.05 * (dy.std() or 1.0), len(diffs))
+        long_y = y[0] + np.concatenate([[0.0], np.cumsum(diffs)])
+        long_ds = ds[0] + step * np.arange(n)
+        for copy in range(series):
+            scale = 1.0 if copy == 0 else rng.lognormal(0, 0.1)
+            noise = 0.0 if copy == 0 else rng.normal(0, 0.01 * (long_y.std() or 1.0), n)
+            parts.append(pd.DataFrame({'series_id': series_id if copy == 0 else f'{series_id}~{copy}',
+                                       'ds': long_ds, 'y': long_y * scale + noise}))
+    return pd.concat(parts, ignore_index=True)
+
+
+def lag_frames(frame):
+    # Per-series lag features -> (X, y) frames pooled across series, plus each series' test cut
+    features = LagFeatureTransformer(n_lags=N_LAGS, columns=['y'])
+    X_parts, y_parts, test_masks = [], [], []
+    for _, group in frame.groupby('series_id', sort=False):
+        lagged = features.transform(group[['y']].set_index(group['ds']))
+        X_parts.append(lagged.drop(columns='y'))
+        y_parts.append(lagged['y'])
+        mask = np.zeros(len(lagged), dtype=bool)
+        mask[int(len(lagged) * 0.8):] = True
+        test_masks.append(mask)
+    return X_parts, y_parts, test_masks
+
+
+def window_arrays(frame):
+    X_parts, y_parts, test_masks = [], [], []
+    for _, group in frame.groupby('series_id', sort=False):
+        X, y = sliding_windows(group['y'].to_numpy(dtype=np.float32), WINDOW_SIZE)
+        X_parts.append(X)
+        y_parts.append(y[:, 0])
+        mask = np.zeros(len(X), dtype=bool)
+        mask[int(len(X) * 0.8):] = True
+        test_masks.append(mask)
+    return X_parts, y_parts, test_masks
+
+
+class SARIMAXEstimator(BaseEstimator, RegressorMixin):
+    # The notebook's SARIMAX/ARIMAX wrappers on positions instead of dates, so gappy daily series
+    # (trading days) work too; update() extends the fit as in the notebook
+    def __init__(self, order=(1, 0, 0), seasonal_order=(0, 0, 0, 0)):
+        self.order = order
+        self.seasonal_order = seasonal_order
+
+    def fit(self, X, y):
+        SARIMAX = load_backend('statsmodels').SARIMAX
+        self.model_ = SARIMAX(np.asarray(y, dtype=float), exog=np.asarray(X, dtype=float), order=self.order,
+                              seasonal_order=self.seasonal_order).fit(disp=False)
+        return self
+
+    def update(self, X, y, refit=False):
+        self.model_ = self.model_.append(np.asarray(y, dtype=float), exog=np.asarray(X, dtype=float), refit=refit)
+        return self
+
+    def predict(self, X):
+        return self.model_.forecast(steps=len(X), exog=np.asarray(X, dtype=float))
+
+
+class ProphetEstimator(BaseEstimator, RegressorMixin):
+    # fit_prophet behind the estimator interface, without the model cache; predict(X) forecasts
+    # the len(X) steps after the training data at the series' median spacing
+    def __init__(self, params=None):
+        self.params = params
+
+    def fit(self, X, y):
+        data = pd.DataFrame({'ds': y.index, 'y': np.asarray(y, dtype=float)})
+        self.model_, _ = fit_prophet(data, self.params or PROPHET_PARAMS, cache=None, warm_start=False)
+        self.last_, self.step_ = y.index[-1], pd.Series(y.index).diff().median()
+        return self
+
+    def predict(self, X):
+        future = pd.DataFrame({'ds': pd.date_range(self.last_ + self.step_, periods=len(X), freq=self.step_)})
+        return self.model_.predict(future)['yhat'].to_numpy()
+
+
+class LSTMEstimator(BaseEstimator, RegressorMixin):
+    def __init__(self, units=50, epochs=2, batch_size=64):
+        self.units = units
+        self.epochs = epochs
+        self.batch_size = batch_size
+
+    def fit(self, X, y):
+        tf = load_backend('tensorflow')
+        tf.random.set_seed(0)
+        self.model_ = tf.keras.Sequential([tf.keras.Input(shape=X.shape[1:]),
+                                           tf.keras.layers.LSTM(self.units, activation='relu'),
+                                           tf.keras.layers.Dense(1)])
+        self.model_.compile(optimizer='adam', loss='mse')
+        batches = window_batches(X, y, self.batch_size, shuffle=True, seed=0, repeat=True)
+        self.model_.fit(batches, steps_per_epoch=steps_per_epoch(len(X), self.batch_size),
+                        epochs=self.epochs, verbose=0)
+        return self
+
+    def predict(self, X):
+        return self.model_.predict(np.asarray(X, dtype=np.float32), batch_size=1024, verbose=0)[:, 0]
+
+
+def _xgboost():
+    return load_backend('xgboost').XGBRegressor(n_estimators=100, max_depth=5, n_jobs=1, random_state=0)
+
+
+# Model family -> (input kind, estimator factory). 'series' models are fitted once per series;
+# 'lags' and 'windows' models are global models trained on all series at once.
+MODEL_FAMILIES = {
+    'prophet': ('series', lambda: ProphetEstimator()),
+    'sarimax': ('series', lambda: SARIMAXEstimator(order=(1, 0, 0), seasonal_order=(1, 1, 1, 2))),
+    'arimax': ('series', lambda: SARIMAXEstimator(order=(2, 0, 0))),
+    'random_forest': ('lags', lambda: RandomForestRegressor(n_estimators=50, n_jobs=1, random_state=0)),
+    'gradient_boosting': ('lags', lambda: GradientBoostingRegressor(n_estimators=100, random_state=0)),
+    'xgboost': ('lags', _xgboost),
+    'mlp': ('lags', lambda: Pipeline([('scaler', StandardScaler()),
+                                      ('model', MLPRegressor(hidden_layer_sizes=(50,), max_iter=200, random_state=0))])),
+    'lstm': ('windows', lambda: LSTMEstimator()),
+}
+
+# Backend each family needs beyond sklearn; families whose backend is missing are skipped
+FAMILY_BACKENDS = {'prophet': 'prophet', 'sarimax': 'statsmodels', 'arimax': 'statsmodels',
+                   'xgboost': 'xgboost', 'lstm': 'tensorflow'}
+
+
+def parse_scale(token):
+    # '10x1' -> (length factor 10, series factor 1); '10' means both
+    length, _, series = token.partition('x')
+    return int(length), int(series or length)
+
+
+def _backtest_horizon(n):
+    return max(1, min(30, n // 10))
+
+
+def run_case(profiler, frame, family):
+    # Times preprocess, fit, predict and backtest of one model family on one (upscaled) dataset
+    kind, factory = MODEL_FAMILIES[family]
+    with profiler.span('preprocess', rows=len(frame)):
+        X_parts, y_parts, masks = window_arrays(frame) if kind == 'windows' else lag_frames(frame)
+
+    if kind == 'series':
+        models = []
+        with profiler.span('fit', rows=sum(int((~m).sum()) for m in masks)):
+            for X, y, mask in zip(X_parts, y_parts, masks):
+                models.append(factory().fit(X[~mask], y[~mask]))
+        with profiler.span('predict', rows=sum(int(m.sum()) for m in masks)):
+            for model, X, mask in zip(models, X_parts, masks):
+                model.predict(X[mask])
+    else:
+        concat = np.concatenate if kind == 'windows' else pd.concat
+        X_train = concat([X[~m] for X, m in zip(X_parts, masks)])
+        y_train = concat([y[~m] for y, m in zip(y_parts, masks)])
+        X_test = concat([X[m] for X, m in zip(X_parts, masks)])
+        with profiler.span('fit', rows=len(X_train)):
+            model = factory().fit(X_train, y_train)
+        # One batched call for every series' test rows
+        with profiler.span('predict', rows=len(X_test)):
+            model.predict(X_test)
+
+    # Backtest on the first series only, so its cost does not grow with the series count
+    X, y = X_parts[0], y_parts[0]
+    horizon = _backtest_horizon(len(y))
+    step = max(horizon, (len(y) - int(len(y) * 0.8)) // 5)
+    with profiler.span('backtest', rows=len(y)) as span:
+        _, errors = backtest(factory(), X, y, horizon, initial=0.8, step=step, n_jobs=1)
+        span['rmse'] = errors.attrs['summary']['RMSE']
+
+    if family == 'prophet':
+        first = frame[frame['series_id'] == frame['series_id'].iloc[0]].rename(columns={'ds': 'Date', 'y': 'Close'})
+        # Compute and rendering are separate stages, as in the app
+        with profiler.span('forecast', rows=len(first)):
+            result = prophet_forecast(first, horizon=horizon, cache=None, warm_start=False, **PROPHET_PARAMS)
+        with profiler.span('render', rows=len(result['ds'])):
+            render_forecast(first, result)
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+def environment():
+    import sklearn
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'numpy': np.__version__, 'pandas': pd.__version__, 'sklearn': sklearn.__version__}
+
+
+def run_suite(datasets, families, scales, repeat=1, seed=0):
+    records = []
+    for name in datasets:
+        profiler = Profiler()
+        with profiler.span('load') as span:
+            base = load_series(name)
+            span['rows'] = len(base)
+        load = profiler.spans[-1]
+        for token in scales:
+            length, series = parse_scale(token)
+            frame = upscale(base, length, series, seed)
+            case = {'dataset': name, 'scale': token, 'rows': len(frame), 'series': frame['series_id'].nunique()}
+            records.append(dict(case, model='-', stage='load', status='ok', error=None,
+                                wall_seconds=load['wall_seconds'], cpu_seconds=load['cpu_seconds'],
+                                peak_rss_mb=load['peak_rss_mb']))
+            for family in families:
+                backend = FAMILY_BACKENDS.get(family)
+                try:
+                    if backend:
+                        load_backend(backend)
+                except ImportError as exc:
+                    records.append(dict(case, model=family, stage='-', status='skipped', error=str(exc)))
+                    continue
+                runs = []
+                for _ in range(repeat):
+                    profiler = Profiler()
+                    try:
+                        run_case(profiler, frame, family)
+                        error = None
+                    except Exception as exc:
+                        error = f'{type(exc).__name__}: {exc}'
+                        logger.warning('%s %s %s failed: %s', name, token, family, error)
+                    runs.append(profiler.to_frame())
+                    if error:
+                        break
+                spans = pd.concat(runs)
+                # Median over repeats per stage; a stage that failed in any repeat is reported as failed
+                for stage, group in spans.groupby('stage', sort=False):
+                    failed = (group['status'] != 'ok').any()
+                    records.append(dict(case, model=family, stage=stage, status='failed' if failed else 'ok',
+                                        error=error if failed else None,
+                                        wall_seconds=group['wall_seconds'].median(),
+                                        cpu_seconds=group['cpu_seconds'].median(),
+                                        peak_rss_mb=group['peak_rss_mb'].max(),
+                                        stage_rows=group['rows'].iloc[0]))
+                logger.info('%s %s %s: %.2fs', name, token, family, spans['wall_seconds'][spans['depth'] == 0].sum() / len(runs))
+    return pd.DataFrame(records)
+
+
+def save_results(results, config, out_dir=RESULTS_DIR):
+    # benchmarks/<commit>[-dirty].json (full record) and .csv (the results table)
+    commit, dirty = git_commit()
+    os.makedirs(out_dir, exist_ok=True)
+    stem = f'{commit}-dirty' if dirty else commit
+    path = os.path.join(out_dir, f'{stem}.json')
+    payload = {'commit': commit, 'dirty': dirty, 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'environment': environment(), 'config': config,
+               'results': json.loads(results.to_json(orient='records'))}
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=1)
+    results.to_csv(os.path.join(out_dir, f'{stem}.csv'), index=False)
+    return path
+
+
+def load_results(path):
+    with open(path) as f:
+        payload = json.load(f)
+    results = pd.DataFrame(payload['results'])
+    results.attrs.update(commit=payload['commit'], created=payload['created'])
+    return results
+
+
+def previous_results(current, out_dir=RESULTS_DIR):
+    # The newest stored run other than `current`, or None
+    runs = []
+    for name in os.listdir(out_dir) if os.path.isdir(out_dir) else []:
+        path = os.path.join(out_dir, name)
+        if name.endswith('.json') and os.path.abspath(path) != os.path.abspath(current):
+            runs.append((os.path.getmtime(path), path))
+    return max(runs)[1] if runs else None
+
+
+def compare_results(baseline, current, threshold=0.25, min_seconds=0.05):
+    # Stage-by-stage wall time of two runs. A stage regresses when it is more than `threshold`
+    # slower and at least `min_seconds` slower (timer noise on tiny stages is ignored), or when it
+    # newly fails.
+    keys = ['dataset', 'scale', 'model', 'stage']
+    base, cur = load_results(baseline), load_results(current)
+    merged = base[keys + ['wall_seconds', 'status']].merge(
+        cur[keys + ['wall_seconds', 'status']], on=keys, how='outer', suffixes=('_baseline', '_current'))
+    merged['ratio'] = merged['wall_seconds_current'] / merged['wall_seconds_baseline']
+    delta = merged['wall_seconds_current'] - merged['wall_seconds_baseline']
+    slower = (merged['ratio'] > 1 + threshold) & (delta > min_seconds)
+    faster = (merged['ratio'] < 1 / (1 + threshold)) & (-delta > min_seconds)
+    broke = (merged['status_current'] == 'failed') & (merged['status_baseline'] == 'ok')
+    merged['verdict'] = np.select([broke, slower, faster], ['failed', 'regression', 'improvement'], 'ok')
+    merged.attrs.update(baseline=base.attrs['commit'], current=cur.attrs['commit'])
+    return merged.sort_values('ratio', ascending=False, na_position='last').reset_index(drop=True)
+
+
+def print_comparison(comparison):
+    print(f"Baseline {comparison.attrs['baseline']} -> current {comparison.attrs['current']}")
+    flagged = comparison[comparison['verdict'] != 'ok']
+    if flagged.empty:
+        print('No stage changed beyond the threshold.')
+    else:
+        print(flagged.to_string(index=False, float_format=lambda v: f'{v:.3f}'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline CPU benchmark of the forecasting stack on the bundled datasets.')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='time every stage and store the results for the current commit')
+    run.add_argument('--datasets', default=','.join(BENCH_DATASETS))
+    run.add_argument('--models', default=','.join(MODEL_FAMILIES))
+    run.add_argument('--scales', default='1x1,10x1,1x10',
+                     help="comma-separated LENGTHxSERIES factors, e.g. '1x1,10x1,100x1,1x100'")
+    run.add_argument('--repeat', type=int, default=1)
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--out', default=RESULTS_DIR)
+    run.add_argument('--baseline', help='results file to compare against (default: the newest other run)')
+    run.add_argument('--threshold', type=float, default=0.25)
+    compare = sub.add_parser('compare', help='compare two stored runs')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=0.25)
+    for command in (run, compare):
+        command.add_argument('--fail-on-regression', action='store_true', help='exit with status 1 on regressions')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    for name in ('cmdstanpy', 'prophet', 'model_pipeline'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+    if args.command == 'run':
+        config = {'datasets': args.datasets.split(','), 'models': args.models.split(','),
+                  'scales': args.scales.split(','), 'repeat': args.repeat, 'seed': args.seed}
+        results = run_suite(config['datasets'], config['models'], config['scales'], args.repeat, args.seed)
+        current = save_results(results, config, args.out)
+        print(f'Results written to {current}')
+        baseline = args.baseline or previous_results(current, args.out)
+    else:
+        current, baseline = args.current, args.baseline
+    if not baseline:
+        print('No earlier run to compare against.')
+        return 0
+    comparison = compare_results(baseline, current, args.threshold)
+    print_comparison(comparison)
+    regressed = comparison['verdict'].isin(['regression', 'failed']).any()
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bundled CSVs with the date formats and read_csv options needed to type them
+DATASETS = {
+    'nvda': {'path': 'streamlit/NVDA.csv', 'dates': {'Date': '%Y-%m-%d'}},
+    'goog': {'path': 'Time_series_Augmentation/GOOG.csv', 'dates': {'Date': '%Y-%m-%d'}},
+    'walmart': {'path': 'Time_series_Augmentation/walmart.csv', 'dates': {'Date': '%d-%m-%Y'}},
+    'index2018': {
+        'path': 'Projects/1st Project Stock Market Prediction/Index2018.csv',
+        'dates': {'date': '%d/%m/%Y'},
+        'read_csv': {'encoding': 'utf-8-sig'}
+    },
+    'sunspots': {
+        'path': 'Merged_notebooks/Ch05_Sunspots_database.csv',
+        'dates': {'Date': '%Y-%m-%d'},
+        'read_csv': {'index_col': 0}
+    },
+    'earthquakes': {
+        'path': 'Statisitical_Forecasting_techniques/Ch03_Earthquake_database.csv',
+        'dates': {'Date': '%m/%d/%Y'}
+    },
+}
+
+FORMAT_VERSION = 1
+
+
+def _store_dir(csv_path):
+    return os.path.join(os.path.dirname(csv_path), '.columnar')
+
+
+def _manifest_path(csv_path):
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(_store_dir(csv_path), f'{stem}.json')
+
+
+def _file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _parse_dates(values, fmt):
+    parsed = pd.to_datetime(values, format=fmt, errors='coerce')
+    # Rows in another layout (e.g. ISO timestamps among '%m/%d/%Y' dates) get a second, generic pass
+    missed = parsed.isna() & values.notna()
+    if missed.any():
+        fallback = pd.to_datetime(values[missed], utc=True, errors='coerce').dt.tz_convert(None)
+        parsed = parsed.where(~missed, fallback)
+    return parsed.values.astype('datetime64[ns]')
+
+
+def ingest(csv_path, dates=None, read_csv=None):
+    # Convert a CSV into one .npy file per column plus a manifest describing the types
+    csv_path = os.path.abspath(csv_path)
+    stat = os.stat(csv_path)
+    digest = _file_digest(csv_path)
+    data = pd.read_csv(csv_path, **(read_csv or {}))
+    if data.index.name is not None or not isinstance(data.index, pd.RangeIndex):
+        data = data.reset_index(drop=True)
+
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    settings = hashlib.sha256(json.dumps([FORMAT_VERSION, dates or {}, read_csv or {}], sort_keys=True,
+                                         default=str).encode()).hexdigest()
+    version_dir = f'{stem}-{digest[:12]}-{settings[:8]}'
+    target = os.path.join(_store_dir(csv_path), version_dir)
+    # Columns are written into a private directory and renamed into place, so processes ingesting
+    # the same CSV at once never share (or see) a half-written version. The leading dot keeps the
+    # staging directory out of _remove_stale_versions.
+    staging = os.path.join(_store_dir(csv_path), f'.{version_dir}.{_writer_id()}.tmp')
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    columns = []
+    for i, name in enumerate(data.columns):
+        values = data[name]
+        entry = {'name': name, 'file': f'c{i}.npy'}
+        if dates and name in dates:
+            array = _parse_dates(values, dates[name])
+            entry['kind'] = 'datetime'
+        elif values.dtype.kind in 'biuf':
+            array = values.to_numpy()
+            entry['kind'] = 'numeric'
+        else:
+            codes, categories = pd.factorize(values)
+            array = codes.astype(np.int32)
+            np.save(os.path.join(staging, f'c{i}.categories.npy'), np.asarray(categories, dtype=str))
+            entry['kind'] = 'category'
+        entry['dtype'] = str(array.dtype)
+        np.save(os.path.join(staging, entry['file']), np.ascontiguousarray(array))
+        columns.append(entry)
+
+    _publish(staging, target)
+
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'source': os.path.basename(csv_path),
+        'source_size': stat.st_size,
+        'source_mtime_ns': stat.st_mtime_ns,
+        'source_sha256': digest,
+        'dates': dates or {},
+        'read_csv': read_csv or {},
+        'rows': len(data),
+        'dir': version_dir,
+        'columns': columns
+    }
+    _write_manifest(csv_path, manifest)
+    _remove_stale_versions(csv_path, stem, version_dir)
+    return manifest
+
+
+def _writer_id():
+    return f'{os.getpid()}-{threading.get_ident()}'
+
+
+def _publish(staging, target):
+    # Rename the finished directory into place. The name covers the content digest and the
+    # ingest settings, so a directory already there (another process won the race) holds the
+    # same columns and is used as is.
+    try:
+        os.replace(staging, target)
+    except OSError:
+        if not os.path.isdir(target):
+            raise
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _write_manifest(csv_path, manifest):
+    path = _manifest_path(csv_path)
+    tmp_path = f'{path}.{_writer_id()}.tmp'
+    with open(tmp_path, 'w') as fp:
+        json.dump(manifest, fp, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _remove_stale_versions(csv_path, stem, keep):
+    store = _store_dir(csv_path)
+    for name in os.listdir(store):
+        if name.startswith(f'{stem}-') and name != keep and os.path.isdir(os.path.join(store, name)):
+            shutil.rmtree(os.path.join(store, name), ignore_errors=True)
+
+
+def ensure_ingested(csv_path, dates=None, read_csv=None):
+    # Return a manifest that is current for the source CSV, rebuilding the store if it changed
+    csv_path = os.path.abspath(csv_path)
+    try:
+        with open(_manifest_path(csv_path), 'r') as fp:
+            manifest = json.load(fp)
+    except (OSError, ValueError):
+        return ingest(csv_path, dates, read_csv)
+
+    if (manifest.get('format_version') != FORMAT_VERSION
+            or manifest.get('dates') != (dates or {})
+            or manifest.get('read_csv') != (read_csv or {})):
+        return ingest(csv_path, dates, read_csv)
+
+    stat = os.stat(csv_path)
+    if stat.st_size == manifest['source_size'] and stat.st_mtime_ns == manifest['source_mtime_ns']:
+        return manifest
+    # Touched but possibly unchanged (e.g. a fresh checkout): only rebuild when the content differs
+    if stat.st_size == manifest['source_size'] and _file_digest(csv_path) == manifest['source_sha256']:
+        manifest['source_mtime_ns'] = stat.st_mtime_ns
+        _write_manifest(csv_path, manifest)
+        return manifest
+    return ingest(csv_path, dates, read_csv)
+
+
+def load_csv(csv_path, dates=None, read_csv=None):
+    # Columns are memory-mapped; numeric and datetime columns are not copied into the DataFrame
+    manifest = ensure_ingested(csv_path, dates, read_csv)
+    directory = os.path.join(_store_dir(os.path.abspath(csv_path)), manifest['dir'])
+    columns = {}
+    for entry in manifest['columns']:
+        array = np.load(os.path.join(directory, entry['file']), mmap_mode='r')
+        if entry['kind'] == 'category':
+            categories = np.load(os.path.join(directory, entry['file'].replace('.npy', '.categories.npy')))
+            array = pd.Categorical.from_codes(array, categories)
+        columns[entry['name']] = array
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_dataset(name):
+    spec = DATASETS[name]
+    return load_csv(os.path.join(REPO_ROOT, spec['path']), spec.get('dates'), spec.get('read_csv'))
+
+
+if __name__ == '__main__':
+    # python dataset_store.py [name ...]  ingests the bundled datasets (all by default)
+    for name in sys.argv[1:] or DATASETS:
+        spec = DATASETS[name]
+        manifest = ensure_ingested(os.path.join(REPO_ROOT, spec['path']), spec.get('dates'), spec.get('read_csv'))
+        print(f"{name}: {manifest['rows']} rows, {len(manifest['columns'])} columns -> {manifest['dir']}")
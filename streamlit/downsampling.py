@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Traces with more points than this are drawn with WebGL
+WEBGL_THRESHOLD = 5000
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if x.dtype.kind == 'M':
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-triangle-three-buckets: keeps first and last point and, per bucket,
+    # the point forming the largest triangle with the previous pick and the next bucket's mean.
+    # Series that fit in n_out are returned whole. Otherwise the observed points are decimated and
+    # the first NaN of every interior gap is kept, so the line still breaks where the data does.
+    y = np.asarray(y, dtype=float)
+    if len(y) <= n_out or n_out < 3:
+        return np.arange(len(y))
+    missing = np.isnan(y)
+    valid = np.flatnonzero(~missing)
+    gaps = np.flatnonzero(missing[1:] & ~missing[:-1]) + 1
+    if len(valid):
+        gaps = gaps[gaps < valid[-1]]
+    picked = _lttb(_as_float(x)[valid], y[valid], max(n_out - len(gaps), 3))
+    return np.union1d(valid[picked], gaps)
+
+
+def _lttb(x, y, n_out):
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = edges[i + 1], edges[i + 2]
+            avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def lttb(x, y, n_out):
+    idx = lttb_indices(x, y, n_out)
+    return np.asarray(x)[idx], np.asarray(y)[idx]
+
+
+def aggregate_ohlc(data, n_out, date_col='Date'):
+    # One candle per bucket of consecutive rows: first open, max high, min low, last close, summed volume
+    n = len(data)
+    if n <= n_out:
+        return data
+    starts = np.unique(np.linspace(0, n, n_out, endpoint=False).astype(np.int64))
+    ends = np.append(starts[1:], n) - 1
+    out = {
+        date_col: data[date_col].values[starts],
+        'Open': data['Open'].values[starts],
+        'High': np.maximum.reduceat(data['High'].values, starts),
+        'Low': np.minimum.reduceat(data['Low'].values, starts),
+        'Close': data['Close'].values[ends],
+    }
+    if 'Volume' in data:
+        out['Volume'] = np.add.reduceat(data['Volume'].values, starts)
+    return pd.DataFrame(out)
+
+
+def line_trace(x, y, name, n_points, **kwargs):
+    # Scatter trace decimated to n_points, switching to WebGL for large traces
+    x, y = lttb(x, y, n_points)
+    trace = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    return trace(x=x, y=y, mode=kwargs.pop('mode', 'lines'), name=name, **kwargs)
@@ -0,0 +1,129 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class _Job:
+    def __init__(self, key):
+        self.key = key
+        self.timer = None
+        self.future = None
+
+
+class ForecastJobRunner:
+    # Runs forecasts off the script thread. Jobs are keyed by their parameters:
+    # sessions asking for the same key share one job, a job only starts after its
+    # key has been requested unchanged for `debounce` seconds, and queued jobs no
+    # session still wants are cancelled. A fit that is already running cannot be
+    # interrupted; it finishes and its result is kept for whoever asks next.
+    # A session that has not made a request for session_ttl seconds (a closed tab) is
+    # forgotten, so it neither keeps its last result alive nor keeps its job wanted.
+    # A failure is kept per key, like a result, and reported to every session asking for the
+    # key; a session asking again after it has seen the failure submits a new job (a retry).
+    def __init__(self, max_workers=2, debounce=0.4, max_results=32, session_ttl=300.0, clock=time.monotonic):
+        self.debounce = debounce
+        self.max_results = max_results
+        self.session_ttl = session_ttl
+        self._clock = clock
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='forecast')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._wanted = {}
+        self._results = OrderedDict()
+        # key -> (exception, sessions it has been reported to)
+        self._errors = OrderedDict()
+        self._last_good = {}
+        self._seen = {}
+
+    def request(self, session, key, fn, *args, **kwargs):
+        # Returns (status, result) with status 'done', 'pending' or 'failed'. While pending,
+        # result is the session's last good result (or None) so the page can keep showing it.
+        with self._lock:
+            now = self._clock()
+            self._seen[session] = now
+            self._expire(now)
+            previous = self._wanted.get(session)
+            self._wanted[session] = key
+            if previous is not None and previous != key:
+                self._cancel_if_unwanted(previous)
+
+            if key in self._results:
+                self._results.move_to_end(key)
+                result = self._results[key]
+                self._last_good[session] = result
+                return 'done', result
+            if key in self._errors:
+                error, reported = self._errors[key]
+                if session not in reported:
+                    reported.add(session)
+                    return 'failed', error
+                del self._errors[key]
+
+            if key not in self._jobs:
+                job = _Job(key)
+                job.timer = threading.Timer(self.debounce, self._start, args=(job, fn, args, kwargs))
+                job.timer.daemon = True
+                self._jobs[key] = job
+                job.timer.start()
+            return 'pending', self._last_good.get(session)
+
+    def forget(self, session):
+        with self._lock:
+            self._forget(session)
+
+    def _forget(self, session):
+        key = self._wanted.pop(session, None)
+        self._last_good.pop(session, None)
+        self._seen.pop(session, None)
+        if key is not None:
+            self._cancel_if_unwanted(key)
+
+    def _expire(self, now):
+        for session in [s for s, seen in self._seen.items() if now - seen > self.session_ttl]:
+            logger.debug('Expiring idle forecast session %s', session)
+            self._forget(session)
+
+    @property
+    def sessions(self):
+        with self._lock:
+            return len(self._seen)
+
+    def _cancel_if_unwanted(self, key):
+        if key in self._wanted.values():
+            return
+        job = self._jobs.get(key)
+        if job is None:
+            return
+        if job.future is None:
+            job.timer.cancel()
+        elif not job.future.cancel():
+            return
+        del self._jobs[key]
+        logger.debug('Cancelled stale forecast job %s', key)
+
+    def _start(self, job, fn, args, kwargs):
+        with self._lock:
+            if self._jobs.get(job.key) is not job:
+                return
+            job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            logger.exception('Forecast job %s failed', job.key)
+            with self._lock:
+                self._errors[job.key] = (exc, set())
+                while len(self._errors) > self.max_results:
+                    self._errors.popitem(last=False)
+                self._jobs.pop(job.key, None)
+            return
+        with self._lock:
+            self._results[job.key] = result
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
+            self._jobs.pop(job.key, None)
@@ -0,0 +1,354 @@
+import argparse
+import collections
+import http.client
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import load_dataset
+from model_cache import series_key
+from model_pipeline import FORECAST_COLUMNS, MODEL_CACHE, compact_forecast, fit_prophet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL = os.environ.get('FORECAST_SERVER_URL', 'http://127.0.0.1:8765')
+FIT_PARAMS = ('growth', 'seasonality_mode', 'weekly_seasonality', 'monthly_seasonality', 'yearly_seasonality',
+              'holidays')
+
+
+class _Request:
+    def __init__(self, data, fit_params, horizon, series_id, components):
+        self.data = data
+        self.fit_params = fit_params
+        self.horizon = horizon
+        self.series_id = series_id
+        self.components = components
+        self.key = series_key(data, fit_params)
+        self.received = time.perf_counter()
+        self.future = Future()
+
+
+class ForecastService:
+    # Keeps fitted Prophet models resident (MODEL_CACHE, keyed by series content and fit parameters)
+    # and answers forecast requests from them. Requests arriving within batch_window of each other
+    # are coalesced: all requests for one model share a single fit and a single predict over the
+    # longest horizon asked for, and later requests slice that cached prediction until a longer
+    # horizon is needed. Different models are served in parallel on max_workers threads.
+    def __init__(self, cache=MODEL_CACHE, batch_window=0.01, max_batch=64, max_workers=2, max_predictions=64):
+        self.cache = cache
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_predictions = max_predictions
+        self._queue = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='serve')
+        self._lock = threading.Lock()
+        # Per-key lock and the number of batches holding or waiting on it; dropped at zero
+        self._key_locks = {}
+        self._predictions = collections.OrderedDict()
+        self._datasets = {}
+        self._dataset_locks = collections.defaultdict(threading.Lock)
+        self._started = time.time()
+        self._done = collections.deque(maxlen=10000)
+        self._counts = collections.Counter()
+        self._batcher = threading.Thread(target=self._collect, name='batcher', daemon=True)
+        self._batcher.start()
+
+    def series(self, dataset, date_col='Date', value_col='Close'):
+        # Bundled datasets are loaded once and shared by every request naming them. The load (and a
+        # first ingest) holds only this dataset's lock, so other requests and metrics carry on
+        key = (dataset, value_col)
+        with self._lock:
+            if key in self._datasets:
+                return self._datasets[key]
+            dataset_lock = self._dataset_locks[key]
+        with dataset_lock:
+            with self._lock:
+                if key in self._datasets:
+                    return self._datasets[key]
+            frame = load_dataset(dataset)[[date_col, value_col]].rename(columns={date_col: 'ds', value_col: 'y'})
+            frame = frame.sort_values('ds', kind='stable').reset_index(drop=True)
+            with self._lock:
+                self._datasets[key] = frame
+            return frame
+
+    def submit(self, data, fit_params, horizon, cap=None, series_id=None, components=False):
+        # data has ds and y columns; returns a Future of the compact forecast (see compact_forecast)
+        data = data[['ds', 'y']]
+        if fit_params.get('growth') == 'logistic':
+            data = data.assign(cap=1.2 * data['y'].max() if cap is None else cap)
+        request = _Request(data, {name: fit_params[name] for name in FIT_PARAMS}, int(horizon), series_id,
+                           components)
+        self._queue.put(request)
+        return request.future
+
+    def forecast(self, data, fit_params, horizon, cap=None, series_id=None, components=False, timeout=None):
+        return self.submit(data, fit_params, horizon, cap, series_id, components).result(timeout)
+
+    def _collect(self):
+        # Waits for a request, gathers whatever else arrives within batch_window, then hands out one
+        # task per model key
+        while True:
+            batch = [self._queue.get()]
+            if batch[0] is None:
+                return
+            deadline = time.perf_counter() + self.batch_window
+            while len(batch) < self.max_batch:
+                try:
+                    request = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)
+                    break
+                batch.append(request)
+            groups = collections.defaultdict(list)
+            for request in batch:
+                groups[request.key].append(request)
+            with self._lock:
+                self._counts['batches'] += 1
+                self._counts['coalesced'] += len(batch) - len(groups)
+            for key, requests in groups.items():
+                self._pool.submit(self._serve, key, requests)
+
+    def _serve(self, key, requests):
+        # One model key at a time, so overlapping batches for a model never fit it twice
+        with self._lock:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                horizon = max(request.horizon for request in requests)
+                with self._lock:
+                    prediction = self._predictions.get(key)
+                    if prediction is not None:
+                        self._predictions.move_to_end(key)
+                fresh = prediction is None or prediction['horizon'] < horizon
+                if fresh:
+                    prediction = self._predict(requests[0], horizon)
+                else:
+                    with self._lock:
+                        self._counts['prediction_hits'] += len(requests)
+        except Exception as exc:
+            logger.exception('Forecast for %s failed', key[:12])
+            with self._lock:
+                self._counts['failed'] += len(requests)
+            for request in requests:
+                request.future.set_exception(exc)
+            return
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._key_locks[key]
+
+        done = time.perf_counter()
+        for request in requests:
+            end = prediction['rows'] + request.horizon
+            result = {name: prediction[name][:end] for name in FORECAST_COLUMNS}
+            if request.components:
+                result['components'] = {name: values[:end] for name, values in prediction['components'].items()}
+            result['key'] = f'{key}-{request.horizon}'
+            result['fit_report'] = prediction['fit_report'] if fresh else \
+                {'mode': 'cached', 'rows': prediction['rows'], 'seconds': 0.0}
+            result['batch_size'] = len(requests)
+            result['server_seconds'] = done - request.received
+            request.future.set_result(result)
+        with self._lock:
+            self._counts['requests'] += len(requests)
+            self._done.extend((time.time(), done - request.received) for request in requests)
+
+    def _predict(self, request, horizon):
+        model, fit_report = fit_prophet(request.data, request.fit_params, cache=self.cache, series_id=request.series_id)
+        future = model.make_future_dataframe(periods=horizon)
+        if 'cap' in request.data:
+            future['cap'] = request.data['cap'].iloc[0]
+        # Components are kept for every model so a later request asking for them is still a slice
+        prediction = compact_forecast(model.predict(future), components=True)
+        prediction.update(rows=len(request.data), horizon=horizon, fit_report=fit_report)
+        with self._lock:
+            self._counts['predict_calls'] += 1
+            self._counts[f"fits_{fit_report['mode']}"] += 1
+            self._predictions[request.key] = prediction
+            while len(self._predictions) > self.max_predictions:
+                self._predictions.popitem(last=False)
+        return prediction
+
+    def metrics(self):
+        # Counters, latency percentiles over the last 10000 requests and throughput over the last minute
+        with self._lock:
+            done = np.array(self._done) if self._done else np.empty((0, 2))
+            report = dict(self._counts)
+            report.update(models_resident=len(self.cache), predictions_resident=len(self._predictions),
+                          keys_in_flight=len(self._key_locks), queued=self._queue.qsize(), uptime_seconds=time.time() - self._started,
+                          cache_hits=self.cache.hits, cache_misses=self.cache.misses)
+        if len(done):
+            latency = done[:, 1]
+            report.update(latency_p50_seconds=float(np.percentile(latency, 50)),
+                          latency_p95_seconds=float(np.percentile(latency, 95)),
+                          latency_p99_seconds=float(np.percentile(latency, 99)),
+                          latency_max_seconds=float(latency.max()),
+                          throughput_per_second=float((done[:, 0] >= time.time() - 60).sum() / 60))
+        if report.get('batches'):
+            report['mean_batch_size'] = (report.get('requests', 0) + report.get('failed', 0)) / report['batches']
+        return report
+
+    def close(self):
+        self._queue.put(None)
+        self._batcher.join()
+        self._pool.shutdown()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # POST /forecast with {"horizon", "params", "dataset" or "series": {"ds", "y"}, "cap", "series_id",
+    # "components"};
+    # GET /metrics and /health
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._reply(200, self.server.service.metrics())
+        elif self.path == '/health':
+            self._reply(200, {'status': 'ok'})
+        else:
+            self._reply(404, {'error': f'unknown path {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/forecast':
+            self._reply(404, {'error': f'unknown path {self.path}'})
+            return
+        service = self.server.service
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            if 'dataset' in body:
+                data = service.series(body['dataset'], value_col=body.get('value_col', 'Close'))
+            else:
+                data = pd.DataFrame({'ds': pd.to_datetime(body['series']['ds']),
+                                     'y': np.asarray(body['series']['y'], dtype=float)})
+            future = service.submit(data, body['params'], body['horizon'], body.get('cap'), body.get('series_id'),
+                                    bool(body.get('components')))
+        except (ValueError, KeyError, TypeError) as exc:
+            self._reply(400, {'error': f'{type(exc).__name__}: {exc}'})
+            return
+        try:
+            result = future.result()
+        except Exception as exc:
+            self._reply(500, {'error': f'{type(exc).__name__}: {exc}'})
+            return
+        result['ds'] = np.datetime_as_string(result['ds'], unit='s').tolist()
+        for name in FORECAST_COLUMNS[1:]:
+            result[name] = result[name].tolist()
+        if 'components' in result:
+            result['components'] = {name: values.tolist() for name, values in result['components'].items()}
+        self._reply(200, result)
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug('%s %s', self.address_string(), format % args)
+
+
+def serve(host='127.0.0.1', port=8765, **service_kwargs):
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = ForecastService(**service_kwargs)
+    return server
+
+
+class ServerError(RuntimeError):
+    # The server answered with an HTTP error status, or with a body that is not a complete JSON reply
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class ForecastClient:
+    # Thin HTTP client for the Streamlit apps. Connection failures raise OSError (nothing listening),
+    # errors reported by the server raise ServerError; callers with a local fallback catch both.
+    def __init__(self, url=DEFAULT_URL, timeout=600):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def _call(self, path, payload=None, timeout=None):
+        data = None if payload is None else json.dumps(payload, default=str).encode()
+        request = urllib.request.Request(self.url + path, data=data, headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+                body = response.read()
+        except urllib.error.HTTPError as exc:
+            try:
+                message = json.loads(exc.read()).get('error', str(exc))
+            except ValueError:
+                message = str(exc)
+            raise ServerError(message, exc.code) from None
+        except http.client.HTTPException as exc:
+            # e.g. IncompleteRead from a reply cut short
+            raise ServerError(f'{type(exc).__name__}: {exc}') from None
+        try:
+            return json.loads(body)
+        except ValueError as exc:
+            # A truncated or non-JSON body (a proxy page, a half-written reply)
+            raise ServerError(f'invalid reply from {self.url}{path}: {exc}', response.status) from None
+
+    def forecast(self, horizon, params, dataset=None, data=None, cap=None, series_id=None, components=False):
+        # Either a bundled dataset name or a frame with ds and y; returns the compact forecast (arrays,
+        # fit report, result key) with the server's batch size and timing
+        payload = {'horizon': horizon, 'params': {name: params[name] for name in FIT_PARAMS},
+                   'cap': cap, 'series_id': series_id, 'components': components}
+        if dataset is not None:
+            payload['dataset'] = dataset
+        else:
+            payload['series'] = {'ds': data['ds'].astype(str).tolist(), 'y': data['y'].astype(float).tolist()}
+        result = self._call('/forecast', payload)
+        result['ds'] = np.array(result['ds'], dtype='datetime64[ns]')
+        for name in FORECAST_COLUMNS[1:]:
+            result[name] = np.asarray(result[name], dtype=float)
+        if 'components' in result:
+            result['components'] = {name: np.asarray(values, dtype=float) for name, values in result['components'].items()}
+        result['source'] = 'server'
+        return result
+
+    def metrics(self, timeout=1.0):
+        return self._call('/metrics', timeout=timeout)
+
+    def available(self, timeout=0.5):
+        try:
+            return self._call('/health', timeout=timeout).get('status') == 'ok'
+        except (OSError, ServerError):
+            return False
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local forecast server keeping fitted Prophet models warm.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--batch-window', type=float, default=0.01, help='seconds to wait for requests to coalesce')
+    parser.add_argument('--max-batch', type=int, default=64)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+    server = serve(args.host, args.port, batch_window=args.batch_window, max_batch=args.max_batch,
+                   max_workers=args.workers)
+    logger.info('Serving forecasts on http://%s:%d', args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
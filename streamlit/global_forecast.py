@@ -0,0 +1,173 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.ensemble import HistGradientBoostingRegressor
+from threadpoolctl import threadpool_limits
+
+from backtesting import forecast_errors
+from dataset_store import load_dataset
+
+WALMART_EXOG = ('Holiday_Flag', 'Temperature', 'Fuel_Price', 'CPI', 'Unemployment')
+
+
+def _group_positions(codes):
+    # Position of every row within its series; rows must be sorted by series then time
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    lengths = np.diff(np.r_[starts, len(codes)])
+    return np.arange(len(codes)) - np.repeat(starts, lengths)
+
+
+def _shift(values, k, pos):
+    # values[t - k] within each series (k < 0 looks ahead), NaN where that crosses a series boundary
+    if k == 0:
+        # values[-0:] would be the whole array
+        return np.array(values, dtype=float)
+    out = np.full(len(values), np.nan)
+    if k > 0:
+        out[k:] = values[:-k]
+        out[pos < k] = np.nan
+    else:
+        out[:k] = values[-k:]
+        lengths = np.bincount(np.cumsum(pos == 0) - 1)
+        remaining = np.repeat(lengths, lengths) - pos - 1
+        out[remaining < -k] = np.nan
+    return out
+
+
+def grouped_features(frame, id_col='Store', date_col='Date', target='Weekly_Sales', exog=WALMART_EXOG,
+                     lags=(1, 2, 3, 4), windows=(4, 13), holiday_leads=(1,), scale=None, stores=None):
+    # Features for every series in one vectorized pass over the sorted frame: target lags and
+    # past-window means (rows t - w .. t - 1), exogenous columns, known-ahead holiday flags, week
+    # of year and a store id. With `scale` (per-store divisor, e.g. the training mean) target
+    # features are on a common scale across stores. `stores` fixes the store id encoding (the
+    # training stores, in order) so a frame holding only some stores gets the same ids; stores
+    # outside it raise. Returns (X, y, frame sorted like X).
+    frame = frame.sort_values([id_col, date_col], kind='stable').reset_index(drop=True)
+    if stores is None:
+        codes, stores = pd.factorize(frame[id_col], sort=True)
+    else:
+        codes = pd.Index(stores).get_indexer(frame[id_col])
+        if (codes < 0).any():
+            unseen = sorted(frame.loc[codes < 0, id_col].unique().tolist())
+            raise ValueError(f'{id_col} values not seen in training: {unseen}')
+    pos = _group_positions(codes)
+    values = frame[target].to_numpy(dtype=float)
+    if scale is not None:
+        values = values / pd.Series(scale).reindex(stores).to_numpy()[codes]
+
+    columns = {'store_id': codes}
+    for k in lags:
+        columns[f'lag_{k}'] = _shift(values, k, pos)
+    if len(windows):
+        cumsum = np.r_[0.0, np.cumsum(values)]
+        index = np.arange(len(values))
+        for w in windows:
+            mean = (cumsum[index] - cumsum[np.maximum(index - w, 0)]) / w
+            columns[f'roll{w}_mean'] = np.where(pos >= w, mean, np.nan)
+    for name in exog:
+        columns[name] = frame[name].to_numpy(dtype=float)
+    if 'Holiday_Flag' in frame:
+        holidays = frame['Holiday_Flag'].to_numpy(dtype=float)
+        for k in holiday_leads:
+            columns[f'holiday_lead_{k}'] = _shift(holidays, -k, pos)
+    dates = pd.DatetimeIndex(frame[date_col])
+    columns['week'] = dates.isocalendar().week.to_numpy(dtype=float)
+    X = pd.DataFrame(columns)
+    return X, pd.Series(values, name=target), frame
+
+
+class GlobalForecaster(BaseEstimator, RegressorMixin):
+    # One model for all stores: features from grouped_features, targets scaled by each store's
+    # training mean, store identity as a categorical feature (an ID the trees can split on, the
+    # tabular stand-in for an embedding). predict() covers every store in one batched call.
+    def __init__(self, estimator=None, id_col='Store', date_col='Date', target='Weekly_Sales',
+                 exog=WALMART_EXOG, lags=(1, 2, 3, 4), windows=(4, 13)):
+        self.estimator = estimator
+        self.id_col = id_col
+        self.date_col = date_col
+        self.target = target
+        self.exog = exog
+        self.lags = lags
+        self.windows = windows
+
+    def _features(self, frame):
+        return grouped_features(frame, self.id_col, self.date_col, self.target, self.exog,
+                                self.lags, self.windows, scale=self.scale_, stores=self.stores_)
+
+    def fit(self, frame, y=None):
+        self.scale_ = frame.groupby(self.id_col)[self.target].mean()
+        # Store ids are fixed at fit time; predict encodes any subset of stores the same way
+        self.stores_ = self.scale_.index
+        X, y, _ = self._features(frame)
+        keep = X.notna().all(axis=1).to_numpy()
+        # Native categorical splits on the store id need at most 255 stores; beyond that it stays ordinal
+        estimator = self.estimator if self.estimator is not None else HistGradientBoostingRegressor(
+            categorical_features=[0] if len(self.scale_) <= 255 else None, random_state=0)
+        self.model_ = clone(estimator).fit(X[keep], y[keep])
+        return self
+
+    def predict(self, frame, start=None):
+        # One-step-ahead predictions for the rows of frame dated >= start (all rows by default);
+        # frame must include enough history before start for the lags and only stores seen in
+        # fit. Returns the rows with a 'prediction' column in the original units.
+        X, _, ordered = self._features(frame)
+        rows = np.ones(len(X), dtype=bool) if start is None else (ordered[self.date_col] >= start).to_numpy()
+        scale = self.scale_.reindex(ordered.loc[rows, self.id_col]).to_numpy()
+        result = ordered.loc[rows, [self.id_col, self.date_col, self.target]].copy()
+        result['prediction'] = self.model_.predict(X[rows]) * scale
+        return result
+
+
+def _fit_store(estimator, store_frame, start, **kwargs):
+    with threadpool_limits(1):
+        model = GlobalForecaster(estimator, **kwargs).fit(store_frame[store_frame[kwargs['date_col']] < start])
+        return model.predict(store_frame, start)
+
+
+def per_store_forecast(frame, start, estimator=None, n_jobs=None, id_col='Store', date_col='Date',
+                       target='Weekly_Sales', **kwargs):
+    # Fallback for comparison: one model per store, fitted in parallel. Same features as the
+    # global model (the store id is then constant), same output layout as GlobalForecaster.predict.
+    kwargs = dict(kwargs, id_col=id_col, date_col=date_col, target=target)
+    parts = Parallel(n_jobs=n_jobs)(delayed(_fit_store)(estimator, group, start, **kwargs)
+                                    for _, group in frame.groupby(id_col, sort=True))
+    return pd.concat(parts, ignore_index=True)
+
+
+def compare_global_local(frame, test_periods=20, estimator=None, n_jobs=None, date_col='Date', target='Weekly_Sales'):
+    # Fits both paths on all but the last test_periods dates and scores one-step predictions on them
+    dates = np.sort(frame[date_col].unique())
+    start = dates[-test_periods]
+    rows = {}
+
+    begin = time.perf_counter()
+    model = GlobalForecaster(estimator, date_col=date_col, target=target).fit(frame[frame[date_col] < start])
+    fit_seconds = time.perf_counter() - begin
+    begin = time.perf_counter()
+    global_pred = model.predict(frame, start)
+    predict_seconds = time.perf_counter() - begin
+    rows['global'] = {'models': 1, 'fit_seconds': fit_seconds, 'predict_seconds': predict_seconds,
+                      'total_seconds': fit_seconds + predict_seconds}
+
+    begin = time.perf_counter()
+    local_pred = per_store_forecast(frame, start, estimator, n_jobs, date_col=date_col, target=target)
+    # Workers fit and predict together, so only the total is comparable
+    rows['per_store'] = {'models': local_pred.iloc[:, 0].nunique(), 'fit_seconds': np.nan, 'predict_seconds': np.nan,
+                         'total_seconds': time.perf_counter() - begin}
+
+    for name, pred in [('global', global_pred), ('per_store', local_pred)]:
+        errors = forecast_errors(pred[[target]].to_numpy(), pred[['prediction']].to_numpy())
+        rows[name].update(errors.attrs['summary'])
+    return pd.DataFrame(rows).T
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Global vs per-store models on walmart.csv.')
+    parser.add_argument('--test-weeks', type=int, default=20)
+    parser.add_argument('--jobs', type=int, default=None)
+    args = parser.parse_args()
+    print(compare_global_local(load_dataset('walmart'), args.test_weeks, n_jobs=args.jobs).to_string())
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from sklearn.base import BaseEstimator, TransformerMixin
+
+WINDOW_STATS = ('mean', 'std', 'min', 'max')
+
+
+class LagFeatureTransformer(BaseEstimator, TransformerMixin):
+    # Lags, leads, differences and past-window aggregates for any set of columns, written into
+    # one preallocated float32 block next to the input columns, which keep their own dtypes
+    # (datetimes, categories and float64 targets pass through untouched). The input frame is
+    # never modified. Window aggregates cover
+    # the `w` rows before t (not t itself), so they are safe to use as predictors of the target.
+    def __init__(self, n_lags=5, columns=None, lags=None, leads=(), diffs=(), windows=(),
+                 window_stats=('mean',), dropna=True):
+        self.n_lags = n_lags
+        self.columns = columns
+        self.lags = lags
+        self.leads = leads
+        self.diffs = diffs
+        self.windows = windows
+        self.window_stats = window_stats
+        self.dropna = dropna
+
+    def fit(self, X, y=None):
+        return self
+
+    def _lags(self):
+        return list(self.lags) if self.lags is not None else list(range(1, self.n_lags + 1))
+
+    def lookback(self):
+        # Rows of history a row needs before all of its features are defined
+        return max([0] + self._lags() + list(self.diffs) + list(self.windows))
+
+    def lookahead(self):
+        return max([0] + list(self.leads))
+
+    def _columns(self, X):
+        if self.columns is not None:
+            return list(self.columns)
+        return list(X.select_dtypes('number').columns)
+
+    def feature_names(self, X):
+        return list(X.columns) + self._generated_names(X)
+
+    def _generated_names(self, X):
+        columns = self._columns(X)
+        names = [f'{c}_lag_{k}' for k in self._lags() for c in columns]
+        names += [f'{c}_lead_{k}' for k in self.leads for c in columns]
+        names += [f'{c}_diff_{k}' for k in self.diffs for c in columns]
+        names += [f'{c}_roll{w}_{stat}' for w in self.windows for stat in self.window_stats for c in columns]
+        return names
+
+    def _build(self, X):
+        for stat in self.window_stats:
+            if stat not in WINDOW_STATS:
+                raise ValueError(f'unknown window stat {stat!r}; expected one of {WINDOW_STATS}')
+        # Only the generated features go into the float32 block
+        columns = self._columns(X)
+        names = self._generated_names(X)
+        values = X[columns].to_numpy(dtype=np.float64)
+        n, c = values.shape
+        out = np.full((n, len(names)), np.nan, dtype=np.float32)
+        pos = 0
+
+        for k in self._lags():
+            if k < n:
+                out[k:, pos:pos + c] = values[:n - k]
+            pos += c
+        for k in self.leads:
+            if k < n:
+                out[:n - k, pos:pos + c] = values[k:]
+            pos += c
+        for k in self.diffs:
+            if k < n:
+                out[k:, pos:pos + c] = values[k:] - values[:n - k]
+            pos += c
+
+        if len(self.windows):
+            c1 = np.concatenate([np.zeros((1, c)), np.cumsum(values, axis=0)])
+            c2 = np.concatenate([np.zeros((1, c)), np.cumsum(values ** 2, axis=0)]) if 'std' in self.window_stats else None
+        for w in self.windows:
+            for stat in self.window_stats:
+                if w < n:
+                    # Row t aggregates values[t - w:t]
+                    if stat == 'mean':
+                        out[w:, pos:pos + c] = (c1[w:n] - c1[:n - w]) / w
+                    elif stat == 'std':
+                        s1, s2 = c1[w:n] - c1[:n - w], c2[w:n] - c2[:n - w]
+                        out[w:, pos:pos + c] = np.sqrt(np.maximum(s2 - s1 * s1 / w, 0.0) / max(w - 1, 1))
+                    else:
+                        view = sliding_window_view(values[:n - 1], w, axis=0)
+                        out[w:, pos:pos + c] = view.min(axis=-1) if stat == 'min' else view.max(axis=-1)
+                pos += c
+        return out, names
+
+    @staticmethod
+    def _frame(X, out, names, lo, hi, dropna=False):
+        passthrough, block = X.iloc[lo:hi], out[lo:hi]
+        if dropna:
+            # Rows inside the slice can still be incomplete where the input has gaps; one NaN scan
+            # finds them, and gap-free input keeps the slice without a copy
+            keep = ~np.isnan(block).any(axis=1) & passthrough.notna().all(axis=1).to_numpy()
+            if not keep.all():
+                passthrough, block = passthrough[keep], block[keep]
+        generated = pd.DataFrame(block, index=passthrough.index, columns=names, copy=False)
+        return pd.concat([passthrough, generated], axis=1)
+
+    def transform(self, X):
+        out, names = self._build(X)
+        lo, hi = 0, len(X)
+        if self.dropna:
+            # The first lookback and last lookahead rows are always incomplete
+            lo, hi = self.lookback(), len(X) - self.lookahead()
+        return self._frame(X, out, names, lo, hi, self.dropna)
+
+    def transform_chunks(self, chunks):
+        # Streaming transform over an iterable of frames (e.g. read_csv(chunksize=...)). The last
+        # lookback + lookahead rows of each chunk are carried into the next, so the output equals
+        # transform() on the concatenated input while only one chunk is held in memory.
+        lookback, lookahead = self.lookback(), self.lookahead()
+        carry = None
+        for chunk in chunks:
+            frame = chunk if carry is None else pd.concat([carry, chunk])
+            out, names = self._build(frame)
+            carried = 0 if carry is None else len(carry)
+            lo, hi = max(lookback, carried - lookahead), len(frame) - lookahead
+            if hi > lo:
+                yield self._frame(frame, out, names, lo, hi, self.dropna)
+            carry = frame.iloc[max(len(frame) - lookback - lookahead, 0):]
@@ -1,9 +1,18 @@
+import time
+import uuid
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-from preprocessing import preprocess_data
-from model_pipeline import prophet_forecast
+from preprocessing import index_by_date, preprocess_data
+from dataset_store import load_dataset
+from downsampling import aggregate_ohlc, line_trace
+from rolling_stats import RollingStats
+from forecast_jobs import ForecastJobRunner
+from model_pipeline import prophet_forecast, render_forecast
+from forecast_server import ForecastClient, ServerError
+from backends import import_report
+from profiling import Profiler
 
 # Set Streamlit page configuration
 st.set_page_config(
@@ -58,22 +67,39 @@ st.markdown("""
 This application provides an analysis of Nvidia's stock prices using various visualizations and a forecasting model.
 """)
 
+# Per-stage wall/CPU/memory of this rerun; the sampling profiler also lists each stage's hottest functions
+st.sidebar.subheader("Profiling")
+show_profile = st.sidebar.checkbox("Show Stage Timings", value=False)
+sample_profile = st.sidebar.checkbox("Sampling Profiler", value=False, disabled=not show_profile)
+profiler = Profiler(sample=show_profile and sample_profile)
+
 # Load data
-@st.cache_data
+@st.cache_resource
 def load_data():
-    data = pd.read_csv('NVDA.csv')
-    data['Date'] = pd.to_datetime(data['Date'])
-    return data
+    # Memory-mapped columnar copy of NVDA.csv, rebuilt automatically when the CSV changes
+    data = load_dataset('nvda')
+    return index_by_date(data)
 
-data = load_data()
+with profiler.span('load') as span:
+    data = load_data()
+    span['rows'] = len(data)
 
 # Sidebar for date range selection
 st.sidebar.subheader("Select Date Range")
-start_date = st.sidebar.date_input("Start Date", min_value=data['Date'].min(), max_value=data['Date'].max(), value=data['Date'].min())
-end_date = st.sidebar.date_input("End Date", min_value=start_date, max_value=data['Date'].max(), value=data['Date'].max())
+first_date, last_date = data.index[0], data.index[-1]
+start_date = st.sidebar.date_input("Start Date", min_value=first_date, max_value=last_date, value=first_date)
+end_date = st.sidebar.date_input("End Date", min_value=start_date, max_value=last_date, value=last_date)
 
 # Filter data based on selected date range
-filtered_data = preprocess_data(data, start_date, end_date)
+with profiler.span('filter') as span:
+    filtered_data = preprocess_data(data, start_date, end_date)
+    span['rows'] = len(filtered_data)
+
+# One RollingStats per date range holds O(rows) cumulative sums; each slider window's columns are
+# computed on first use and kept, so returning to a window is a lookup
+@st.cache_resource(max_entries=16)
+def rolling_stats(start_date, end_date):
+    return RollingStats(preprocess_data(data, start_date, end_date)['Close'].values, windows=range(2, 51))
 
 # Display filtered data
 if st.checkbox("Show Data", False):
@@ -86,53 +112,67 @@ show_close = st.sidebar.checkbox("Close", value=True)
 show_low = st.sidebar.checkbox("Low", value=True)
 show_high = st.sidebar.checkbox("High", value=True)
 show_volume = st.sidebar.checkbox("Volume", value=False)
+# Charts are decimated to this many points; narrowing the date range re-aggregates at finer detail
+max_points = st.sidebar.number_input("Max Points per Chart", min_value=100, max_value=50000, value=2000, step=100)
 
 # Line Chart
 st.markdown("### Line Chart")
-fig_line = go.Figure()
-
-if show_open:
-    fig_line.add_trace(go.Scatter(x=filtered_data['Date'], y=filtered_data['Open'], mode='lines', name='Open'))
-if show_close:
-    fig_line.add_trace(go.Scatter(x=filtered_data['Date'], y=filtered_data['Close'], mode='lines', name='Close'))
-if show_low:
-    fig_line.add_trace(go.Scatter(x=filtered_data['Date'], y=filtered_data['Low'], mode='lines', name='Low'))
-if show_high:
-    fig_line.add_trace(go.Scatter(x=filtered_data['Date'], y=filtered_data['High'], mode='lines', name='High'))
-if show_volume:
-    fig_line.add_trace(go.Scatter(x=filtered_data['Date'], y=filtered_data['Volume'], mode='lines', name='Volume', yaxis='y2'))
-    fig_line.update_layout(yaxis2=dict(title='Volume', overlaying='y', side='right'))
-
-st.plotly_chart(fig_line, use_container_width=True)
+dates = filtered_data['Date'].values
+with profiler.span('plot', chart='line', rows=len(filtered_data)):
+    fig_line = go.Figure()
+    if show_open:
+        fig_line.add_trace(line_trace(dates, filtered_data['Open'].values, 'Open', max_points))
+    if show_close:
+        fig_line.add_trace(line_trace(dates, filtered_data['Close'].values, 'Close', max_points))
+    if show_low:
+        fig_line.add_trace(line_trace(dates, filtered_data['Low'].values, 'Low', max_points))
+    if show_high:
+        fig_line.add_trace(line_trace(dates, filtered_data['High'].values, 'High', max_points))
+    if show_volume:
+        fig_line.add_trace(line_trace(dates, filtered_data['Volume'].values, 'Volume', max_points, yaxis='y2'))
+        fig_line.update_layout(yaxis2=dict(title='Volume', overlaying='y', side='right'))
+    st.plotly_chart(fig_line, use_container_width=True)
+
+with profiler.span('resample', rows=len(filtered_data)):
+    candles = aggregate_ohlc(filtered_data, max_points)
 
 # Candlestick Chart
 st.markdown("### Candlestick Chart")
-fig_candle = go.Figure(data=[go.Candlestick(x=filtered_data['Date'],
-                                             open=filtered_data['Open'],
-                                             high=filtered_data['High'],
-                                             low=filtered_data['Low'],
-                                             close=filtered_data['Close'])])
-st.plotly_chart(fig_candle, use_container_width=True)
+with profiler.span('plot', chart='candlestick', rows=len(candles)):
+    fig_candle = go.Figure(data=[go.Candlestick(x=candles['Date'],
+                                                 open=candles['Open'],
+                                                 high=candles['High'],
+                                                 low=candles['Low'],
+                                                 close=candles['Close'])])
+    st.plotly_chart(fig_candle, use_container_width=True)
 
 # OHLC Chart
 st.markdown("### OHLC Chart")
-fig_ohlc = go.Figure(data=[go.Ohlc(x=filtered_data['Date'],
-                                   open=filtered_data['Open'],
-                                   high=filtered_data['High'],
-                                   low=filtered_data['Low'],
-                                   close=filtered_data['Close'])])
-st.plotly_chart(fig_ohlc, use_container_width=True)
+with profiler.span('plot', chart='ohlc', rows=len(candles)):
+    fig_ohlc = go.Figure(data=[go.Ohlc(x=candles['Date'],
+                                       open=candles['Open'],
+                                       high=candles['High'],
+                                       low=candles['Low'],
+                                       close=candles['Close'])])
+    st.plotly_chart(fig_ohlc, use_container_width=True)
 
 # Moving Average
 st.sidebar.subheader("Moving Average")
 window = st.sidebar.slider("Moving Average Window", min_value=2, max_value=50, value=10)
-filtered_data['Close_Moving_Avg'] = filtered_data['Close'].rolling(window=window).mean()
+show_bollinger = st.sidebar.checkbox("Bollinger Bands", value=False)
+with profiler.span('feature build', rows=len(filtered_data)):
+    close_stats = rolling_stats(start_date, end_date)
 st.markdown("### Moving Average")
-fig_avg = go.Figure()
-fig_avg.add_trace(go.Scatter(x=filtered_data['Date'], y=filtered_data['Close'], mode='lines', name='Close'))
-fig_avg.add_trace(go.Scatter(x=filtered_data['Date'], y=filtered_data['Close_Moving_Avg'], mode='lines', name='Moving Average'))
-fig_avg.update_layout(xaxis_rangeslider_visible=False)
-st.plotly_chart(fig_avg, use_container_width=True)
+with profiler.span('plot', chart='moving average', rows=len(filtered_data)):
+    fig_avg = go.Figure()
+    fig_avg.add_trace(line_trace(dates, filtered_data['Close'].values, 'Close', max_points))
+    fig_avg.add_trace(line_trace(dates, close_stats.mean(window), 'Moving Average', max_points))
+    if show_bollinger:
+        _, upper_band, lower_band = close_stats.bollinger(window)
+        fig_avg.add_trace(line_trace(dates, upper_band, 'Upper Band', max_points, line=dict(dash='dot')))
+        fig_avg.add_trace(line_trace(dates, lower_band, 'Lower Band', max_points, line=dict(dash='dot')))
+    fig_avg.update_layout(xaxis_rangeslider_visible=False)
+    st.plotly_chart(fig_avg, use_container_width=True)
 
 # Prophet Forecasting
 st.header('Prophet Forecasting')
@@ -146,6 +186,72 @@ prophet_params = {
     'holidays': st.sidebar.selectbox('Holidays Country', options=['None', 'US', 'CA', 'UK', 'FR', 'DE', 'ES', 'IT'])
 }
 
-# Display Prophet Forecasting results
-forecast, fig_forecast = prophet_forecast(data, **prophet_params)
-st.plotly_chart(fig_forecast, use_container_width=True)
+# Forecasts are fitted in the background; identical settings across sessions share one job
+@st.cache_resource
+def forecast_runner():
+    return ForecastJobRunner(max_workers=2, debounce=0.4)
+
+# Models live in the forecast server (python forecast_server.py), shared by every session and
+# Streamlit worker; without a server running the forecast is computed in this process
+@st.cache_resource
+def forecast_client():
+    return ForecastClient()
+
+def served_forecast(data, horizon, **fit_params):
+    # Compact arrays only; the figure is rendered (and cached) below when the result is shown
+    # A server that is down or answers with an error (e.g. a 500) degrades to the local fit
+    try:
+        return forecast_client().forecast(horizon, fit_params, dataset='nvda')
+    except (OSError, ServerError):
+        result = prophet_forecast(data, horizon, **fit_params)
+        result['source'] = 'local'
+        return result
+
+if 'session_id' not in st.session_state:
+    st.session_state['session_id'] = uuid.uuid4().hex
+job_key = tuple(sorted(prophet_params.items()))
+# The fit itself runs on a worker thread; its own timing comes back in the fit report
+with profiler.span('forecast', rows=len(data)) as forecast_span:
+    status, result = forecast_runner().request(st.session_state['session_id'], job_key, served_forecast,
+                                               data, **prophet_params)
+
+# Display Prophet Forecasting results, keeping the last good forecast on screen while a new one is fitted
+if status == 'failed':
+    st.error(f'Forecast failed: {result}')
+elif result is not None:
+    with profiler.span('plot', chart='forecast', rows=len(result['ds'])):
+        st.plotly_chart(render_forecast(data, result, max_points), use_container_width=True)
+    fit_report = result.get('fit_report')
+    if fit_report:
+        forecast_span.update(job_status=status, fit_mode=fit_report['mode'], fit_seconds=fit_report['seconds'],
+                             source=result.get('source'))
+    if status == 'pending':
+        st.caption('Updating forecast for the new settings...')
+    elif fit_report and fit_report['mode'] != 'cached':
+        st.caption(f"{fit_report['mode'].capitalize()} fit on {fit_report['rows']} rows in {fit_report['seconds']:.2f}s "
+                   f"({fit_report['speedup']:.1f}x vs cold fit)")
+else:
+    st.info('Fitting forecast...')
+
+with st.sidebar.expander('Forecast server'):
+    try:
+        st.json(forecast_client().metrics())
+    except OSError:
+        st.write('Not running; forecasts are computed in this process.')
+
+# Model libraries are imported on first use; show what this worker has paid so far
+with st.sidebar.expander('Backend import times'):
+    for row in import_report():
+        st.write(f"{row['backend']}: {row['seconds']:.2f}s" if row['loaded'] else f"{row['backend']}: not loaded")
+
+if show_profile:
+    with st.expander('Stage timings', expanded=True):
+        st.dataframe(profiler.to_frame(), use_container_width=True)
+        if profiler.sample:
+            st.dataframe(profiler.hotspots(), use_container_width=True)
+        st.download_button('Download JSON', profiler.to_json(), file_name=f'{profiler.run_name}.json')
+        st.download_button('Download CSV', profiler.to_frame().to_csv(index=False), file_name=f'{profiler.run_name}.csv')
+
+if status == 'pending':
+    time.sleep(0.5)
+    st.rerun()
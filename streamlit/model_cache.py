@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from backends import load_backend
+
+
+def series_key(data, params):
+    # Content hash of the training frame plus the parameters that affect the fit
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def config_key(params):
+    # Hash of the fit parameters alone, shared by every series fitted with them
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ModelCache:
+    def __init__(self, max_entries=32, cache_dir=None, max_disk_bytes=512 * 1024 ** 2):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._latest = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f'{key}.json')
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+        model = self._load(key)
+        with self._lock:
+            if model is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, model)
+        return model
+
+    def put(self, key, model, config=None, report=None):
+        with self._lock:
+            self._remember(key, model)
+            if config is not None:
+                self._latest[config] = (key, report)
+        self._store(key, model)
+        if config is not None and self.cache_dir:
+            with open(os.path.join(self.cache_dir, f'{config}.latest'), 'w') as fp:
+                json.dump({'key': key, 'report': report}, fp)
+
+    def latest(self, config):
+        # Most recently fitted model for a parameter configuration, on any series
+        with self._lock:
+            entry = self._latest.get(config)
+        if entry is None and self.cache_dir:
+            try:
+                with open(os.path.join(self.cache_dir, f'{config}.latest'), 'r') as fp:
+                    pointer = json.load(fp)
+                entry = (pointer['key'], pointer['report'])
+            except (OSError, ValueError, KeyError):
+                return None
+        if entry is None:
+            return None
+        key, report = entry
+        model = self.get(key)
+        if model is None:
+            return None
+        return model, report
+
+    def __len__(self):
+        with self._lock:
+            return len(self._memory)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._latest.clear()
+
+    def _remember(self, key, model):
+        self._memory[key] = model
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r') as fp:
+                model = load_backend('prophet').serialize.model_from_json(fp.read())
+        except (OSError, ValueError):
+            return None
+        # Touch the file so disk eviction follows recency of use
+        os.utime(path)
+        return model
+
+    def _store(self, key, model):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as fp:
+            fp.write(load_backend('prophet').serialize.model_to_json(model))
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                pass
+            total -= size
@@ -1,11 +1,26 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
-from prophet import Prophet
 import plotly.express as px
+from backends import load_backend
+from model_cache import ModelCache, config_key, series_key
+from downsampling import WEBGL_THRESHOLD, line_trace, lttb_indices
 
-def prophet_forecast(data, horizon, growth, seasonality_mode, weekly_seasonality, monthly_seasonality, yearly_seasonality, holidays):
-    data = data.rename(columns={'Date': 'ds', 'Close': 'y'})
-    
-    model = Prophet(
+logger = logging.getLogger(__name__)
+
+# Fitted models shared across reruns; set PROPHET_CACHE_DIR to also keep them on disk
+MODEL_CACHE = ModelCache(
+    max_entries=int(os.environ.get('PROPHET_CACHE_ENTRIES', 32)),
+    cache_dir=os.environ.get('PROPHET_CACHE_DIR'),
+    max_disk_bytes=int(os.environ.get('PROPHET_CACHE_MAX_BYTES', 512 * 1024 ** 2))
+)
+
+def build_prophet(growth, seasonality_mode, weekly_seasonality, monthly_seasonality, yearly_seasonality, holidays):
+    model = load_backend('prophet').Prophet(
         growth=growth,
         seasonality_mode=seasonality_mode,
         weekly_seasonality=weekly_seasonality,
@@ -14,23 +29,145 @@ def prophet_forecast(data, horizon, growth, seasonality_mode, weekly_seasonality
 
     if holidays != 'None':
         model.add_country_holidays(country_name=holidays)
-        
+
     if monthly_seasonality:
         model.add_seasonality(name='monthly', period=30.5, fourier_order=5)
-    
-    model.fit(data)
-    future = model.make_future_dataframe(periods=horizon)
-    
+    return model
+
+def stan_init(model):
+    # Fitted parameters of a previous model, used to seed the optimizer of the next fit
+    init = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        init[name] = model.params[name][0][0]
+    for name in ['delta', 'beta']:
+        init[name] = model.params[name][0]
+    return init
+
+def extends_history(model, data):
+    # True when data is the model's training history with new rows appended
+    history = model.history
+    n = len(history)
+    if len(data) <= n:
+        return False
+    head = data.iloc[:n]
+    return (np.array_equal(head['ds'].values, history['ds'].values)
+            and np.allclose(head['y'].values, history['y'].values))
+
+def fit_prophet(data, fit_params, cache=MODEL_CACHE, warm_start=True, series_id=None, measure_cold=False):
+    key = series_key(data, fit_params)
+    model = cache.get(key) if cache is not None else None
+    if model is not None:
+        return model, {'mode': 'cached', 'rows': len(data), 'seconds': 0.0}
+
+    config = config_key({**fit_params, 'series_id': series_id})
+    previous = cache.latest(config) if cache is not None and warm_start else None
+
+    model = build_prophet(**fit_params)
+    start = time.perf_counter()
+    mode = 'cold'
+    if previous is not None and extends_history(previous[0], data):
+        try:
+            model.fit(data, init=stan_init(previous[0]))
+            mode = 'warm'
+        except (RuntimeError, ValueError) as exc:
+            # Parameter shapes can change, e.g. when new rows bring new holidays
+            logger.info('Warm start failed, falling back to a cold fit: %s', exc)
+            model = build_prophet(**fit_params)
+            start = time.perf_counter()
+            model.fit(data)
+    else:
+        model.fit(data)
+    seconds = time.perf_counter() - start
+
+    report = {'mode': mode, 'rows': len(data), 'seconds': seconds, 'cold_seconds': seconds}
+    if mode == 'warm':
+        report['new_rows'] = len(data) - len(previous[0].history)
+        if measure_cold:
+            start = time.perf_counter()
+            build_prophet(**fit_params).fit(data)
+            report['cold_seconds'] = time.perf_counter() - start
+        else:
+            # Estimate from the last cold fit of this configuration
+            report['cold_seconds'] = (previous[1] or {}).get('cold_seconds', seconds)
+    report['speedup'] = report['cold_seconds'] / seconds if seconds > 0 else 1.0
+    logger.info('Prophet %s fit on %d rows in %.2fs (%.1fx vs cold)', mode, len(data), seconds, report['speedup'])
+
+    if cache is not None:
+        cache.put(key, model, config=config, report=report)
+    return model, report
+
+FORECAST_COLUMNS = ('ds', 'yhat', 'yhat_lower', 'yhat_upper')
+COMPONENTS = ('trend', 'weekly', 'monthly', 'yearly', 'holidays', 'additive_terms', 'multiplicative_terms')
+
+def compact_forecast(forecast, components=False):
+    # ds and yhat with its bounds as plain arrays, plus the component columns Prophet produced when
+    # asked; the wide predict frame is dropped here
+    result = {name: forecast[name].to_numpy() for name in FORECAST_COLUMNS}
+    if components:
+        result['components'] = {name: forecast[name].to_numpy() for name in COMPONENTS if name in forecast}
+    return result
+
+def forecast_frame(result):
+    # The compact result as a four-column DataFrame, e.g. for writing it out
+    return pd.DataFrame({name: result[name] for name in FORECAST_COLUMNS})
+
+def prophet_forecast(data, horizon, growth, seasonality_mode, weekly_seasonality, monthly_seasonality, yearly_seasonality, holidays, cache=MODEL_CACHE, warm_start=True, series_id=None, components=False):
+    # Fit (or reuse) and predict only; the figure is built by render_forecast when it is displayed
+    data = data[['Date', 'Close']].rename(columns={'Date': 'ds', 'Close': 'y'})
+
     if growth == 'logistic':
         cap = 1.2 * data['y'].max()
         data['cap'] = cap
+
+    fit_params = {
+        'growth': growth,
+        'seasonality_mode': seasonality_mode,
+        'weekly_seasonality': weekly_seasonality,
+        'monthly_seasonality': monthly_seasonality,
+        'yearly_seasonality': yearly_seasonality,
+        'holidays': holidays
+    }
+    model, fit_report = fit_prophet(data, fit_params, cache=cache, warm_start=warm_start, series_id=series_id)
+
+    future = model.make_future_dataframe(periods=horizon)
+
+    if growth == 'logistic':
         future['cap'] = cap
-        
-    forecast = model.predict(future)
-    
-    fig = px.scatter(data, x='ds', y='y', labels={'ds': 'Date', 'y': 'Close'})
-    fig.add_scatter(x=forecast['ds'], y=forecast['yhat'], mode='lines', name='Forecast')
-    fig.add_scatter(x=forecast['ds'], y=forecast['yhat_lower'], mode='lines', name='Lower Bound', line=dict(dash='dash'))
-    fig.add_scatter(x=forecast['ds'], y=forecast['yhat_upper'], mode='lines', name='Upper Bound', line=dict(dash='dash'))
-    
-    return forecast, fig
+
+    result = compact_forecast(model.predict(future), components)
+    result['fit_report'] = fit_report
+    result['key'] = series_key(data, {**fit_params, 'horizon': horizon})
+    return result
+
+def forecast_figure(history, forecast, max_points=2000):
+    # Observed points (ds, y) and forecast lines are decimated to max_points each; forecast is a
+    # compact result or any frame with the same columns
+    observed = history.iloc[lttb_indices(history['ds'].values, history['y'].values, max_points)]
+    fig = px.scatter(observed, x='ds', y='y', labels={'ds': 'Date', 'y': 'Close'},
+                     render_mode='webgl' if len(observed) > WEBGL_THRESHOLD else 'svg')
+    ds = np.asarray(forecast['ds'])
+    fig.add_trace(line_trace(ds, np.asarray(forecast['yhat']), 'Forecast', max_points))
+    fig.add_trace(line_trace(ds, np.asarray(forecast['yhat_lower']), 'Lower Bound', max_points, line=dict(dash='dash')))
+    fig.add_trace(line_trace(ds, np.asarray(forecast['yhat_upper']), 'Upper Bound', max_points, line=dict(dash='dash')))
+    return fig
+
+# Figures of recently displayed forecasts, keyed by the result's key and the point budget
+FIGURE_CACHE = OrderedDict()
+FIGURE_CACHE_ENTRIES = 16
+_figure_lock = threading.Lock()
+
+def render_forecast(history, result, max_points=2000):
+    # forecast_figure for a compact result, built once per (result key, max_points); history is the
+    # Date/Close frame the result was computed from
+    key = (result.get('key'), max_points)
+    with _figure_lock:
+        if key[0] is not None and key in FIGURE_CACHE:
+            FIGURE_CACHE.move_to_end(key)
+            return FIGURE_CACHE[key]
+    fig = forecast_figure(history[['Date', 'Close']].rename(columns={'Date': 'ds', 'Close': 'y'}), result, max_points)
+    if key[0] is not None:
+        with _figure_lock:
+            FIGURE_CACHE[key] = fig
+            while len(FIGURE_CACHE) > FIGURE_CACHE_ENTRIES:
+                FIGURE_CACHE.popitem(last=False)
+    return fig
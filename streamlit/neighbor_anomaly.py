@@ -0,0 +1,126 @@
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.neighbors import BallTree, KDTree
+
+TREES = {'kd_tree': KDTree, 'ball_tree': BallTree}
+
+
+def iter_chunks(X, chunk_size):
+    # Row slices of X; for np.memmap / np.load(mmap_mode='r') input only one chunk is in memory
+    rows = X.iloc if hasattr(X, 'iloc') else X
+    for start in range(0, len(X), chunk_size):
+        yield np.asarray(rows[start:start + chunk_size], dtype=float)
+
+
+class NeighborAnomalyDetector:
+    # Distance to the k-th nearest reference point as the anomaly score, from a KD-tree or
+    # ball tree instead of DBSCAN's all-pairs neighbourhoods. With eps and min_samples it
+    # reproduces DBSCAN's core test: a point is flagged when fewer than min_samples points
+    # (itself included) lie within eps. For min_samples=2 that is exactly DBSCAN noise.
+    # Without eps, the threshold is the (1 - contamination) quantile of the reference scores.
+    # New points go to a second, small tree that is merged into the main one once it reaches
+    # rebuild_ratio of its size, so most inserts never rebuild the big tree. max_index_points
+    # caps the index with a reservoir sample, so memory stays fixed however many windows arrive.
+    def __init__(self, min_samples=2, eps=None, contamination=0.01, algorithm='kd_tree', leaf_size=40,
+                 chunk_size=50000, n_jobs=None, rebuild_ratio=0.25, max_index_points=None, random_state=0):
+        self.min_samples = min_samples
+        self.eps = eps
+        self.contamination = contamination
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self.rebuild_ratio = rebuild_ratio
+        self.max_index_points = max_index_points
+        self.random_state = random_state
+
+    @property
+    def k(self):
+        # Neighbours other than the point itself
+        return max(self.min_samples - 1, 1)
+
+    def fit(self, X):
+        self._rng = np.random.default_rng(self.random_state)
+        self._seen = 0
+        self._points = np.empty((0, np.shape(X)[1]))
+        self._buffer = []
+        self._tree = self._buffer_tree = None
+        for chunk in iter_chunks(X, self.chunk_size):
+            self._insert(chunk)
+        self._rebuild()
+        if self.eps is None:
+            # Reference points score against the others, not themselves
+            scores = self.score_samples(X, exclude_self=True)
+            self.threshold_ = float(np.quantile(scores, 1 - self.contamination))
+        else:
+            self.threshold_ = float(self.eps)
+        return self
+
+    def _insert(self, chunk):
+        # Reservoir sampling into at most max_index_points reference points
+        if self.max_index_points is None or self._seen + len(chunk) <= self.max_index_points:
+            self._buffer.append(chunk)
+        else:
+            room = max(self.max_index_points - self._seen, 0)
+            if room:
+                self._buffer.append(chunk[:room])
+            self._merge_buffer()
+            positions = self._seen + room + np.arange(len(chunk) - room)
+            slots = (self._rng.random(len(positions)) * (positions + 1)).astype(np.int64)
+            keep = slots < self.max_index_points
+            self._points[slots[keep]] = chunk[room:][keep]
+            self._tree = None
+        self._seen += len(chunk)
+
+    def _buffered(self):
+        return sum(len(b) for b in self._buffer)
+
+    def _merge_buffer(self):
+        if self._buffer:
+            self._points = np.concatenate([self._points] + self._buffer)
+            self._buffer = []
+        self._buffer_tree = None
+
+    def _rebuild(self):
+        self._merge_buffer()
+        self._tree = TREES[self.algorithm](self._points, leaf_size=self.leaf_size)
+
+    def partial_fit(self, X):
+        # Insert new reference points; the threshold is kept
+        for chunk in iter_chunks(X, self.chunk_size):
+            self._insert(chunk)
+        if self._tree is None or self._buffered() > self.rebuild_ratio * len(self._points):
+            self._rebuild()
+        elif self._buffer:
+            self._buffer_tree = TREES[self.algorithm](np.concatenate(self._buffer), leaf_size=self.leaf_size)
+        return self
+
+    def _score_chunk(self, chunk, exclude_self):
+        k = self.k + int(exclude_self)
+        dist = self._tree.query(chunk, k=min(k, len(self._points)))[0]
+        if self._buffer_tree is not None:
+            # Recently inserted points live in the small tree; keep the k nearest of both
+            recent = self._buffer_tree.query(chunk, k=min(k, self._buffered()))[0]
+            dist = np.sort(np.concatenate([dist, recent], axis=1), axis=1)[:, :k]
+        return dist[:, k - 1] if dist.shape[1] >= k else np.full(len(chunk), np.inf)
+
+    def score_samples(self, X, exclude_self=False):
+        # k-th neighbour distance of every row, chunk by chunk on a thread pool (tree queries
+        # release the GIL); exclude_self when X is part of the index
+        if self._tree is None:
+            self._rebuild()
+        scores = Parallel(n_jobs=self.n_jobs, prefer='threads')(
+            delayed(self._score_chunk)(chunk, exclude_self) for chunk in iter_chunks(X, self.chunk_size))
+        return np.concatenate(scores) if scores else np.empty(0)
+
+    def predict(self, X, exclude_self=False):
+        # -1 for anomalies and 1 for normal points, as IsolationForest.predict
+        return np.where(self.score_samples(X, exclude_self) > self.threshold_, -1, 1)
+
+
+def chunked_predict(estimator, X, chunk_size=50000, n_jobs=None, method='predict'):
+    # Any fitted estimator (e.g. IsolationForest) applied chunk by chunk in parallel threads,
+    # so a memory-mapped X is never loaded whole and peak memory scales with the chunk size
+    fn = getattr(estimator, method)
+    parts = Parallel(n_jobs=n_jobs, prefer='threads')(delayed(fn)(chunk) for chunk in iter_chunks(X, chunk_size))
+    return np.concatenate(parts) if parts else np.empty(0)
@@ -1,8 +1,21 @@
 import pandas as pd
 
-def preprocess_data(data, start_date, end_date):
-    data['Date'] = pd.to_datetime(data['Date'])
-    start_date = pd.to_datetime(start_date)
-    end_date = pd.to_datetime(end_date)
-    data = data[(data['Date'] >= start_date) & (data['Date'] <= end_date)]
+def index_by_date(data):
+    # Parse 'Date' once and sort rows on a DatetimeIndex; already indexed frames pass through
+    if isinstance(data.index, pd.DatetimeIndex) and data.index.is_monotonic_increasing:
+        return data
+    # The parsed dates replace the raw strings in the Date column too, so callers that read
+    # data['Date'] (charts, Prophet's ds) get datetime64 values
+    dates = pd.to_datetime(data['Date'])
+    data = data.assign(Date=dates).set_index('Date', drop=False)
+    data.index.name = None
+    if not data.index.is_monotonic_increasing:
+        data = data.sort_index(kind='stable')
     return data
+
+def preprocess_data(data, start_date, end_date):
+    # Binary search on the sorted index; the result is a slice of the (cached) input, never a mutation of it
+    data = index_by_date(data)
+    start = data.index.searchsorted(pd.Timestamp(start_date), side='left')
+    end = data.index.searchsorted(pd.Timestamp(end_date), side='right')
+    return data.iloc[start:end]
@@ -0,0 +1,158 @@
+import collections
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+SPAN_COLUMNS = ['stage', 'name', 'depth', 'status', 'rows', 'start_seconds', 'wall_seconds', 'cpu_seconds',
+                'peak_rss_mb', 'rss_growth_mb']
+
+
+def peak_rss_mb():
+    # High-water mark of this process's resident memory; None where it cannot be read
+    try:
+        import resource
+    except ImportError:
+        try:
+            import psutil
+        except ImportError:
+            return None
+        info = psutil.Process().memory_info()
+        return getattr(info, 'peak_wset', info.rss) / 2 ** 20
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+class StackSampler:
+    # Statistical profiler: a daemon thread looks at one thread's stack every `interval` seconds
+    # and counts the innermost function (self) and every function on the stack (total)
+    def __init__(self, thread_id=None, interval=0.005):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.self_counts = collections.Counter()
+        self.total_counts = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            self.samples += 1
+            seen = set()
+            leaf = True
+            while frame is not None:
+                code = frame.f_code
+                key = f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+                if leaf:
+                    self.self_counts[key] += 1
+                    leaf = False
+                if key not in seen:
+                    self.total_counts[key] += 1
+                    seen.add(key)
+                frame = frame.f_back
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, top=15):
+        self._stop.set()
+        self._thread.join()
+        # Ranked by self samples: every caller down to the interpreter's entry point has a 100% total
+        # share, so ranking by total would fill the list with framework frames under a deep stack
+        ranked = sorted(self.total_counts, key=lambda key: (-self.self_counts[key], -self.total_counts[key]))
+        return [{'function': key, 'self_samples': self.self_counts[key], 'total_samples': self.total_counts[key],
+                 'total_share': self.total_counts[key] / self.samples}
+                for key in ranked[:top]] if self.samples else []
+
+
+class Profiler:
+    # Named, nestable spans (load, resample, feature build, fit, predict, evaluate, plot...). Each
+    # records wall and CPU time, the process's peak RSS and its growth, and the rows processed.
+    # CPU time covers every thread of this process, not worker processes. With sample=True each
+    # span also carries its hottest functions from a StackSampler.
+    def __init__(self, run_name=None, sample=False, interval=0.005):
+        self.run_name = run_name or time.strftime('%Y%m%d-%H%M%S')
+        self.sample = sample
+        self.interval = interval
+        self.spans = []
+        self._stack = []
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def span(self, name, rows=None, **meta):
+        # Yields the span record; set record['rows'] inside the block when the count is known late
+        record = {'stage': '/'.join(self._stack + [name]), 'name': name, 'depth': len(self._stack),
+                  'rows': rows, **meta}
+        self._stack.append(name)
+        sampler = StackSampler(interval=self.interval).start() if self.sample else None
+        rss = peak_rss_mb()
+        wall, cpu = time.perf_counter(), time.process_time()
+        record['start_seconds'] = wall - self._origin
+        record['status'] = 'ok'
+        try:
+            yield record
+        except BaseException:
+            record['status'] = 'failed'
+            raise
+        finally:
+            record['wall_seconds'] = time.perf_counter() - wall
+            record['cpu_seconds'] = time.process_time() - cpu
+            peak = peak_rss_mb()
+            record['peak_rss_mb'] = peak
+            record['rss_growth_mb'] = None if peak is None else peak - rss
+            if sampler is not None:
+                record['hotspots'] = sampler.stop()
+            self._stack.pop()
+            self.spans.append(record)
+
+    def to_frame(self):
+        frame = pd.DataFrame(self.spans)
+        if frame.empty:
+            return pd.DataFrame(columns=SPAN_COLUMNS)
+        extra = [c for c in frame.columns if c not in SPAN_COLUMNS and c != 'hotspots']
+        return frame.sort_values('start_seconds')[SPAN_COLUMNS + extra].reset_index(drop=True)
+
+    def hotspots(self):
+        # One row per (span, sampled function), for runs profiled with sample=True
+        rows = [dict(stage=span['stage'], **hot) for span in self.spans for hot in span.get('hotspots', [])]
+        return pd.DataFrame(rows)
+
+    def to_json(self):
+        return json.dumps({'run': self.run_name, 'spans': sorted(self.spans, key=lambda s: s['start_seconds'])},
+                          indent=1, default=str)
+
+    def export(self, out_dir='profiles'):
+        # Writes <run>.json (with hotspots) and <run>.csv (one row per span); returns both paths
+        os.makedirs(out_dir, exist_ok=True)
+        json_path = os.path.join(out_dir, f'{self.run_name}.json')
+        csv_path = os.path.join(out_dir, f'{self.run_name}.csv')
+        with open(json_path, 'w') as f:
+            f.write(self.to_json())
+        self.to_frame().to_csv(csv_path, index=False)
+        return json_path, csv_path
+
+
+def load_run(path):
+    if path.endswith('.csv'):
+        return pd.read_csv(path)
+    with open(path) as f:
+        spans = json.load(f)['spans']
+    return pd.DataFrame([{k: v for k, v in span.items() if k != 'hotspots'} for span in spans])
+
+
+def compare_runs(baseline, current, metric='wall_seconds'):
+    # Per-stage metric of two exported runs side by side, biggest slowdown first
+    base, cur = load_run(baseline), load_run(current)
+    merged = pd.concat([base.groupby('stage')[metric].sum().rename('baseline'),
+                        cur.groupby('stage')[metric].sum().rename('current')], axis=1)
+    merged['ratio'] = merged['current'] / merged['baseline']
+    return merged.sort_values('ratio', ascending=False)
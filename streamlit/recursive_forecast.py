@@ -0,0 +1,121 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.multioutput import MultiOutputRegressor
+
+from backends import load_backend
+from windowing import sliding_windows
+
+
+class LagRingBuffer:
+    # The last n_lags values of each series; a step overwrites the oldest slot instead of shifting
+    def __init__(self, history, n_lags):
+        history = np.atleast_2d(np.asarray(history, dtype=float))
+        if history.shape[1] < n_lags:
+            raise ValueError(f'need at least {n_lags} past values per series, got {history.shape[1]}')
+        self.n_lags = n_lags
+        self.n_series = history.shape[0]
+        self._buf = np.array(history[:, -n_lags:])
+        self._head = 0
+
+    def lags(self):
+        # (n_series, n_lags) ordered lag_1 (most recent) ... lag_n, the LagFeatureTransformer layout
+        return self._buf[:, (self._head - 1 - np.arange(self.n_lags)) % self.n_lags]
+
+    def push(self, values):
+        self._buf[:, self._head] = values
+        self._head = (self._head + 1) % self.n_lags
+
+
+def recursive_forecast(predict, history, horizon, n_lags, exog=None, columns=None):
+    # Rolls a one-step model forward `horizon` steps for many series at once: one predict call per
+    # step for the whole batch. Features are [exog..., lag_1..lag_n], the order LagFeatureTransformer
+    # produces. exog is (n_series, n_exog) held constant, or (n_series, horizon, n_exog) per step.
+    # Pass the training column names as `columns` for estimators fitted on DataFrames.
+    ring = LagRingBuffer(history, n_lags)
+    exog = None if exog is None else np.asarray(exog, dtype=float)
+    n_exog = 0 if exog is None else exog.shape[-1]
+    features = np.empty((ring.n_series, n_exog + n_lags))
+    out = np.empty((ring.n_series, horizon))
+    for step in range(horizon):
+        if exog is not None:
+            features[:, :n_exog] = exog if exog.ndim == 2 else exog[:, step]
+        features[:, n_exog:] = ring.lags()
+        X = pd.DataFrame(features, columns=columns, copy=False) if columns is not None else features
+        pred = np.asarray(predict(X), dtype=float).reshape(ring.n_series)
+        out[:, step] = pred
+        ring.push(pred)
+    return out
+
+
+# Compiled rollouts per model and horizon; an entry goes away with its model
+_keras_rollouts = weakref.WeakKeyDictionary()
+
+
+def keras_recursive_forecast(model, windows, horizon):
+    # Recursive rollout of a Keras sequence model inside one compiled tf.function: the whole
+    # horizon for a batch of windows (n_series, window_size, n_features) in a single call.
+    # The prediction is fed back as feature 0 of the next step.
+    tf = load_backend('tensorflow')
+    rollouts = _keras_rollouts.setdefault(model, {})
+    if horizon not in rollouts:
+        # The traced function holds the model weakly, or the cache entry would keep it alive
+        model_ref = weakref.ref(model)
+
+        @tf.function(reduce_retracing=True)
+        def rollout(window):
+            steps = tf.TensorArray(window.dtype, size=horizon)
+            for i in tf.range(horizon):
+                pred = tf.reshape(model_ref()(window, training=False), [-1, 1, 1])
+                steps = steps.write(i, pred[:, 0, 0])
+                last = window[:, -1:, :]
+                nxt = tf.concat([pred, last[:, :, 1:]], axis=2)
+                window = tf.concat([window[:, 1:, :], nxt], axis=1)
+            return tf.transpose(steps.stack())
+        rollouts[horizon] = rollout
+    windows = np.asarray(windows, dtype=np.float32)
+    if windows.ndim == 2:
+        windows = windows[:, :, None]
+    return rollouts[horizon](tf.constant(windows)).numpy()
+
+
+def direct_training_set(series, n_lags, horizon):
+    # Lag rows (lag_1 first) and the next `horizon` values for one series, as zero-copy views
+    X, Y = sliding_windows(series, n_lags, horizon=horizon)
+    return X[:, ::-1, 0], Y
+
+
+def last_lags(series_list, n_lags):
+    # One lag row per series, stacked so a single predict call covers the batch
+    return np.stack([np.asarray(s, dtype=float)[-n_lags:][::-1] for s in series_list])
+
+
+class DirectMultiStepForecaster(BaseEstimator, RegressorMixin):
+    # One model emitting the whole horizon from the lag row: predict returns (n_series, horizon)
+    # in one call. Estimators without native multi-output support are wrapped per horizon step.
+    def __init__(self, estimator, n_lags=5, horizon=30):
+        self.estimator = estimator
+        self.n_lags = n_lags
+        self.horizon = horizon
+
+    def fit(self, series_list, y=None):
+        # series_list: one or more 1-D series; their training windows are pooled
+        if np.ndim(series_list[0]) == 0:
+            series_list = [series_list]
+        parts = [direct_training_set(np.asarray(s, dtype=float), self.n_lags, self.horizon) for s in series_list]
+        X = np.concatenate([p[0] for p in parts])
+        Y = np.concatenate([p[1] for p in parts])
+        self.model_ = clone(self.estimator)
+        try:
+            self.model_.fit(X, Y)
+        except ValueError:
+            self.model_ = MultiOutputRegressor(clone(self.estimator)).fit(X, Y)
+        return self
+
+    def predict(self, X):
+        # X: lag rows from last_lags(), or a list of series to forecast from their ends
+        if not isinstance(X, np.ndarray) or X.ndim != 2 or X.shape[1] != self.n_lags:
+            X = last_lags(X if np.ndim(X[0]) else [X], self.n_lags)
+        return np.asarray(self.model_.predict(X)).reshape(len(X), self.horizon)
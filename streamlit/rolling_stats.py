@@ -0,0 +1,195 @@
+import collections
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class RollingStats:
+    # Rolling mean/std/EMA/min/max and Bollinger bands for any of the given windows, matching
+    # pandas rolling(window, min_periods).mean()/std()/min()/max() and
+    # ewm(span=window, adjust=False, ignore_na=True).mean(), NaNs included.
+    # Only O(n) state is kept up front: the values and shared cumulative sums of the observed
+    # values, their squares and their count, so mean and std of any window are a few vector ops.
+    # A statistic is computed for a window when first asked for and the most recent max_columns
+    # of them are kept; append() then updates just those kept columns. One instance can be shared
+    # between threads (the app caches it across sessions): reads change the kept columns too, so
+    # they take the same lock as append().
+    def __init__(self, values, windows=range(2, 51), num_std=2.0, min_periods=None, max_columns=16):
+        self.windows = np.asarray(sorted(set(int(w) for w in windows)), dtype=np.int64)
+        if len(self.windows) == 0 or self.windows[0] < 2:
+            raise ValueError('windows must be integers >= 2')
+        self.num_std = num_std
+        # None requires a full window of observed values, like pandas' default
+        self.min_periods = min_periods
+        self.max_columns = max_columns
+        self._columns = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        values = np.asarray(values, dtype=float)
+        self.n = len(values)
+        capacity = max(self.n, 16)
+        self._x = np.empty(capacity)
+        self._x[:self.n] = values
+        # Values are centred before summing to limit cancellation in the variance
+        self._shift = float(np.nanmean(values)) if self.n and not np.isnan(values).all() else 0.0
+        self._c1 = np.zeros(capacity + 1)
+        self._c2 = np.zeros(capacity + 1)
+        self._cn = np.zeros(capacity + 1, dtype=np.int64)
+        if self.n:
+            observed = ~np.isnan(values)
+            centred = np.where(observed, values - self._shift, 0.0)
+            self._c1[1:self.n + 1] = np.cumsum(centred)
+            self._c2[1:self.n + 1] = np.cumsum(centred ** 2)
+            self._cn[1:self.n + 1] = np.cumsum(observed)
+
+    def _needed(self, window):
+        return window if self.min_periods is None else max(int(self.min_periods), 1)
+
+    def _counts(self, window, ends):
+        starts = np.maximum(ends - window, 0)
+        return starts, self._cn[ends] - self._cn[starts]
+
+    def _moments(self, window, ends):
+        # Mean and sample std (ddof=1, as pandas) of the windows ending just before each position in ends
+        starts, count = self._counts(window, ends)
+        s1 = self._c1[ends] - self._c1[starts]
+        s2 = self._c2[ends] - self._c2[starts]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = s1 / count
+            var = np.maximum(s2 - s1 * mean, 0.0) / (count - 1)
+        valid = count >= self._needed(window)
+        return (np.where(valid & (count > 0), mean + self._shift, np.nan),
+                np.where(valid & (count > 1), np.sqrt(var), np.nan))
+
+    def _extreme(self, window, reduce, fill):
+        # Trailing min/max over observed values; windows short of min_periods observations are NaN
+        x = self._x[:self.n]
+        padded = np.concatenate([np.full(window - 1, fill), np.where(np.isnan(x), fill, x)])
+        result = reduce(sliding_window_view(padded, window), axis=1)
+        _, count = self._counts(window, np.arange(1, self.n + 1))
+        return np.where(count >= self._needed(window), result, np.nan)
+
+    def _ema(self, window):
+        # scipy.signal is imported here so loading this module stays cheap at app start
+        from scipy.signal import lfilter
+
+        alpha = 2.0 / (window + 1.0)
+        x = self._x[:self.n]
+        observed = np.flatnonzero(~np.isnan(x))
+        result = np.full(self.n, np.nan)
+        if len(observed) == 0:
+            return result
+        values = x[observed]
+        result[observed] = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * values[0]])[0]
+        # Missing values carry the last average forward
+        last = np.maximum.accumulate(np.where(np.isnan(x), -1, np.arange(self.n)))
+        return np.where(last >= 0, result[np.maximum(last, 0)], np.nan)
+
+    def _compute(self, name, window):
+        if name in ('mean', 'std'):
+            return self._moments(window, np.arange(1, self.n + 1))[name == 'std']
+        if name == 'min':
+            return self._extreme(window, np.min, np.inf)
+        if name == 'max':
+            return self._extreme(window, np.max, -np.inf)
+        return self._ema(window)
+
+    def _newest(self, name, window, previous):
+        # The statistic at the newest position, from the one before it where that helps
+        i = self.n - 1
+        if name in ('mean', 'std'):
+            return self._moments(window, np.array([i + 1]))[name == 'std'][0]
+        value = self._x[i]
+        if name == 'ema':
+            if np.isnan(value) or np.isnan(previous):
+                return previous if np.isnan(value) else value
+            alpha = 2.0 / (window + 1.0)
+            return alpha * value + (1.0 - alpha) * previous
+        tail = self._x[max(0, i - window + 1):i + 1]
+        if np.count_nonzero(~np.isnan(tail)) < self._needed(window):
+            return np.nan
+        return np.nanmin(tail) if name == 'min' else np.nanmax(tail)
+
+    def _column(self, name, window):
+        try:
+            window = int(window)
+        except (TypeError, ValueError):
+            window = None
+        if window not in self.windows:
+            raise ValueError(f'window {window} is not available; available: {self.windows[0]}-{self.windows[-1]}')
+        key = (name, window)
+        with self._lock:
+            column = self._columns.get(key)
+            if column is not None:
+                self._columns.move_to_end(key)
+            else:
+                column = np.full(len(self._x), np.nan)
+                column[:self.n] = self._compute(name, window)
+                self._columns[key] = column
+                while len(self._columns) > self.max_columns:
+                    self._columns.popitem(last=False)
+            return column[:self.n]
+
+    def _grow(self):
+        capacity = 2 * len(self._x)
+        self._x = np.resize(self._x, capacity)
+        for name in ['_c1', '_c2', '_cn']:
+            old = getattr(self, name)
+            grown = np.zeros(capacity + 1, dtype=old.dtype)
+            grown[:self.n + 1] = old[:self.n + 1]
+            setattr(self, name, grown)
+        for key, column in self._columns.items():
+            self._columns[key] = np.resize(column, capacity)
+
+    def append(self, value):
+        # Add one observation; only the newest value of each kept column is computed
+        with self._lock:
+            self._append(value)
+
+    def _append(self, value):
+        if self.n == len(self._x):
+            self._grow()
+        i = self.n
+        value = float(value)
+        self._x[i] = value
+        observed = not np.isnan(value)
+        centred = value - self._shift if observed else 0.0
+        self._c1[i + 1] = self._c1[i] + centred
+        self._c2[i + 1] = self._c2[i] + centred ** 2
+        self._cn[i + 1] = self._cn[i] + observed
+        self.n += 1
+        for (name, window), column in self._columns.items():
+            column[i] = self._newest(name, window, column[i - 1] if i else np.nan)
+
+    def extend(self, values):
+        with self._lock:
+            for value in values:
+                self._append(value)
+
+    def mean(self, window):
+        return self._column('mean', window)
+
+    def std(self, window):
+        return self._column('std', window)
+
+    def ema(self, window):
+        return self._column('ema', window)
+
+    def min(self, window):
+        return self._column('min', window)
+
+    def max(self, window):
+        return self._column('max', window)
+
+    def bollinger(self, window):
+        # (middle, upper, lower) bands at num_std standard deviations
+        mean, std = self.mean(window), self.std(window)
+        return mean, mean + self.num_std * std, mean - self.num_std * std
+
+    @property
+    def nbytes(self):
+        # Memory held by this instance, for size-bounded caches
+        with self._lock:
+            return (self._x.nbytes + self._c1.nbytes + self._c2.nbytes + self._cn.nbytes
+                    + sum(column.nbytes for column in self._columns.values()))
@@ -0,0 +1,224 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from dataset_store import load_dataset
+
+VALUES = ('count', 'magnitude_mean', 'magnitude_max', 'depth_mean')
+
+
+def event_times(frame, date_col='Date', time_col='Time'):
+    # Date plus the HH:MM:SS Time column; a few catalogue rows carry a full ISO timestamp in both
+    # columns, and dataset_store already parsed those into Date
+    times = pd.to_timedelta(frame[time_col].astype(str), errors='coerce')
+    dates = pd.DatetimeIndex(frame[date_col])
+    return (dates + pd.TimedeltaIndex(times).fillna(pd.Timedelta(0))).values.astype('datetime64[ns]')
+
+
+def grid_cells(lat, lon, degrees):
+    # Row-major cell id on a regular lat/lon grid anchored at (-90, -180); the poles and the
+    # antimeridian fall into the last row/column
+    rows = np.minimum(np.floor((np.asarray(lat) + 90) / degrees), np.ceil(180 / degrees) - 1).astype(np.int64)
+    cols = np.minimum(np.floor((np.asarray(lon) + 180) / degrees), np.ceil(360 / degrees) - 1).astype(np.int64)
+    return rows * int(np.ceil(360 / degrees)) + cols
+
+
+class SpatioTemporalIndex:
+    # Events bucketed into cell_degrees grid cells and sorted by (cell, time), so a bounding box
+    # and date range becomes a few binary searches per overlapping cell instead of a scan of the
+    # catalogue. Rollups (count, magnitude sum/max, depth sum per grid cell and period) are
+    # built once per (degrees, freq) and cached; a region whose edges lie on a rollup grid is
+    # answered from the rollup alone, so many regional series cost a groupby-free sum each.
+    def __init__(self, frame, cell_degrees=1.0, lat_col='Latitude', lon_col='Longitude', date_col='Date',
+                 time_col='Time', magnitude_col='Magnitude', depth_col='Depth'):
+        self.frame = frame
+        self.cell_degrees = cell_degrees
+        self.lat = frame[lat_col].to_numpy(dtype=float)
+        self.lon = frame[lon_col].to_numpy(dtype=float)
+        self.times = event_times(frame, date_col, time_col)
+        self.magnitude = frame[magnitude_col].to_numpy(dtype=float)
+        self.depth = frame[depth_col].to_numpy(dtype=float)
+
+        cells = grid_cells(self.lat, self.lon, cell_degrees)
+        # Seconds since the first event; the query key is (cell rank, second), refined exactly afterwards
+        self._t0 = self.times.min()
+        seconds = ((self.times - self._t0) // np.timedelta64(1, 's')).astype(np.int64)
+        self._span = int(seconds.max()) + 2
+        self.order = np.lexsort((self.times, cells))
+        self.cells, rank = np.unique(cells, return_inverse=True)
+        self._keys = (rank * self._span + seconds)[self.order]
+        n_cols = int(np.ceil(360 / cell_degrees))
+        self._cell_rows, self._cell_cols = np.divmod(self.cells, n_cols)
+        self._periods = {}
+        self._rollups = {}
+
+    def __len__(self):
+        return len(self.order)
+
+    def _seconds(self, when, default):
+        # Clamped to the key span of one cell, so dates outside the catalogue never reach a neighbouring cell
+        if when is None:
+            return default
+        seconds = int((np.datetime64(pd.Timestamp(when), 'ns') - self._t0) // np.timedelta64(1, 's'))
+        return min(max(seconds, -1), self._span - 1)
+
+    def query(self, lat=None, lon=None, start=None, end=None):
+        # Row positions (into frame, ascending) of events with lat[0] <= latitude <= lat[1],
+        # lon[0] <= longitude <= lon[1] and start <= time < end; any bound may be None. A
+        # longitude range with lon[0] > lon[1] crosses the antimeridian.
+        lat = (-90, 90) if lat is None else lat
+        lon = (-180, 180) if lon is None else lon
+        if lon[0] > lon[1]:
+            return np.union1d(self.query(lat, (lon[0], 180), start, end), self.query(lat, (-180, lon[1]), start, end))
+        d = self.cell_degrees
+        row_lo, row_hi = np.floor((lat[0] + 90) / d), np.floor((lat[1] + 90) / d)
+        col_lo, col_hi = np.floor((lon[0] + 180) / d), np.floor((lon[1] + 180) / d)
+        ranks = np.flatnonzero((self._cell_rows >= row_lo) & (self._cell_rows <= row_hi)
+                               & (self._cell_cols >= col_lo) & (self._cell_cols <= col_hi))
+        lo = np.searchsorted(self._keys, ranks * self._span + self._seconds(start, 0), side='left')
+        hi = np.searchsorted(self._keys, ranks * self._span + self._seconds(end, self._span - 1) + 1, side='left')
+        # An end before the start (or before the first event) gives empty, not negative, slices
+        lengths = np.maximum(hi - lo, 0)
+        if len(ranks) == 0 or lengths.sum() == 0:
+            return np.empty(0, dtype=np.int64)
+        slots = np.repeat(lo - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        rows = self.order[slots]
+        # Exact bounds: edge cells hold points outside the box and keys are truncated to seconds
+        keep = (self.lat[rows] >= lat[0]) & (self.lat[rows] <= lat[1])
+        keep &= (self.lon[rows] >= lon[0]) & (self.lon[rows] <= lon[1])
+        if start is not None:
+            keep &= self.times[rows] >= np.datetime64(pd.Timestamp(start), 'ns')
+        if end is not None:
+            keep &= self.times[rows] < np.datetime64(pd.Timestamp(end), 'ns')
+        return np.sort(rows[keep])
+
+    def events(self, lat=None, lon=None, start=None, end=None):
+        return self.frame.iloc[self.query(lat, lon, start, end)]
+
+    def _period_codes(self, freq):
+        # Period of every event as an index into the full, gap-free period range of the catalogue
+        if freq not in self._periods:
+            periods = pd.PeriodIndex(self.times, freq=freq)
+            full = pd.period_range(periods.min(), periods.max(), freq=freq)
+            codes = (periods.asi8 - full[0].ordinal).astype(np.int64)
+            self._periods[freq] = (codes, full.to_timestamp())
+        return self._periods[freq]
+
+    def rollup(self, degrees, freq='D'):
+        # Long frame with one row per non-empty (cell, period): cell south-west corner, period start,
+        # count, magnitude_sum, magnitude_max and depth_sum. Cached per (degrees, freq).
+        key = (degrees, freq)
+        if key not in self._rollups:
+            codes, index = self._period_codes(freq)
+            cells = grid_cells(self.lat, self.lon, degrees)
+            groups, inverse = np.unique(cells * len(index) + codes, return_inverse=True)
+            magnitude_max = np.full(len(groups), -np.inf)
+            np.maximum.at(magnitude_max, inverse, self.magnitude)
+            cell, period = np.divmod(groups, len(index))
+            row, col = np.divmod(cell, int(np.ceil(360 / degrees)))
+            self._rollups[key] = pd.DataFrame({
+                'lat': row * degrees - 90.0, 'lon': col * degrees - 180.0, 'period': period,
+                'count': np.bincount(inverse, minlength=len(groups)),
+                'magnitude_sum': np.bincount(inverse, self.magnitude, len(groups)),
+                'magnitude_max': magnitude_max,
+                'depth_sum': np.bincount(inverse, self.depth, len(groups))})
+        return self._rollups[key]
+
+    def precompute(self, levels=(1, 5, 30), freqs=('D', 'M')):
+        for degrees in levels:
+            for freq in freqs:
+                self.rollup(degrees, freq)
+        return self
+
+    def _aligned_level(self, lat, lon, freq):
+        # Coarsest cached rollup grid (for freq) whose lines the box edges fall on, if any
+        for degrees in sorted((d for d, f in self._rollups if f == freq), reverse=True):
+            edges = np.array([lat[0] + 90, lat[1] + 90, lon[0] + 180, lon[1] + 180]) / degrees
+            if np.allclose(edges, np.round(edges)):
+                return degrees
+        return None
+
+    def _series(self, count, magnitude_sum, magnitude_max, depth_sum, index, value):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = {'count': count, 'magnitude_mean': magnitude_sum / count,
+                      'magnitude_max': np.where(count > 0, magnitude_max, np.nan), 'depth_mean': depth_sum / count}
+        if value not in values:
+            raise ValueError(f'value must be one of {VALUES}')
+        return pd.Series(values[value], index=index, name=value)
+
+    def series(self, lat=None, lon=None, start=None, end=None, freq='D', value='count'):
+        # One regular series (count, magnitude_mean, magnitude_max or depth_mean per period) for a
+        # box and date range; empty periods are 0 for counts and NaN otherwise. Boxes on a cached
+        # rollup grid sum its cells (the upper edge then is exclusive, like the cells), any other box
+        # aggregates the events found by query().
+        lat = (-90, 90) if lat is None else lat
+        lon = (-180, 180) if lon is None else lon
+        codes, index = self._period_codes(freq)
+        degrees = self._aligned_level(lat, lon, freq) if lon[0] <= lon[1] else None
+        if degrees is not None:
+            table = self._rollups[(degrees, freq)]
+            cells = table[(table['lat'] >= lat[0]) & (table['lat'] < lat[1])
+                          & (table['lon'] >= lon[0]) & (table['lon'] < lon[1])]
+            period = cells['period'].to_numpy()
+            magnitude_max = np.full(len(index), -np.inf)
+            np.maximum.at(magnitude_max, period, cells['magnitude_max'].to_numpy())
+            result = self._series(np.bincount(period, cells['count'], len(index)),
+                                  np.bincount(period, cells['magnitude_sum'], len(index)), magnitude_max,
+                                  np.bincount(period, cells['depth_sum'], len(index)), index, value)
+        else:
+            rows = self.query(lat, lon)
+            magnitude_max = np.full(len(index), -np.inf)
+            np.maximum.at(magnitude_max, codes[rows], self.magnitude[rows])
+            result = self._series(np.bincount(codes[rows], minlength=len(index)).astype(float),
+                                  np.bincount(codes[rows], self.magnitude[rows], len(index)), magnitude_max,
+                                  np.bincount(codes[rows], self.depth[rows], len(index)), index, value)
+        if start is not None:
+            result = result[result.index >= pd.Timestamp(start)]
+        if end is not None:
+            result = result[result.index < pd.Timestamp(end)]
+        return result
+
+    def regional_series(self, degrees=30, freq='M', value='count', min_events=1):
+        # Every grid cell with at least min_events events as one column (keyed by the cell's south-west
+        # corner), all on the catalogue's full period range: the panel of regional series in one pivot
+        table = self.rollup(degrees, freq)
+        _, index = self._period_codes(freq)
+        totals = table.groupby(['lat', 'lon'])['count'].transform('sum')
+        table = table[totals >= min_events]
+        columns = pd.MultiIndex.from_frame(table[['lat', 'lon']].drop_duplicates().sort_values(['lat', 'lon']))
+        column = columns.get_indexer(pd.MultiIndex.from_frame(table[['lat', 'lon']]))
+        period = table['period'].to_numpy()
+        shape = (len(index), len(columns))
+        count = np.zeros(shape)
+        magnitude_sum, magnitude_max, depth_sum = np.zeros(shape), np.full(shape, -np.inf), np.zeros(shape)
+        count[period, column] = table['count']
+        magnitude_sum[period, column] = table['magnitude_sum']
+        magnitude_max[period, column] = table['magnitude_max']
+        depth_sum[period, column] = table['depth_sum']
+        values = self._series(count.ravel(), magnitude_sum.ravel(), magnitude_max.ravel(), depth_sum.ravel(),
+                              None, value).to_numpy().reshape(shape)
+        return pd.DataFrame(values, index=index, columns=columns)
+
+
+def build_index(cell_degrees=1.0, levels=(1, 5, 30), freqs=('D', 'M')):
+    return SpatioTemporalIndex(load_dataset('earthquakes'), cell_degrees).precompute(levels, freqs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Region/time queries over the earthquake catalogue.')
+    parser.add_argument('--lat', type=float, nargs=2, default=(30, 46))
+    parser.add_argument('--lon', type=float, nargs=2, default=(129, 146))
+    parser.add_argument('--start', default='2000-01-01')
+    parser.add_argument('--end', default=None)
+    parser.add_argument('--freq', default='M')
+    args = parser.parse_args()
+
+    begin = time.perf_counter()
+    index = build_index()
+    print(f'index + rollups: {time.perf_counter() - begin:.3f}s for {len(index)} events')
+    begin = time.perf_counter()
+    series = index.series(args.lat, args.lon, args.start, args.end, args.freq)
+    print(f'series: {time.perf_counter() - begin:.4f}s, {int(series.sum())} events')
+    print(series.tail().to_string())
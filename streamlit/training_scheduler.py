@@ -0,0 +1,280 @@
+import math
+import os
+import time
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid, ParameterSampler, TimeSeriesSplit
+from threadpoolctl import threadpool_limits
+
+
+# Estimator parameters that act as a training budget in successive halving
+BUDGET_PARAMS = ('n_estimators', 'epochs', 'max_iter')
+
+
+def budget_param(estimator):
+    for name, value in estimator.get_params().items():
+        if name.split('__')[-1] in BUDGET_PARAMS and isinstance(value, int):
+            return name
+    return None
+
+
+def _take(data, idx):
+    return data.iloc[idx] if hasattr(data, 'iloc') else data[idx]
+
+
+def _single_threaded(estimator):
+    # Every task gets one core; the scheduler, not the estimator, decides how many run at once
+    threaded = {name: 1 for name in estimator.get_params() if name.endswith('n_jobs') or name.endswith('nthread')}
+    return estimator.set_params(**threaded) if threaded else estimator
+
+
+def _write_memo(path, value):
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    joblib.dump(value, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _run_task(task, X, y, memo_path):
+    wall, cpu = time.perf_counter(), time.process_time()
+    with threadpool_limits(1):
+        model = _single_threaded(clone(task['estimator']).set_params(**task['params']))
+        if task['fold'] is None:
+            model.fit(X, y)
+            score = None
+        else:
+            train, test = task['split']
+            try:
+                model.fit(_take(X, train), _take(y, train))
+                score = model.score(_take(X, test), _take(y, test))
+            except Exception as exc:
+                # Like error_score=np.nan in sklearn's searches: a failing candidate only loses
+                warnings.warn(f"{task['model']} {task['params']} fold {task['fold']} failed: {exc!r}")
+                score = np.nan
+    result = {'score': score, 'wall_seconds': time.perf_counter() - wall, 'cpu_seconds': time.process_time() - cpu}
+    if memo_path:
+        memo = dict(result, model=model) if task['fold'] is None else result
+        try:
+            _write_memo(memo_path, memo)
+        except Exception:
+            # Some models (e.g. Keras-backed) cannot be pickled; keep the timing and score only
+            _write_memo(memo_path, result)
+    if task['fold'] is None:
+        result['model'] = model
+    return result
+
+
+class TrainingScheduler:
+    # Flattens (model, parameter set, fold) for every model into one task list and runs it on a
+    # process pool of `cpu_budget` single-threaded workers, longest tasks first. Each finished task
+    # is memoized under cache_dir, keyed by the data hash, estimator, parameters and fold, so a rerun
+    # after a crash or a grid change only fits the tasks it has not seen.
+    def __init__(self, cpu_budget=None, cache_dir=None, n_iter=2, cv=2, random_state=42, verbose=0):
+        self.cpu_budget = cpu_budget or os.cpu_count()
+        self.cache_dir = cache_dir
+        self.n_iter = n_iter
+        self.cv = cv
+        self.random_state = random_state
+        self.verbose = verbose
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def _splits(self, X, y):
+        cv = KFold(n_splits=self.cv) if isinstance(self.cv, int) else self.cv
+        return list(cv.split(X, y))
+
+    def _param_sets(self, params):
+        if not params:
+            return [{}]
+        return list(ParameterSampler(params, n_iter=self.n_iter, random_state=self.random_state))
+
+    def _memo_path(self, data_hash, task):
+        if not self.cache_dir:
+            return None
+        key = joblib.hash((data_hash, task['model'], clone(task['estimator']), task['params'], task['fold'], task.get('split')))
+        return os.path.join(self.cache_dir, f'{key}.pkl')
+
+    def _load_memo(self, path):
+        if path and os.path.exists(path):
+            try:
+                return joblib.load(path)
+            except Exception:
+                return None
+        return None
+
+    def _run(self, tasks, datasets, data_hashes):
+        results, pending = [None] * len(tasks), []
+        for i, task in enumerate(tasks):
+            task['memo_path'] = self._memo_path(data_hashes[task['data']], task)
+            memo = self._load_memo(task['memo_path'])
+            if memo is not None and (task['fold'] is not None or 'model' in memo):
+                results[i] = dict(memo, cached=True)
+            else:
+                pending.append(i)
+        # Longest processing time first, using earlier timings of the same model where known
+        expected = {}
+        for task, result in zip(tasks, results):
+            if result is not None:
+                expected[task['model']] = max(expected.get(task['model'], 0.0), result['wall_seconds'])
+        pending.sort(key=lambda i: -expected.get(tasks[i]['model'], float('inf')))
+
+        outputs = Parallel(n_jobs=self.cpu_budget, verbose=self.verbose)(
+            delayed(_run_task)(tasks[i], *datasets[tasks[i]['data']], tasks[i]['memo_path']) for i in pending)
+        for i, output in zip(pending, outputs):
+            results[i] = dict(output, cached=False)
+        return results
+
+    def fit(self, model_specs, datasets):
+        # model_specs: {name: {'estimator': ..., 'params': {...}, 'data': dataset name}}
+        # datasets: {name: (X, y)}. Returns (best fitted estimator per model, report DataFrame).
+        start = time.perf_counter()
+        data_hashes = {name: joblib.hash(data) for name, data in datasets.items()}
+        splits = {name: self._splits(*data) for name, data in datasets.items()}
+
+        search_tasks = []
+        for name, spec in model_specs.items():
+            for params in self._param_sets(spec['params']):
+                for fold, split in enumerate(splits[spec['data']]):
+                    search_tasks.append({'model': name, 'estimator': spec['estimator'], 'params': params,
+                                         'fold': fold, 'split': split, 'data': spec['data']})
+        search_results = self._run(search_tasks, datasets, data_hashes)
+
+        rows = pd.DataFrame([{'model': t['model'], 'params': repr(t['params']), 'fold': t['fold'], **r}
+                             for t, r in zip(search_tasks, search_results)])
+        refit_tasks = []
+        for name, spec in model_specs.items():
+            scores = rows[rows['model'] == name].groupby('params', sort=False)['score'].mean()
+            best = self._param_sets(spec['params'])[int(np.nanargmax(scores.values))] if scores.notna().any() else self._param_sets(spec['params'])[0]
+            refit_tasks.append({'model': name, 'estimator': spec['estimator'], 'params': best,
+                                'fold': None, 'data': spec['data']})
+        refit_results = self._run(refit_tasks, datasets, data_hashes)
+
+        best_estimators, report = {}, []
+        for task, result in zip(refit_tasks, refit_results):
+            name = task['model']
+            best_estimators[name] = result['model']
+            model_rows = rows[rows['model'] == name]
+            report.append({
+                'model': name,
+                'best_params': task['params'],
+                'best_score': model_rows.groupby('params', sort=False)['score'].mean().max(),
+                'tasks': len(model_rows) + 1,
+                'cached_tasks': int(model_rows['cached'].sum()) + int(result['cached']),
+                'wall_seconds': model_rows['wall_seconds'].sum() + result['wall_seconds'],
+                'cpu_seconds': model_rows['cpu_seconds'].sum() + result['cpu_seconds'],
+            })
+        report = pd.DataFrame(report).set_index('model')
+        report['cpu_per_wall'] = report['cpu_seconds'] / report['wall_seconds']
+        report.attrs['elapsed_seconds'] = time.perf_counter() - start
+        return best_estimators, report
+
+
+class HalvingTrainingScheduler(TrainingScheduler):
+    # Successive halving over expanding-window (TimeSeriesSplit) folds. Each model starts with
+    # n_candidates parameter sets. Every round keeps the best 1/factor of them and multiplies
+    # their resources by factor: the most recent part of each training fold (short histories
+    # first) and, where the estimator has one, its budget parameter (n_estimators, epochs,
+    # max_iter). Only the last round fits full histories with full budgets. All models advance
+    # in lockstep, so each round is one task batch on the shared pool.
+    def __init__(self, n_candidates=8, factor=3, min_resource=0.1, n_splits=3, **kwargs):
+        kwargs.setdefault('cv', TimeSeriesSplit(n_splits=n_splits))
+        super().__init__(**kwargs)
+        self.n_candidates = n_candidates
+        self.factor = factor
+        self.min_resource = min_resource
+
+    def _param_sets(self, params):
+        if not params:
+            return [{}]
+        grid = ParameterGrid(params)
+        if len(grid) <= self.n_candidates:
+            return list(grid)
+        return list(ParameterSampler(params, n_iter=self.n_candidates, random_state=self.random_state))
+
+    def _rounds(self, n_candidates):
+        return max(1, math.ceil(math.log(n_candidates, self.factor))) if n_candidates > 1 else 1
+
+    def _scaled(self, spec, params, fraction):
+        # Candidate parameters with the budget parameter cut to the round's fraction
+        name = budget_param(spec['estimator'])
+        if name is None or fraction >= 1:
+            return params
+        full = params.get(name, spec['estimator'].get_params()[name])
+        return dict(params, **{name: max(1, int(round(full * fraction)))})
+
+    def _truncated(self, split, fraction):
+        train, test = split
+        if fraction >= 1:
+            return split
+        keep = max(int(math.ceil(len(train) * fraction)), min(len(train), 10))
+        return train[-keep:], test
+
+    def fit(self, model_specs, datasets):
+        start = time.perf_counter()
+        data_hashes = {name: joblib.hash(data) for name, data in datasets.items()}
+        splits = {name: self._splits(*data) for name, data in datasets.items()}
+        candidates = {name: self._param_sets(spec['params']) for name, spec in model_specs.items()}
+        rounds = {name: self._rounds(len(sets)) for name, sets in candidates.items()}
+        n_rounds = max(rounds.values())
+        history = {name: [] for name in model_specs}
+
+        for r in range(n_rounds):
+            tasks = []
+            for name, spec in model_specs.items():
+                model_round = r - (n_rounds - rounds[name])
+                if model_round < 0:
+                    continue
+                fraction = max(self.factor ** (model_round - rounds[name] + 1), self.min_resource)
+                if model_round == rounds[name] - 1:
+                    fraction = 1.0
+                for c, params in enumerate(candidates[name]):
+                    for fold, split in enumerate(splits[spec['data']]):
+                        tasks.append({'model': name, 'estimator': spec['estimator'], 'candidate': c,
+                                      'params': self._scaled(spec, params, fraction), 'fold': fold,
+                                      'split': self._truncated(split, fraction), 'data': spec['data'],
+                                      'fraction': fraction})
+            results = self._run(tasks, datasets, data_hashes)
+
+            for name in model_specs:
+                rows = [(t, res) for t, res in zip(tasks, results) if t['model'] == name]
+                if not rows:
+                    continue
+                history[name].extend(rows)
+                scores = {}
+                for task, res in rows:
+                    scores.setdefault(task['candidate'], []).append(res['score'])
+                ranked = sorted(scores, key=lambda c: -np.nanmean(scores[c]) if not np.all(np.isnan(scores[c])) else np.inf)
+                keep = ranked if r == n_rounds - 1 else ranked[:max(1, math.ceil(len(ranked) / self.factor))]
+                candidates[name] = [candidates[name][c] for c in keep]
+
+        refit_tasks = [{'model': name, 'estimator': spec['estimator'], 'params': candidates[name][0],
+                        'fold': None, 'data': spec['data']} for name, spec in model_specs.items()]
+        refit_results = self._run(refit_tasks, datasets, data_hashes)
+
+        best_estimators, report = {}, []
+        for task, result in zip(refit_tasks, refit_results):
+            name = task['model']
+            best_estimators[name] = result['model']
+            rows = history[name]
+            final = [res['score'] for t, res in rows if t['fraction'] == 1.0 and t['params'] == task['params']]
+            full_grid = len(self._param_sets(model_specs[name]['params'])) * len(splits[task['data']])
+            report.append({
+                'model': name,
+                'best_params': task['params'],
+                'best_score': np.nanmean(final) if final else np.nan,
+                'rounds': rounds[name],
+                'tasks': len(rows) + 1,
+                'full_resource_fits': sum(t['fraction'] == 1.0 for t, _ in rows),
+                'exhaustive_fits': full_grid,
+                'cached_tasks': sum(res['cached'] for _, res in rows) + int(result['cached']),
+                'wall_seconds': sum(res['wall_seconds'] for _, res in rows) + result['wall_seconds'],
+                'cpu_seconds': sum(res['cpu_seconds'] for _, res in rows) + result['cpu_seconds'],
+            })
+        report = pd.DataFrame(report).set_index('model')
+        report['cpu_per_wall'] = report['cpu_seconds'] / report['wall_seconds']
+        report.attrs['elapsed_seconds'] = time.perf_counter() - start
+        return best_estimators, report
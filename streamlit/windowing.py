@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def window_count(n, window_size, horizon=1, stride=1):
+    return max((n - window_size - horizon) // stride + 1, 0)
+
+
+def sliding_windows(data, window_size, horizon=1, stride=1, target=None):
+    # Read-only strided views over data: X is (n_windows, window_size, n_features) and y holds the
+    # `horizon` target values that follow each window, (n_windows, horizon). Nothing is copied.
+    # target is a column index into data, or a separate 1-D array aligned with it (default: column 0).
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data[:, None]
+    if target is None:
+        target = data[:, 0]
+    elif np.ndim(target) == 0:
+        target = data[:, int(target)]
+    else:
+        target = np.asarray(target)
+    if len(target) != len(data):
+        raise ValueError('target must have the same length as data')
+
+    n_windows = window_count(len(data), window_size, horizon, stride)
+    if n_windows == 0:
+        raise ValueError(f'{len(data)} rows are too few for window_size={window_size} and horizon={horizon}')
+    # sliding_window_view puts the window axis last; move it next to the sample axis
+    X = sliding_window_view(data, window_size, axis=0).transpose(0, 2, 1)[:n_windows * stride:stride]
+    y = sliding_window_view(target[window_size:], horizon)[:n_windows * stride:stride]
+    return X, y
+
+
+def create_sliding_window(data, window_size):
+    # Drop-in for the notebook helper: X is (n - window_size, window_size), y is (n - window_size,)
+    X, y = sliding_windows(data, window_size)
+    return X[:, :, 0], y[:, 0]
+
+
+def steps_per_epoch(n_windows, batch_size):
+    return math.ceil(n_windows / batch_size)
+
+
+def window_batches(X, y, batch_size=32, shuffle=False, seed=None, repeat=False):
+    # Yields (X_batch, y_batch); only one batch of windows is materialized at a time.
+    # With repeat=True the generator cycles forever, as Keras expects with steps_per_epoch.
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    while True:
+        order = rng.permutation(n) if shuffle else np.arange(n)
+        for start in range(0, n, batch_size):
+            idx = order[start:start + batch_size]
+            if not shuffle:
+                idx = slice(idx[0], idx[-1] + 1)
+            yield np.ascontiguousarray(X[idx], dtype=np.float32), np.ascontiguousarray(y[idx], dtype=np.float32)
+        if not repeat:
+            return
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app modules are flat files under streamlit/ and import each other by bare name
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit'))
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from anomaly_stream import QuantileSketch, RunningMoments, StreamingAnomalyScorer
+
+
+def errors(n=20000, seed=0):
+    return np.random.default_rng(seed).lognormal(-3, 1.5, n)
+
+
+def test_running_moments_match_numpy_over_uneven_batches():
+    values = errors()
+    moments = RunningMoments()
+    for part in np.array_split(values, [3, 100, 101, 5000]):
+        moments.update(part)
+    assert moments.count == len(values)
+    assert moments.mean == pytest.approx(values.mean())
+    assert moments.std == pytest.approx(values.std())
+
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.05])
+def test_quantile_sketch_stays_within_its_relative_error(accuracy):
+    values = np.concatenate([errors(), np.zeros(500)])
+    sketch = QuantileSketch(accuracy)
+    for part in np.array_split(np.random.default_rng(1).permutation(values), 17):
+        sketch.update(part)
+    ordered = np.sort(values)
+    for q in [0.0, 0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999, 1.0]:
+        exact = ordered[int(np.floor(q * (len(values) - 1)))]
+        assert abs(sketch.quantile(q) - exact) <= accuracy * exact + 1e-12, q
+
+
+def test_quantile_sketch_memory_grows_with_the_value_range_only():
+    sketch = QuantileSketch(0.01)
+    for seed in range(10):
+        sketch.update(errors(seed=seed))
+    assert sketch.count == 200000
+    assert len(sketch._counts) < 2000
+
+
+def test_scorer_flags_windows_above_the_baseline_threshold():
+    error_fn = lambda X: np.abs(X).mean(axis=1)
+    rng = np.random.default_rng(0)
+    scorer = StreamingAnomalyScorer(error_fn=error_fn, k=3.0, batch_size=64, max_latency=10.0)
+    scorer.fit_baseline(rng.normal(0, 1, (5000, 8)))
+    windows = rng.normal(0, 1, (200, 8))
+    windows[[5, 150]] += 10.0
+    result = scorer.submit(windows)
+    assert len(result) == 192
+    result = pd.concat([result, scorer.flush()], ignore_index=True)
+    assert len(result) == 200
+    flagged = set(result.loc[result['anomaly'].astype(bool), 'id'])
+    assert {5, 150} <= flagged
+    assert len(flagged) < 10
+    assert len(scorer.rescore(threshold=np.inf).query('anomaly')) == 0
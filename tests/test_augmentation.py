@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from augmentation import (AUGMENTATIONS, Augmenter, _join, augmented_batches, jitter, magnitude_warp, minmax_scale,
+                          time_warp, window_warp)
+
+
+def batch(n=16, steps=40, features=2, seed=0):
+    return 1.0 + np.random.default_rng(seed).standard_normal((n, steps, features)).cumsum(axis=1) * 0.1
+
+
+class FakeGenerator:
+    # Stands in for a fitted SequenceGAN: constant windows in [0, 1]
+    def __init__(self, seq_len, n_features=1):
+        self.seq_len = seq_len
+        self.n_features = n_features
+
+    def sample(self, n):
+        return np.full((n, self.seq_len, self.n_features), 0.5, dtype=np.float32)
+
+
+@pytest.mark.parametrize('name', sorted(AUGMENTATIONS))
+def test_augmentations_keep_shape_and_are_reproducible(name):
+    x = batch()
+    first = AUGMENTATIONS[name](x, np.random.default_rng(1))
+    again = AUGMENTATIONS[name](x, np.random.default_rng(1))
+    assert first.shape == x.shape
+    assert np.isfinite(first).all()
+    np.testing.assert_array_equal(first, again)
+
+
+def test_time_and_window_warp_keep_the_end_points():
+    x = batch()
+    for warp in (time_warp, window_warp):
+        out = warp(x, np.random.default_rng(2))
+        np.testing.assert_allclose(out[:, 0], x[:, 0])
+        np.testing.assert_allclose(out[:, -1], x[:, -1])
+
+
+def test_warps_with_zero_noise_are_identity():
+    x = batch()
+    np.testing.assert_allclose(magnitude_warp(x, np.random.default_rng(0), sigma=0.0), x)
+    np.testing.assert_allclose(jitter(x, np.random.default_rng(0), sigma=0.0), x)
+
+
+def test_augmenter_rejects_unknown_methods():
+    with pytest.raises(ValueError, match='unknown augmentations'):
+        Augmenter(methods=('jitter', 'rotate'))
+
+
+def test_minmax_scale():
+    np.testing.assert_allclose(minmax_scale(np.array([2.0, 4.0, 3.0])), [0.0, 1.0, 0.5])
+
+
+def test_join_puts_targets_after_the_window():
+    X = batch(2, 5, 2)
+    joined = _join(X, np.array([[7.0, 8.0], [9.0, 10.0]]))
+    assert joined.shape == (2, 7, 2)
+    np.testing.assert_array_equal(joined[:, 5:, 0], [[7.0, 8.0], [9.0, 10.0]])
+    np.testing.assert_array_equal(joined[:, 5:, 1], X[:, -1:, 1].repeat(2, axis=1))
+
+
+def test_batches_mix_real_and_synthetic_windows():
+    X, y = batch(100, 10, 1), np.arange(100, dtype=float)
+    stream = augmented_batches(X, y, 32, generator=FakeGenerator(11), synthetic_fraction=0.25, seed=0)
+    X_batch, y_batch = next(stream)
+    assert X_batch.shape == (32, 10, 1) and y_batch.shape == (32,)
+    lo, hi = X.min(), X.max()
+    np.testing.assert_allclose(X_batch[-8:], 0.5 * (hi - lo) + lo, rtol=1e-6)
+
+
+def test_generator_length_mismatch_is_reported_up_front():
+    X, y = batch(100, 10, 1), np.zeros((100, 3))
+    with pytest.raises(ValueError, match=r'generator.seq_len is 11 .* 10 \+ 3 = 13'):
+        augmented_batches(X, y, 32, generator=FakeGenerator(11), synthetic_fraction=0.25)
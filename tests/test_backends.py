@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import backends
+from backends import import_report, load_backend
+
+STREAMLIT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'streamlit')
+
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    monkeypatch.setattr(backends, 'BACKENDS', {'json': ['json', 'json.decoder'], 'missing': ['no_such_module']})
+    monkeypatch.setattr(backends, '_loaded', {})
+
+
+def test_load_backend_returns_the_first_module_and_reports_its_cost(fake_backends):
+    assert import_report() == [{'backend': 'json', 'loaded': False, 'seconds': None},
+                               {'backend': 'missing', 'loaded': False, 'seconds': None}]
+    import json
+    assert load_backend('json') is json
+    rows = {row['backend']: row for row in import_report()}
+    assert rows['json']['loaded'] and rows['json']['seconds'] >= 0
+    assert not rows['missing']['loaded']
+
+
+def test_a_backend_that_fails_to_import_is_not_recorded(fake_backends):
+    with pytest.raises(ImportError):
+        load_backend('missing')
+    assert not {row['backend']: row for row in import_report()}['missing']['loaded']
+
+
+def test_importing_the_modules_does_not_import_model_libraries():
+    modules = ['anomaly_stream', 'augmentation', 'benchmark', 'backends']
+    code = ('import sys\n' + ''.join(f'import {name}\n' for name in modules)
+            + "print(','.join(m for m in ('prophet', 'tensorflow', 'statsmodels', 'xgboost') if m in sys.modules))")
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, cwd=STREAMLIT_DIR)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.strip() == ''
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from backtesting import backtest, compare, forecast_errors, rolling_origins
+from lag_features import LagFeatureTransformer
+from windowing import create_sliding_window
+
+N_LAGS = 3
+LAGS = [f'y_lag_{k}' for k in range(1, N_LAGS + 1)]
+
+
+def series(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    return pd.Series(10 + np.sin(t / 4.0) + 0.1 * rng.standard_normal(n), index=pd.date_range('2020', periods=n),
+                     name='y')
+
+
+def lag_frame(y):
+    frame = pd.DataFrame({'y': y, 'weekday': y.index.dayofweek.astype(float)})
+    lagged = LagFeatureTransformer(n_lags=N_LAGS, columns=['y']).transform(frame)
+    return lagged.drop(columns='y'), lagged['y']
+
+
+def perturb_after(y, cut):
+    y = y.copy()
+    y.iloc[cut:] += 100.0
+    return y
+
+
+def model():
+    return Pipeline([('scaler', StandardScaler()), ('model', LinearRegression())])
+
+
+def test_rolling_origins_cover_the_tail():
+    splits = rolling_origins(100, 10, initial=0.7)
+    assert [test[0] for _, test in splits] == [70, 80, 90]
+    assert all(train[-1] + 1 == test[0] for train, test in splits)
+    assert rolling_origins(100, 10, initial=70, window=20)[0][0][0] == 50
+
+
+def test_forecast_errors_by_step():
+    errors = forecast_errors([[1.0, 2.0], [3.0, 4.0]], [[1.0, 3.0], [3.0, 2.0]])
+    assert errors['MAE'].tolist() == [0.0, 1.5]
+    assert errors.attrs['summary']['MAE'] == pytest.approx(0.75)
+
+
+def test_lag_rollout_does_not_see_the_target_inside_the_window():
+    y = series()
+    X, target = lag_frame(y)
+    horizon, initial = 20, len(target) - 20
+    forecasts, errors = backtest(model(), X, target, horizon, initial=initial, lags=LAGS)
+    # Changing every value from the origin on changes the lag columns of X[test], but none of the
+    # predictions, at any step
+    X_future, target_future = lag_frame(perturb_after(y, len(y) - horizon))
+    changed, _ = backtest(model(), X_future, target_future, horizon, initial=initial, lags=LAGS)
+    np.testing.assert_allclose(changed['predicted'], forecasts['predicted'])
+    assert not np.allclose(changed['actual'], forecasts['actual'])
+    assert errors.attrs['recursive']
+
+
+def test_without_lags_the_observed_lags_leak():
+    y = series()
+    X, target = lag_frame(y)
+    horizon, initial = 20, len(target) - 20
+    forecasts, _ = backtest(model(), X, target, horizon, initial=initial)
+    X_future, target_future = lag_frame(perturb_after(y, len(y) - horizon))
+    changed, _ = backtest(model(), X_future, target_future, horizon, initial=initial)
+    assert not np.allclose(changed['predicted'].to_numpy()[1:], forecasts['predicted'].to_numpy()[1:])
+
+
+def test_lag_rollout_equals_a_manual_recursive_forecast():
+    y = series()
+    X, target = lag_frame(y)
+    origin = len(target) - 5
+    forecasts, _ = backtest(model(), X, target, 5, initial=origin, lags=LAGS)
+    fitted = model().fit(X.iloc[:origin], target.iloc[:origin])
+    history = list(target.iloc[:origin])
+    for step in range(5):
+        row = X.iloc[[origin + step]].copy()
+        row[LAGS] = [history[-k] for k in range(1, N_LAGS + 1)]
+        history.append(fitted.predict(row)[0])
+    np.testing.assert_allclose(forecasts['predicted'], history[-5:], rtol=1e-5)
+
+
+def test_window_rollout_does_not_see_the_target_inside_the_window():
+    y = series()
+    horizon = 15
+
+    def windows(values):
+        X, target = create_sliding_window(values, 6)
+        return X.reshape(len(X), 6, 1), target
+
+    class LastStep:
+        # A window model: weighted sum of the window
+        def fit(self, X, y):
+            self.model_ = LinearRegression().fit(X[:, :, 0], y)
+            return self
+
+        def predict(self, X):
+            return self.model_.predict(np.asarray(X)[:, :, 0])
+
+        def get_params(self, deep=True):
+            return {}
+
+        def set_params(self, **params):
+            return self
+
+    X, target = windows(y.to_numpy())
+    initial = len(target) - horizon
+    base, _ = backtest(LastStep(), X, target, horizon, initial=initial, lags='window')
+    X_future, target_future = windows(perturb_after(y, len(y) - horizon).to_numpy())
+    changed, _ = backtest(LastStep(), X_future, target_future, horizon, initial=initial, lags='window')
+    np.testing.assert_allclose(changed['predicted'], base['predicted'])
+
+
+def test_compare_takes_lags_per_model():
+    y = series()
+    X, target = lag_frame(y)
+    summary, errors = compare({'lags': model(), 'leaky': model()}, X, target, 10, initial=0.8,
+                              lags={'lags': LAGS, 'leaky': None})
+    assert errors['lags'].attrs['recursive'] and not errors['leaky'].attrs['recursive']
+    assert list(summary.index) == ['lags', 'leaky']
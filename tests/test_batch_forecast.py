@@ -0,0 +1,59 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from batch_forecast import forecast_series, iter_series, run_batch
+
+PARAMS = {'horizon': 7, 'growth': 'linear', 'seasonality_mode': 'additive', 'weekly_seasonality': True,
+          'monthly_seasonality': False, 'yearly_seasonality': False, 'holidays': 'None'}
+
+
+def series(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'Date': pd.date_range('2021-01-01', periods=n).strftime('%Y-%m-%d'),
+                         'Close': 10 + 0.05 * np.arange(n) + rng.normal(0, 0.1, n)})
+
+
+def test_long_table_is_split_by_series_id(tmp_path):
+    table = pd.concat([series(seed=0).assign(series_id='a'), series(seed=1).assign(series_id='b')])
+    path = str(tmp_path / 'long.csv')
+    table.to_csv(path, index=False)
+    groups = dict(iter_series(path))
+    assert list(groups) == ['a', 'b']
+    assert list(groups['a'].columns) == ['Date', 'Close']
+    assert len(groups['b']) == 60
+
+
+def test_directory_yields_one_path_per_file(tmp_path):
+    for name in ['b.csv', 'a.csv', 'notes.txt']:
+        (tmp_path / name).write_text('')
+    assert list(iter_series(str(tmp_path))) == [('a', str(tmp_path / 'a.csv')), ('b', str(tmp_path / 'b.csv'))]
+
+
+def test_forecast_series_reports_failures_instead_of_raising():
+    report, forecast = forecast_series('bad', pd.DataFrame({'Date': [], 'Close': []}), PARAMS)
+    assert report['status'] == 'failed' and report['error']
+    assert forecast is None
+
+
+def test_forecast_series_returns_the_compact_forecast():
+    report, forecast = forecast_series('a', series(), dict(PARAMS))
+    assert report['status'] == 'ok' and report['rows'] == 60
+    assert list(forecast.columns) == ['series_id', 'ds', 'yhat', 'yhat_lower', 'yhat_upper']
+    assert len(forecast) == 60 + 7
+    assert (forecast['series_id'] == 'a').all()
+
+
+def test_run_batch_writes_forecasts_and_report(tmp_path):
+    source = tmp_path / 'series'
+    source.mkdir()
+    series(seed=0).to_csv(source / 'a.csv', index=False)
+    series(seed=1).to_csv(source / 'b.csv', index=False)
+    (source / 'broken.csv').write_text('Date,Close\n')
+    output = str(tmp_path / 'out.csv')
+    report = run_batch(str(source), output, PARAMS, workers=2)
+    assert dict(zip(report['series_id'], report['status'])) == {'a': 'ok', 'b': 'ok', 'broken': 'failed'}
+    forecasts = pd.read_csv(output)
+    assert sorted(forecasts['series_id'].unique()) == ['a', 'b']
+    assert os.path.exists(tmp_path / 'out.report.csv')
@@ -0,0 +1,63 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from benchmark import compare_results, load_series, parse_scale, run_suite, upscale
+
+
+def frame(n=50):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({'series_id': 'a', 'ds': pd.date_range('2020-01-01', periods=n, freq='W'),
+                         'y': 100 + np.cumsum(rng.normal(0, 1, n))})
+
+
+def test_parse_scale():
+    assert parse_scale('10x1') == (10, 1)
+    assert parse_scale('3') == (3, 3)
+
+
+def test_upscale_lengthens_and_multiplies_series():
+    base = frame()
+    assert upscale(base) is base
+    scaled = upscale(base, length=4, series=3, seed=1)
+    counts = scaled.groupby('series_id', sort=False).size()
+    assert list(counts.index) == ['a', 'a~1', 'a~2'] and (counts == 200).all()
+    first = scaled[scaled['series_id'] == 'a']
+    assert (first['ds'].diff().dropna() == pd.Timedelta(weeks=1)).all()
+    assert first['y'].iloc[0] == base['y'].iloc[0]
+    # The copy repeats the original's steps, up to a little noise
+    steps = np.diff(first['y'].to_numpy()[:50])
+    assert np.corrcoef(steps, np.diff(base['y'].to_numpy()))[0, 1] > 0.9
+    pd.testing.assert_frame_equal(scaled, upscale(base, length=4, series=3, seed=1))
+
+
+def payload(path, commit, rows):
+    with open(path, 'w') as f:
+        json.dump({'commit': commit, 'created': '2026-01-01T00:00:00', 'results': rows}, f)
+    return str(path)
+
+
+def test_compare_results_flags_regressions_and_failures(tmp_path):
+    def row(stage, seconds, status='ok'):
+        return {'dataset': 'nvda', 'scale': '1x1', 'model': 'mlp', 'stage': stage,
+                'wall_seconds': seconds, 'status': status}
+
+    baseline = payload(tmp_path / 'a.json', 'a', [row('fit', 1.0), row('predict', 0.01), row('backtest', 2.0),
+                                                 row('plot', 0.5)])
+    current = payload(tmp_path / 'b.json', 'b', [row('fit', 2.0), row('predict', 0.03), row('backtest', 1.0),
+                                                row('plot', 0.5, 'failed')])
+    comparison = compare_results(baseline, current)
+    verdicts = dict(zip(comparison['stage'], comparison['verdict']))
+    # predict is 3x slower but only by 20ms, which is timer noise
+    assert verdicts == {'fit': 'regression', 'predict': 'ok', 'backtest': 'improvement', 'plot': 'failed'}
+    assert comparison.attrs == {'baseline': 'a', 'current': 'b'}
+
+
+def test_run_suite_times_every_stage():
+    results = run_suite(['nvda'], ['random_forest'], ['1x2'])
+    cases = results[results['model'] == 'random_forest']
+    assert set(cases['stage']) == {'preprocess', 'fit', 'predict', 'backtest'}
+    assert (cases['status'] == 'ok').all()
+    assert (results['series'] == 2).all()
+    assert results['rows'].iloc[0] == 2 * len(load_series('nvda'))
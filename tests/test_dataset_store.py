@@ -0,0 +1,90 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataset_store
+from dataset_store import DATASETS, REPO_ROOT, ensure_ingested, load_csv, load_dataset
+
+CSV = 'Date,Close,Ticker\n2020-01-02,1.5,A\n2020-01-03,2.5,B\n01/06/2020T00:00:00Z,3.5,A\n'
+
+
+def write(path, text=CSV):
+    path.write_text(text)
+    return str(path)
+
+
+def test_round_trip_types_and_values(tmp_path):
+    path = write(tmp_path / 'prices.csv')
+    data = load_csv(path, dates={'Date': '%Y-%m-%d'})
+    assert data['Date'].dtype == 'datetime64[ns]'
+    assert data['Date'].tolist()[:2] == [pd.Timestamp('2020-01-02'), pd.Timestamp('2020-01-03')]
+    # A row in another layout is parsed by the generic fallback
+    assert data['Date'].iloc[2] == pd.Timestamp('2020-01-06')
+    assert data['Close'].tolist() == [1.5, 2.5, 3.5]
+    assert isinstance(data['Ticker'].dtype, pd.CategoricalDtype)
+    assert data['Ticker'].astype(str).tolist() == ['A', 'B', 'A']
+
+
+def test_numeric_columns_are_memory_mapped(tmp_path):
+    data = load_csv(write(tmp_path / 'prices.csv'), dates={'Date': '%Y-%m-%d'})
+    base = data['Close'].to_numpy()
+    while getattr(base, 'base', None) is not None and not isinstance(base, np.memmap):
+        base = base.base
+    assert isinstance(base, np.memmap)
+
+
+def test_store_is_rebuilt_only_when_the_content_changes(tmp_path, monkeypatch):
+    path = write(tmp_path / 'prices.csv')
+    first = ensure_ingested(path)
+    calls = []
+    real_ingest = dataset_store.ingest
+    monkeypatch.setattr(dataset_store, 'ingest', lambda *args: calls.append(1) or real_ingest(*args))
+    os.utime(path, ns=(first['source_mtime_ns'] + 10 ** 9, first['source_mtime_ns'] + 10 ** 9))
+    assert ensure_ingested(path)['dir'] == first['dir']
+    assert calls == []
+    write(tmp_path / 'prices.csv', CSV + '2020-01-07,4.5,C\n')
+    assert ensure_ingested(path)['rows'] == 4
+    assert calls == [1]
+    assert len([name for name in os.listdir(tmp_path / '.columnar') if name.startswith('prices-')]) == 1
+
+
+@pytest.mark.parametrize('name', sorted(DATASETS))
+def test_bundled_datasets_match_read_csv(name):
+    spec = DATASETS[name]
+    expected = pd.read_csv(os.path.join(REPO_ROOT, spec['path']), **spec.get('read_csv', {})).reset_index(drop=True)
+    data = load_dataset(name)
+    assert list(data.columns) == list(expected.columns)
+    assert len(data) == len(expected)
+    for column in expected.select_dtypes('number').columns:
+        np.testing.assert_array_equal(data[column].to_numpy(), expected[column].to_numpy())
+
+
+def test_concurrent_ingests_of_one_csv_do_not_collide(tmp_path):
+    path = write(tmp_path / 'prices.csv', 'Date,Close\n' + ''.join(f'2020-01-{d:02d},{d}.5\n' for d in range(1, 29)))
+    errors = []
+
+    def run():
+        try:
+            dataset_store.ingest(path, {'Date': '%Y-%m-%d'})
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    # One published version and its manifest; no staging directories are left behind
+    assert sorted(os.listdir(tmp_path / '.columnar')) == [ensure_ingested(path, {'Date': '%Y-%m-%d'})['dir'],
+                                                          'prices.json']
+    assert load_csv(path, dates={'Date': '%Y-%m-%d'})['Close'].tolist() == [d + 0.5 for d in range(1, 29)]
+
+
+def test_new_settings_replace_the_version_in_place(tmp_path):
+    path = write(tmp_path / 'prices.csv')
+    assert load_csv(path)['Date'].dtype != 'datetime64[ns]'
+    assert load_csv(path, dates={'Date': '%Y-%m-%d'})['Date'].dtype == 'datetime64[ns]'
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from downsampling import WEBGL_THRESHOLD, aggregate_ohlc, line_trace, lttb_indices
+
+
+def reference_lttb(x, y, n_out):
+    # Straight from Steinarsson's description, one bucket at a time
+    n = len(x)
+    every = (n - 2) / (n_out - 2)
+    picked, a = [0], 0
+    for i in range(n_out - 2):
+        lo, hi = int(np.floor(i * every)) + 1, int(np.floor((i + 1) * every)) + 1
+        next_lo, next_hi = hi, min(int(np.floor((i + 2) * every)) + 1, n)
+        avg_x, avg_y = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    picked.append(n - 1)
+    return np.array(picked)
+
+
+def test_lttb_matches_the_reference_algorithm():
+    rng = np.random.default_rng(0)
+    x = np.arange(5000, dtype=float)
+    y = rng.standard_normal(5000).cumsum()
+    for n_out in [3, 10, 257, 1000]:
+        np.testing.assert_array_equal(lttb_indices(x, y, n_out), reference_lttb(x, y, n_out))
+
+
+def test_lttb_keeps_end_points_spikes_and_gaps():
+    y = np.zeros(1000)
+    y[437] = 50.0
+    y[[10, 20, 21, 22]] = np.nan
+    idx = lttb_indices(pd.date_range('2020', periods=1000).values, y, 50)
+    assert len(idx) == 50 and idx[0] == 0 and idx[-1] == 999
+    assert 437 in idx
+    # One NaN per gap is kept as a break in the line
+    assert set(idx[np.isnan(y[idx])]) == {10, 20}
+    assert (np.diff(idx) > 0).all()
+
+
+def test_short_series_keep_their_gaps():
+    y = np.array([1.0, np.nan, 3.0, np.nan, np.nan])
+    np.testing.assert_array_equal(lttb_indices(np.arange(5), y, 10), np.arange(5))
+
+
+def test_leading_and_trailing_nans_are_not_gap_markers():
+    y = np.r_[np.full(5, np.nan), np.arange(100.0), np.full(5, np.nan)]
+    idx = lttb_indices(np.arange(110), y, 10)
+    assert len(idx) == 10 and not np.isnan(y[idx]).any()
+
+
+def test_short_series_pass_through():
+    np.testing.assert_array_equal(lttb_indices(np.arange(5), np.arange(5.0), 10), np.arange(5))
+
+
+def test_aggregate_ohlc_buckets():
+    data = pd.DataFrame({'Date': pd.date_range('2020', periods=10), 'Open': np.arange(10.0),
+                         'High': np.arange(10.0) + 1, 'Low': np.arange(10.0) - 1, 'Close': np.arange(10.0) + 0.5,
+                         'Volume': np.ones(10)})
+    candles = aggregate_ohlc(data, 2)
+    assert candles['Open'].tolist() == [0.0, 5.0]
+    assert candles['High'].tolist() == [5.0, 10.0]
+    assert candles['Low'].tolist() == [-1.0, 4.0]
+    assert candles['Close'].tolist() == [4.5, 9.5]
+    assert candles['Volume'].tolist() == [5.0, 5.0]
+    assert aggregate_ohlc(data, 20) is data
+
+
+def test_line_trace_switches_to_webgl():
+    x = np.arange(20000)
+    assert isinstance(line_trace(x, np.sin(x), 'small', 1000), go.Scatter)
+    assert isinstance(line_trace(x, np.sin(x), 'large', WEBGL_THRESHOLD + 1), go.Scattergl)
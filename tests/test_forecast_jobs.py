@@ -0,0 +1,80 @@
+import threading
+import time
+
+from forecast_jobs import ForecastJobRunner
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def wait_for(runner, session, key, fn, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status, result = runner.request(session, key, fn)
+        if status != 'pending':
+            return status, result
+        time.sleep(0.01)
+    raise AssertionError('job did not finish')
+
+
+def test_sessions_share_one_job_per_key():
+    calls = []
+    runner = ForecastJobRunner(debounce=0.0)
+    fn = lambda: calls.append(1) or 'forecast'
+    runner.request('a', 'k', fn)
+    assert wait_for(runner, 'b', 'k', fn) == ('done', 'forecast')
+    assert len(calls) == 1
+
+
+def test_idle_sessions_expire_and_release_their_last_result():
+    clock = Clock()
+    runner = ForecastJobRunner(debounce=0.0, session_ttl=60, clock=clock)
+    assert wait_for(runner, 'old', 'k', lambda: 'forecast')[0] == 'done'
+    clock.now = 61
+    runner.request('new', 'k', lambda: 'forecast')
+    assert runner.sessions == 1
+    assert 'old' not in runner._last_good and 'old' not in runner._wanted
+
+
+def test_job_wanted_only_by_an_abandoned_session_is_cancelled():
+    clock = Clock()
+    started = threading.Event()
+    runner = ForecastJobRunner(debounce=0.5, session_ttl=60, clock=clock)
+    runner.request('gone', 'stale', started.set)
+    clock.now = 61
+    runner.request('active', 'fresh', lambda: 'forecast')
+    assert 'stale' not in runner._jobs
+    assert not started.wait(1.0)
+
+
+def test_changing_parameters_cancels_the_queued_job():
+    started = threading.Event()
+    runner = ForecastJobRunner(debounce=0.5)
+    runner.request('a', 'first', started.set)
+    runner.request('a', 'second', lambda: 'forecast')
+    assert 'first' not in runner._jobs
+    assert not started.wait(1.0)
+
+
+def test_a_failure_reaches_every_session_waiting_on_the_key():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError('no data')
+
+    runner = ForecastJobRunner(debounce=0.0)
+    runner.request('b', 'k', broken)
+    status, error = wait_for(runner, 'a', 'k', broken)
+    assert status == 'failed' and isinstance(error, ValueError)
+    assert runner.request('b', 'k', broken) == ('failed', error)
+    assert len(calls) == 1
+    # Asking again after seeing the failure retries the job
+    assert runner.request('a', 'k', broken)[0] == 'pending'
+    assert wait_for(runner, 'a', 'k', broken)[0] == 'failed'
+    assert len(calls) == 2
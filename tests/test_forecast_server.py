@@ -0,0 +1,126 @@
+import http.server
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecast_server
+from forecast_server import ForecastClient, ForecastService, ServerError, serve
+from model_cache import ModelCache
+
+PARAMS = {'growth': 'linear', 'seasonality_mode': 'additive', 'weekly_seasonality': False,
+          'monthly_seasonality': False, 'yearly_seasonality': False, 'holidays': 'None'}
+
+
+def fake_predict(self, request, horizon):
+    with self._lock:
+        self._counts['predict_calls'] += 1
+    n = len(request.data) + horizon
+    prediction = {'ds': np.arange(n).astype('datetime64[D]').astype('datetime64[ns]'), 'yhat': np.arange(n, dtype=float),
+                  'yhat_lower': np.zeros(n), 'yhat_upper': np.zeros(n), 'components': {},
+                  'rows': len(request.data), 'horizon': horizon, 'fit_report': {'mode': 'cold', 'rows': 0, 'seconds': 0}}
+    with self._lock:
+        self._predictions[request.key] = prediction
+    return prediction
+
+
+def series(n=30, offset=0.0):
+    return pd.DataFrame({'ds': pd.date_range('2020', periods=n), 'y': np.arange(n) + offset})
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setattr(ForecastService, '_predict', fake_predict)
+    service = ForecastService(cache=ModelCache(), batch_window=0.05)
+    yield service
+    service.close()
+
+
+def test_concurrent_requests_for_one_model_share_a_predict(service):
+    futures = [service.submit(series(), PARAMS, horizon) for horizon in (5, 10, 3)]
+    results = [future.result(5) for future in futures]
+    assert [len(result['yhat']) for result in results] == [35, 40, 33]
+    assert service.metrics()['predict_calls'] == 1
+
+
+def test_key_locks_are_dropped_once_requests_complete(service):
+    for offset in range(20):
+        service.forecast(series(offset=offset), PARAMS, 5, timeout=5)
+    assert service.metrics()['keys_in_flight'] == 0
+    assert len(service._key_locks) == 0
+
+
+def test_client_raises_server_error_on_http_errors(monkeypatch):
+    def broken(self, request, horizon):
+        raise RuntimeError('fit exploded')
+
+    monkeypatch.setattr(ForecastService, '_predict', broken)
+    server = serve(port=0, cache=ModelCache())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = ForecastClient(f'http://127.0.0.1:{server.server_address[1]}', timeout=10)
+        assert client.available()
+        with pytest.raises(ServerError, match='fit exploded') as info:
+            client.forecast(5, PARAMS, data=series())
+        assert info.value.status == 500
+    finally:
+        server.shutdown()
+        server.server_close()
+        server.service.close()
+
+
+def test_client_raises_os_error_when_nothing_listens():
+    with pytest.raises(OSError):
+        ForecastClient('http://127.0.0.1:9', timeout=1).forecast(5, PARAMS, data=series())
+
+
+class _BadReplyHandler(http.server.BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = b'{"ds": ["2020-01-01"' if self.path == '/truncated' else b'<html>bad gateway</html>'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        # A truncated reply announces more bytes than it sends
+        self.send_header('Content-Length', str(len(body) + (100 if self.path == '/truncated' else 0)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.mark.parametrize('path', ['/html', '/truncated'])
+def test_client_raises_server_error_on_unreadable_replies(path):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _BadReplyHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        client = ForecastClient(f'http://127.0.0.1:{server.server_address[1]}', timeout=10)
+        with pytest.raises(ServerError):
+            client._call(path, {})
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_loading_a_dataset_does_not_block_other_requests(service, monkeypatch):
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_load(name):
+        loading.set()
+        release.wait(5)
+        return pd.DataFrame({'Date': pd.date_range('2020', periods=3), 'Close': [1.0, 2.0, 3.0]})
+
+    monkeypatch.setattr(forecast_server, 'load_dataset', slow_load)
+    loader = threading.Thread(target=service.series, args=('nvda',))
+    loader.start()
+    assert loading.wait(5)
+    try:
+        assert service.forecast(series(), PARAMS, 5, timeout=2)['yhat'] is not None
+        assert 'predict_calls' in service.metrics()
+    finally:
+        release.set()
+        loader.join()
+    assert len(service.series('nvda')) == 3
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from global_forecast import GlobalForecaster, _shift, grouped_features
+
+
+def walmart_like(stores=(3, 7, 30, 41), weeks=60, seed=0):
+    rng = np.random.default_rng(seed)
+    parts = []
+    for store in stores:
+        t = np.arange(weeks)
+        parts.append(pd.DataFrame({
+            'Store': store, 'Date': pd.date_range('2011-01-07', periods=weeks, freq='W-FRI'),
+            'Weekly_Sales': store * 1000 * (1 + 0.2 * np.sin(t / 4.0)) + rng.normal(0, 50, weeks),
+            'Holiday_Flag': (t % 13 == 0).astype(int), 'Temperature': rng.normal(60, 10, weeks),
+            'Fuel_Price': rng.normal(3, 0.2, weeks), 'CPI': rng.normal(210, 2, weeks),
+            'Unemployment': rng.normal(7, 0.5, weeks)}))
+    return pd.concat(parts, ignore_index=True).sample(frac=1.0, random_state=seed)
+
+
+def test_lags_and_windows_stay_within_each_store():
+    frame = walmart_like()
+    X, y, ordered = grouped_features(frame)
+    by_store = ordered.groupby('Store')['Weekly_Sales']
+    np.testing.assert_allclose(X['lag_2'], by_store.shift(2), equal_nan=True)
+    np.testing.assert_allclose(X['roll4_mean'], by_store.transform(lambda s: s.shift(1).rolling(4).mean()),
+                               equal_nan=True)
+    np.testing.assert_allclose(X['holiday_lead_1'], ordered.groupby('Store')['Holiday_Flag'].shift(-1),
+                               equal_nan=True)
+    np.testing.assert_array_equal(y, ordered['Weekly_Sales'])
+
+
+def test_shift_handles_leads_across_boundaries():
+    pos = np.array([0, 1, 2, 0, 1])
+    np.testing.assert_array_equal(_shift(np.arange(5.0), -1, pos), [1, 2, np.nan, 4, np.nan])
+
+
+def test_shift_by_zero_is_the_series_itself():
+    pos = np.array([0, 1, 2, 0, 1])
+    np.testing.assert_array_equal(_shift(np.arange(5.0), 0, pos), np.arange(5.0))
+    X, _, ordered = grouped_features(walmart_like(), holiday_leads=(0, 1))
+    np.testing.assert_array_equal(X['holiday_lead_0'], ordered['Holiday_Flag'])
+
+
+def test_predicting_a_subset_of_stores_matches_the_full_frame():
+    frame = walmart_like()
+    start = frame['Date'].sort_values().unique()[-10]
+    model = GlobalForecaster().fit(frame[frame['Date'] < start])
+    full = model.predict(frame, start)
+    only = model.predict(frame[frame['Store'] == 30], start)
+    expected = full[full['Store'] == 30].reset_index(drop=True)
+    np.testing.assert_allclose(only['prediction'].to_numpy(), expected['prediction'].to_numpy())
+
+
+def test_unseen_store_is_rejected():
+    frame = walmart_like()
+    model = GlobalForecaster().fit(frame[frame['Store'] != 41])
+    with pytest.raises(ValueError, match='41'):
+        model.predict(frame)
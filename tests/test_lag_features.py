@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from lag_features import LagFeatureTransformer
+
+
+def frame(n=60, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'when': pd.date_range('2020-01-01', periods=n),
+                         'store': pd.Categorical(rng.choice(['a', 'b'], n)),
+                         'y': 1000 + rng.standard_normal(n).cumsum() + 1e-6,
+                         'x': rng.standard_normal(n)})
+
+
+def test_matches_pandas_shift_and_rolling():
+    X = frame()
+    out = LagFeatureTransformer(lags=(1, 3), leads=(2,), diffs=(1,), windows=(4,),
+                                window_stats=('mean', 'std', 'min', 'max'), columns=['y', 'x'],
+                                dropna=False).transform(X)
+    for column in ['y', 'x']:
+        s = X[column]
+        expected = {f'{column}_lag_1': s.shift(1), f'{column}_lag_3': s.shift(3), f'{column}_lead_2': s.shift(-2),
+                    f'{column}_diff_1': s.diff(1)}
+        past = s.shift(1).rolling(4)
+        expected.update({f'{column}_roll4_{stat}': getattr(past, stat)() for stat in ('mean', 'std', 'min', 'max')})
+        for name, values in expected.items():
+            np.testing.assert_allclose(out[name].to_numpy(dtype=float), values.to_numpy(), rtol=1e-5, atol=1e-4,
+                                       equal_nan=True, err_msg=name)
+
+
+def test_passthrough_columns_keep_their_dtypes_and_values():
+    X = frame()
+    out = LagFeatureTransformer(n_lags=2, columns=['y']).transform(X)
+    assert out['when'].dtype == X['when'].dtype
+    assert isinstance(out['store'].dtype, pd.CategoricalDtype)
+    assert out['y'].dtype == np.float64
+    assert (out['y'].to_numpy() == X['y'].to_numpy()[2:]).all()
+    assert out['y_lag_1'].dtype == np.float32
+    assert list(out.columns) == LagFeatureTransformer(n_lags=2, columns=['y']).feature_names(X)
+
+
+def test_input_is_not_modified():
+    X = frame()
+    before = X.copy()
+    LagFeatureTransformer(n_lags=3, windows=(5,)).transform(X)
+    pd.testing.assert_frame_equal(X, before)
+
+
+def test_dropna_trims_lookback_and_lookahead():
+    X = frame()
+    out = LagFeatureTransformer(n_lags=3, leads=(2,), windows=(5,), columns=['y']).transform(X)
+    assert len(out) == len(X) - 5 - 2
+    assert not out.isna().any().any()
+
+
+def test_dropna_drops_rows_touched_by_gaps_like_pandas():
+    X = frame()
+    X.loc[10, 'y'] = np.nan
+    X.loc[30, 'store'] = np.nan
+    features = LagFeatureTransformer(n_lags=2, leads=(1,), columns=['y'])
+    expected = features.set_params(dropna=False).transform(X).dropna()
+    out = features.set_params(dropna=True).transform(X)
+    pd.testing.assert_frame_equal(out, expected)
+    assert not {9, 10, 11, 12, 30}.intersection(out.index)
+    chunks = [X.iloc[i:i + 7] for i in range(0, len(X), 7)]
+    pd.testing.assert_frame_equal(pd.concat(features.transform_chunks(chunks)), out)
+
+
+@pytest.mark.parametrize('chunk', [7, 20, 60])
+def test_chunked_transform_equals_full_transform(chunk):
+    X = frame()
+    features = LagFeatureTransformer(n_lags=3, leads=(1,), windows=(4,), columns=['y', 'x'])
+    chunks = [X.iloc[i:i + chunk] for i in range(0, len(X), chunk)]
+    pd.testing.assert_frame_equal(pd.concat(features.transform_chunks(chunks)), features.transform(X))
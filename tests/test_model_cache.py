@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from model_cache import ModelCache, config_key, series_key
+from model_pipeline import fit_prophet
+
+PARAMS = {'growth': 'linear', 'seasonality_mode': 'additive', 'weekly_seasonality': False,
+          'monthly_seasonality': False, 'yearly_seasonality': False, 'holidays': 'None'}
+
+
+def series(n=120):
+    return pd.DataFrame({'ds': pd.date_range('2020-01-01', periods=n), 'y': np.linspace(10, 20, n) + np.sin(np.arange(n))})
+
+
+def test_series_key_depends_on_values_and_params():
+    data = series()
+    assert series_key(data, PARAMS) == series_key(data.copy(), dict(reversed(list(PARAMS.items()))))
+    changed = data.copy()
+    changed.loc[5, 'y'] += 1e-9
+    assert series_key(changed, PARAMS) != series_key(data, PARAMS)
+    assert series_key(data, {**PARAMS, 'growth': 'logistic'}) != series_key(data, PARAMS)
+    assert config_key(PARAMS) == config_key(dict(PARAMS))
+
+
+def test_memory_cache_is_lru_and_counts_hits():
+    cache = ModelCache(max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
+def test_latest_tracks_the_last_fit_per_config():
+    cache = ModelCache()
+    cache.put('k1', 'first', config='cfg', report={'mode': 'cold'})
+    cache.put('k2', 'second', config='cfg', report={'mode': 'warm'})
+    assert cache.latest('cfg') == ('second', {'mode': 'warm'})
+    assert cache.latest('other') is None
+
+
+def test_identical_requests_reuse_the_fitted_model(tmp_path):
+    cache = ModelCache(cache_dir=str(tmp_path))
+    model, report = fit_prophet(series(), PARAMS, cache=cache)
+    again, report_again = fit_prophet(series(), PARAMS, cache=cache)
+    assert report['mode'] == 'cold' and report_again['mode'] == 'cached'
+    assert again is model
+    # A new process (empty memory) loads the model from disk
+    fresh = ModelCache(cache_dir=str(tmp_path))
+    loaded, report_loaded = fit_prophet(series(), PARAMS, cache=fresh)
+    assert report_loaded['mode'] == 'cached'
+    future = model.make_future_dataframe(periods=5)
+    np.testing.assert_allclose(loaded.predict(future)['yhat'], model.predict(future)['yhat'])
+
+
+def test_disk_cache_is_bounded(tmp_path):
+    cache = ModelCache(cache_dir=str(tmp_path), max_disk_bytes=1)
+    fit_prophet(series(), PARAMS, cache=cache)
+    fit_prophet(series(130), PARAMS, cache=cache)
+    assert len([name for name in tmp_path.iterdir() if name.suffix == '.json']) <= 1
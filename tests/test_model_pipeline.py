@@ -0,0 +1,88 @@
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import model_pipeline
+from model_cache import ModelCache
+from model_pipeline import (FORECAST_COLUMNS, extends_history, fit_prophet, forecast_frame, prophet_forecast,
+                            render_forecast)
+
+PARAMS = {'growth': 'linear', 'seasonality_mode': 'additive', 'weekly_seasonality': True,
+          'monthly_seasonality': False, 'yearly_seasonality': False, 'holidays': 'None'}
+
+
+def series(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    return pd.DataFrame({'ds': pd.date_range('2020-01-01', periods=n),
+                         'y': 50 + 0.1 * t + 2 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 0.3, n)})
+
+
+def test_appended_rows_are_fitted_warm_and_match_a_cold_fit():
+    full = series()
+    cache = ModelCache()
+    _, first = fit_prophet(full.iloc[:180], PARAMS, cache=cache)
+    model, report = fit_prophet(full, PARAMS, cache=cache)
+    assert first['mode'] == 'cold' and report['mode'] == 'warm'
+    assert report['new_rows'] == 20
+    cold, _ = fit_prophet(full, PARAMS, cache=None)
+    future = cold.make_future_dataframe(periods=14)
+    np.testing.assert_allclose(model.predict(future)['yhat'], cold.predict(future)['yhat'], rtol=1e-3)
+
+
+def test_edited_history_is_fitted_cold():
+    full = series()
+    cache = ModelCache()
+    fit_prophet(full.iloc[:180], PARAMS, cache=cache)
+    edited = full.copy()
+    edited.loc[10, 'y'] += 5.0
+    assert fit_prophet(edited, PARAMS, cache=cache)[1]['mode'] == 'cold'
+
+
+def test_warm_start_is_per_series_id():
+    full = series()
+    cache = ModelCache()
+    fit_prophet(full.iloc[:180], PARAMS, cache=cache, series_id='a')
+    assert fit_prophet(full, PARAMS, cache=cache, series_id='b')[1]['mode'] == 'cold'
+
+
+def test_extends_history_needs_new_rows():
+    model, _ = fit_prophet(series(100), PARAMS, cache=None)
+    assert extends_history(model, series(120))
+    assert not extends_history(model, series(100))
+    assert not extends_history(model, series(120, seed=1))
+
+
+def history(n=120):
+    data = series(n)
+    return pd.DataFrame({'Date': data['ds'], 'Close': data['y']})
+
+
+def test_compact_forecast_matches_the_full_predict_frame():
+    data = history()
+    result = prophet_forecast(data, 14, cache=None, components=True, **PARAMS)
+    model, _ = fit_prophet(data.rename(columns={'Date': 'ds', 'Close': 'y'}), PARAMS, cache=None)
+    full = model.predict(model.make_future_dataframe(periods=14))
+    frame = forecast_frame(result)
+    assert list(frame.columns) == list(FORECAST_COLUMNS) and len(frame) == 120 + 14
+    pd.testing.assert_frame_equal(frame[['ds', 'yhat']], full[['ds', 'yhat']], check_exact=False, rtol=1e-3)
+    # The bounds come from sampled trend paths
+    pd.testing.assert_frame_equal(frame, full[list(FORECAST_COLUMNS)], check_exact=False, rtol=1e-2)
+    assert set(result['components']) == {'trend', 'weekly', 'additive_terms', 'multiplicative_terms'}
+    assert 'components' not in prophet_forecast(data, 14, cache=None, **PARAMS)
+
+
+def test_render_forecast_reuses_figures_per_key_and_point_budget(monkeypatch):
+    monkeypatch.setattr(model_pipeline, 'FIGURE_CACHE', OrderedDict())
+    monkeypatch.setattr(model_pipeline, 'FIGURE_CACHE_ENTRIES', 2)
+    data = history()
+    result = prophet_forecast(data, 14, cache=None, **PARAMS)
+    figure = render_forecast(data, result, max_points=50)
+    assert render_forecast(data, result, max_points=50) is figure
+    assert render_forecast(data, result, max_points=60) is not figure
+    # Every trace is decimated to the point budget
+    assert all(len(trace.x) <= 50 for trace in figure.data)
+    render_forecast(data, dict(result, key='other'), max_points=50)
+    assert list(model_pipeline.FIGURE_CACHE) == [(result['key'], 60), ('other', 50)]
+    assert render_forecast(data, dict(result, key=None)) is not render_forecast(data, dict(result, key=None))
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+from sklearn.ensemble import IsolationForest
+
+from neighbor_anomaly import NeighborAnomalyDetector, chunked_predict
+
+
+def points(n=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(0, 1, (n, 3))
+    X[:20] += rng.normal(0, 8, (20, 3))
+    return X
+
+
+@pytest.mark.parametrize('algorithm', ['kd_tree', 'ball_tree'])
+def test_matches_dbscan_noise_for_min_samples_2(algorithm):
+    X = points()
+    noise = DBSCAN(eps=0.4, min_samples=2).fit_predict(X) == -1
+    flagged = NeighborAnomalyDetector(min_samples=2, eps=0.4, algorithm=algorithm, chunk_size=300).fit(X).predict(
+        X, exclude_self=True) == -1
+    np.testing.assert_array_equal(flagged, noise)
+
+
+def test_partial_fit_scores_like_a_single_fit():
+    X = points()
+    whole = NeighborAnomalyDetector(min_samples=4, eps=0.5).fit(X)
+    grown = NeighborAnomalyDetector(min_samples=4, eps=0.5, rebuild_ratio=0.5).fit(X[:1500])
+    for part in np.array_split(X[1500:], 5):
+        grown.partial_fit(part)
+    queries = points(300, seed=1)
+    np.testing.assert_allclose(grown.score_samples(queries), whole.score_samples(queries))
+
+
+def test_contamination_sets_the_reference_threshold():
+    X = points()
+    detector = NeighborAnomalyDetector(min_samples=5, contamination=0.02).fit(X)
+    assert (detector.predict(X, exclude_self=True) == -1).mean() == pytest.approx(0.02, abs=0.002)
+
+
+def test_index_is_capped_by_max_index_points():
+    detector = NeighborAnomalyDetector(max_index_points=500, eps=1.0, chunk_size=200).fit(points())
+    detector.partial_fit(points(seed=2))
+    assert len(detector._points) + detector._buffered() == 500
+
+
+def test_chunked_predict_equals_predict():
+    X = points()
+    forest = IsolationForest(random_state=0).fit(X)
+    np.testing.assert_array_equal(chunked_predict(forest, X, chunk_size=333, n_jobs=2), forest.predict(X))
+    np.testing.assert_allclose(chunked_predict(forest, X, chunk_size=333, method='score_samples'),
+                               forest.score_samples(X))
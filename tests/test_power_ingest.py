@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import power_ingest
+from power_ingest import POWER_COLUMNS, PeriodAggregator, ingest, load_power, parse_timestamps
+
+
+def write_power_file(path, minutes=3 * 1440 + 77, seed=0):
+    rng = np.random.default_rng(seed)
+    when = pd.Timestamp('2006-12-16 17:24:00') + pd.to_timedelta(np.arange(minutes), unit='min')
+    frame = pd.DataFrame({'Date': [f'{t.day}/{t.month}/{t.year}' for t in when], 'Time': when.strftime('%H:%M:%S')})
+    for j, name in enumerate(POWER_COLUMNS):
+        values = np.round(rng.uniform(0, 10 * (j + 1), minutes), 3).astype(object)
+        values[rng.random(minutes) < 0.02] = '?'
+        frame[name] = values
+    frame.to_csv(path, sep=';', index=False)
+    return path
+
+
+def reference(path, freq, how):
+    # The notebook's original pipeline: parse everything, fill with the column mean, resample
+    data = pd.read_csv(path, sep=';', na_values=['?'])
+    data.index = pd.to_datetime(data['Date'] + ' ' + data['Time'], format='%d/%m/%Y %H:%M:%S')
+    data = data[list(POWER_COLUMNS)].astype(float)
+    data = data.fillna(data.mean())
+    return getattr(data.resample(freq), how)()
+
+
+def test_parse_timestamps():
+    stamps = parse_timestamps(pd.Series(['16/12/2006', '17/12/2006']), pd.Series(['17:24:00', '00:00:30']))
+    np.testing.assert_array_equal(stamps.astype('datetime64[ns]'),
+                                  np.array(['2006-12-16T17:24:00', '2006-12-17T00:00:30'], dtype='datetime64[ns]'))
+
+
+@pytest.mark.parametrize('freq', ['D', 'h'])
+@pytest.mark.parametrize('how', ['sum', 'mean'])
+def test_chunked_aggregates_match_the_in_memory_pipeline(tmp_path, freq, how):
+    path = write_power_file(tmp_path / 'power.txt')
+    aggregators, rows = ingest(path, freqs=(freq,), chunk_size=1000)
+    assert rows == 3 * 1440 + 77
+    result = aggregators[freq].result(how)
+    expected = reference(path, freq, how)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-6)
+    assert (result.index == expected.index).all()
+
+
+def test_chunk_size_does_not_change_the_result(tmp_path):
+    path = write_power_file(tmp_path / 'power.txt')
+    small = ingest(path, freqs=('h',), chunk_size=333)[0]['h'].result('sum')
+    whole = ingest(path, freqs=('h',), chunk_size=10 ** 6)[0]['h'].result('sum')
+    np.testing.assert_allclose(small.to_numpy(), whole.to_numpy(), rtol=1e-9)
+
+
+def test_fill_none_skips_missing_values():
+    aggregator = PeriodAggregator(['x'], 'D').update(np.array([0, 3600 * 10 ** 9, 86400 * 10 ** 9], dtype=np.int64),
+                                                    np.array([[1.0], [np.nan], [5.0]]))
+    assert aggregator.result('mean', fill=None)['x'].tolist() == [1.0, 5.0]
+    assert aggregator.result('sum', fill='mean')['x'].tolist() == [4.0, 5.0]
+
+
+def test_aggregates_are_cached_and_invalidated(tmp_path, monkeypatch):
+    monkeypatch.setattr(power_ingest, '_store_dir', lambda path: str(tmp_path / 'store'))
+    path = write_power_file(tmp_path / 'power.txt')
+    first = load_power(str(path), freq='D')
+    calls = []
+    real_ingest = power_ingest.ingest
+    monkeypatch.setattr(power_ingest, 'ingest', lambda *args, **kwargs: calls.append(1) or real_ingest(*args, **kwargs))
+    pd.testing.assert_frame_equal(load_power(str(path), freq='h').resample('D').sum(), first, check_freq=False)
+    assert calls == []
+    write_power_file(path, minutes=1440, seed=1)
+    assert len(load_power(str(path), freq='D')) == 2
+    assert calls == [1]
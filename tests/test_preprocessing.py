@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from preprocessing import index_by_date, preprocess_data
+
+
+def raw_frame():
+    return pd.DataFrame({'Date': ['2020-01-03', '2020-01-01', '2020-01-02', '2020-01-06'],
+                         'Close': [3.0, 1.0, 2.0, 6.0]})
+
+
+def test_date_column_is_parsed_and_sorted():
+    data = index_by_date(raw_frame())
+    assert isinstance(data.index, pd.DatetimeIndex)
+    assert data.index.is_monotonic_increasing
+    assert np.issubdtype(data['Date'].dtype, np.datetime64)
+    assert (data.index == pd.DatetimeIndex(data['Date'])).all()
+
+
+def test_input_frame_is_not_mutated():
+    raw = raw_frame()
+    index_by_date(raw)
+    assert raw['Date'].tolist() == raw_frame()['Date'].tolist()
+
+
+def test_range_is_inclusive_on_both_ends():
+    sliced = preprocess_data(raw_frame(), '2020-01-02', '2020-01-03')
+    assert sliced['Close'].tolist() == [2.0, 3.0]
+    assert preprocess_data(raw_frame(), '2020-01-04', '2020-01-05').empty
+
+
+def test_parsed_dates_let_warm_start_recognise_appended_rows():
+    from types import SimpleNamespace
+
+    from model_pipeline import extends_history
+
+    data = index_by_date(raw_frame()).rename(columns={'Date': 'ds', 'Close': 'y'})[['ds', 'y']]
+    model = SimpleNamespace(history=data.iloc[:3].assign(ds=pd.to_datetime(data['ds'].iloc[:3]).astype('datetime64[ns]')))
+    assert extends_history(model, data.reset_index(drop=True))
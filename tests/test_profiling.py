@@ -0,0 +1,69 @@
+import time
+
+import pandas as pd
+import pytest
+
+from profiling import SPAN_COLUMNS, Profiler, compare_runs, load_run
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += 1
+    return total
+
+
+def test_nested_spans_record_stage_paths_and_times():
+    profiler = Profiler(run_name='run')
+    with profiler.span('fit', rows=10, model='ridge'):
+        with profiler.span('predict') as span:
+            busy(0.02)
+            span['rows'] = 5
+    frame = profiler.to_frame()
+    assert list(frame['stage']) == ['fit', 'fit/predict']
+    assert list(frame['depth']) == [0, 1]
+    assert list(frame['rows']) == [10, 5]
+    assert list(frame.columns[:len(SPAN_COLUMNS)]) == SPAN_COLUMNS and 'model' in frame
+    outer, inner = frame.iloc[0], frame.iloc[1]
+    assert outer['wall_seconds'] >= inner['wall_seconds'] >= 0.02
+    assert inner['cpu_seconds'] > 0
+
+
+def test_failed_span_is_recorded_and_reraised():
+    profiler = Profiler()
+    with pytest.raises(KeyError):
+        with profiler.span('load'):
+            raise KeyError('x')
+    assert profiler.spans[0]['status'] == 'failed'
+    assert profiler._stack == []
+
+
+def test_empty_profiler_has_the_span_columns():
+    assert list(Profiler().to_frame().columns) == SPAN_COLUMNS
+
+
+def test_sampling_finds_the_busy_function():
+    profiler = Profiler(sample=True, interval=0.001)
+    with profiler.span('fit'):
+        busy(0.2)
+    hotspots = profiler.hotspots()
+    assert hotspots['function'].iloc[0].startswith('busy ')
+    assert (hotspots['total_share'] <= 1).all()
+
+
+def test_export_round_trip_and_compare(tmp_path):
+    runs = []
+    for name, seconds in [('base', 0.01), ('slow', 0.05)]:
+        profiler = Profiler(run_name=name)
+        with profiler.span('fit'):
+            busy(seconds)
+        with profiler.span('plot'):
+            busy(0.01)
+        runs.append(profiler.export(str(tmp_path)))
+    (base_json, base_csv), (slow_json, slow_csv) = runs
+    assert list(load_run(base_json)['stage']) == list(load_run(base_csv)['stage']) == ['fit', 'plot']
+    comparison = compare_runs(base_json, slow_csv)
+    assert comparison.index[0] == 'fit'
+    assert comparison.loc['fit', 'ratio'] > 2
+    assert isinstance(comparison, pd.DataFrame)
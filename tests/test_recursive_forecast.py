@@ -0,0 +1,58 @@
+import gc
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from recursive_forecast import (DirectMultiStepForecaster, LagRingBuffer, direct_training_set, last_lags,
+                                recursive_forecast)
+
+
+def test_ring_buffer_orders_lags_most_recent_first():
+    ring = LagRingBuffer([[1.0, 2.0, 3.0, 4.0]], 3)
+    np.testing.assert_array_equal(ring.lags(), [[4.0, 3.0, 2.0]])
+    ring.push([5.0])
+    np.testing.assert_array_equal(ring.lags(), [[5.0, 4.0, 3.0]])
+
+
+def test_recursive_forecast_matches_a_step_by_step_loop():
+    weights = np.array([0.5, 0.3, 0.1])
+    predict = lambda X: X @ weights + 1.0
+    history = np.random.default_rng(0).standard_normal((4, 10))
+    out = recursive_forecast(predict, history, horizon=6, n_lags=3)
+    for series, row in zip(history, out):
+        values = list(series)
+        for step in range(6):
+            values.append(np.dot(values[::-1][:3], weights) + 1.0)
+            assert row[step] == pytest.approx(values[-1])
+
+
+def test_recursive_forecast_feeds_exog_before_lags():
+    seen = []
+    predict = lambda X: seen.append(np.array(X)) or np.zeros(len(X))
+    exog = np.arange(2 * 3 * 1, dtype=float).reshape(2, 3, 1)
+    recursive_forecast(predict, np.ones((2, 5)), horizon=3, n_lags=2, exog=exog)
+    np.testing.assert_array_equal(seen[1][:, 0], exog[:, 1, 0])
+    np.testing.assert_array_equal(seen[1][:, 1:], [[0.0, 1.0], [0.0, 1.0]])
+
+
+def test_direct_forecaster_emits_the_whole_horizon():
+    series = np.sin(np.arange(200) / 5.0)
+    X, Y = direct_training_set(series, 4, 3)
+    np.testing.assert_array_equal(X[0], series[:4][::-1])
+    np.testing.assert_array_equal(Y[0], series[4:7])
+    model = DirectMultiStepForecaster(LinearRegression(), n_lags=4, horizon=3).fit(series)
+    assert model.predict([series, series[:-1]]).shape == (2, 3)
+    np.testing.assert_array_equal(last_lags([series], 4), [series[-4:][::-1]])
+
+
+def test_keras_rollout_cache_does_not_keep_models_alive():
+    tf = pytest.importorskip('tensorflow')
+    from recursive_forecast import _keras_rollouts, keras_recursive_forecast
+
+    model = tf.keras.Sequential([tf.keras.Input(shape=(5, 1)), tf.keras.layers.Flatten(), tf.keras.layers.Dense(1)])
+    assert keras_recursive_forecast(model, np.ones((2, 5)), 4).shape == (2, 4)
+    assert model in _keras_rollouts
+    del model
+    gc.collect()
+    assert len(_keras_rollouts) == 0
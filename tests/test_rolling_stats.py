@@ -0,0 +1,86 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rolling_stats import RollingStats
+
+
+def series_with_gaps(n=300, seed=0):
+    values = 100 + np.random.default_rng(seed).standard_normal(n).cumsum()
+    values[[0, 40, 41, 150, 151, 152, 153, 299]] = np.nan
+    return values
+
+
+def pandas_stats(values, window, min_periods=None):
+    rolling = pd.Series(values).rolling(window, min_periods=min_periods)
+    return {'mean': rolling.mean(), 'std': rolling.std(), 'min': rolling.min(), 'max': rolling.max(),
+            'ema': pd.Series(values).ewm(span=window, adjust=False, ignore_na=True).mean()}
+
+
+@pytest.mark.parametrize('window', [2, 5, 20, 50])
+@pytest.mark.parametrize('min_periods', [None, 1])
+def test_matches_pandas_including_nans(window, min_periods):
+    values = series_with_gaps()
+    stats = RollingStats(values, min_periods=min_periods)
+    for name, expected in pandas_stats(values, window, min_periods).items():
+        np.testing.assert_allclose(getattr(stats, name)(window), expected.to_numpy(), rtol=1e-7, atol=1e-7,
+                                   equal_nan=True, err_msg=name)
+
+
+def test_recovers_after_nan_leaves_the_window():
+    values = np.arange(30, dtype=float)
+    values[10] = np.nan
+    mean = RollingStats(values).mean(5)
+    assert np.isnan(mean[10:15]).all()
+    assert not np.isnan(mean[15:]).any()
+
+
+def test_append_matches_building_from_scratch():
+    values = series_with_gaps()
+    stats = RollingStats(values[:100], max_columns=4)
+    kept = {name: getattr(stats, name)(10) for name in ('mean', 'std', 'ema', 'min')}
+    stats.extend(values[100:])
+    expected = RollingStats(values)
+    for name in kept:
+        np.testing.assert_allclose(getattr(stats, name)(10), getattr(expected, name)(10), rtol=1e-9, atol=1e-9,
+                                   equal_nan=True, err_msg=name)
+    np.testing.assert_allclose(stats.max(7), expected.max(7), equal_nan=True)
+
+
+def test_memory_is_linear_in_rows_and_kept_columns():
+    stats = RollingStats(np.random.default_rng(1).standard_normal(10000), max_columns=2)
+    base = stats.nbytes
+    for window in range(2, 51):
+        stats.bollinger(window)
+    assert stats.nbytes <= base + 2 * 8 * 10000
+
+
+def test_unknown_window_is_rejected():
+    with pytest.raises(ValueError):
+        RollingStats(np.arange(10.0), windows=range(2, 5)).mean(7)
+
+
+def test_shared_instance_is_safe_across_threads():
+    values = np.random.default_rng(0).normal(size=500)
+    stats = RollingStats(values, windows=range(2, 51), max_columns=2)
+    errors = []
+
+    def read(offset):
+        try:
+            for i in range(200):
+                window = 2 + (i * 7 + offset) % 49
+                expected = pd.Series(values).rolling(window).mean().to_numpy()
+                np.testing.assert_allclose(stats.mean(window)[:500], expected, equal_nan=True)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=read, args=(offset,)) for offset in range(6)]
+    threads.append(threading.Thread(target=stats.extend, args=(np.ones(2000),)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert stats.n == 2500
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from spatial_index import SpatioTemporalIndex, event_times, grid_cells
+
+
+def catalogue(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    when = pd.Timestamp('1990-01-01') + pd.to_timedelta(rng.integers(0, 20 * 365 * 86400, n), unit='s')
+    return pd.DataFrame({'Date': when.normalize(), 'Time': when.strftime('%H:%M:%S'),
+                         'Latitude': rng.uniform(-90, 90, n), 'Longitude': rng.uniform(-180, 180, n),
+                         'Magnitude': rng.uniform(5.5, 9.0, n), 'Depth': rng.uniform(0, 700, n)})
+
+
+def brute_force(frame, lat, lon, start, end):
+    times = event_times(frame)
+    keep = np.array(frame['Latitude'].between(*lat))
+    if lon[0] <= lon[1]:
+        keep &= frame['Longitude'].between(*lon).to_numpy()
+    else:
+        keep &= ((frame['Longitude'] >= lon[0]) | (frame['Longitude'] <= lon[1])).to_numpy()
+    if start is not None:
+        keep &= times >= np.datetime64(pd.Timestamp(start), 'ns')
+    if end is not None:
+        keep &= times < np.datetime64(pd.Timestamp(end), 'ns')
+    return np.flatnonzero(keep)
+
+
+def test_event_times_combine_date_and_time():
+    frame = pd.DataFrame({'Date': pd.to_datetime(['2000-01-02']), 'Time': ['13:45:10']})
+    assert event_times(frame)[0] == np.datetime64('2000-01-02T13:45:10')
+
+
+def test_grid_cells_keep_poles_and_antimeridian_in_range():
+    cells = grid_cells([90, -90, 0], [180, -180, 0], 30)
+    assert cells.max() < (180 // 30) * (360 // 30)
+    assert cells[1] == 0
+
+
+@pytest.mark.parametrize('cell_degrees', [0.5, 1.0, 7.0])
+def test_query_matches_a_brute_force_mask(cell_degrees):
+    frame = catalogue()
+    index = SpatioTemporalIndex(frame, cell_degrees)
+    rng = np.random.default_rng(1)
+    for _ in range(100):
+        lat = np.sort(rng.uniform(-90, 90, 2))
+        lon = tuple(rng.uniform(-180, 180, 2))
+        start = None if rng.random() < 0.2 else pd.Timestamp('1990-01-01') + pd.Timedelta(days=int(rng.integers(0, 7000)))
+        end = None if rng.random() < 0.2 else pd.Timestamp('1995-01-01') + pd.Timedelta(days=int(rng.integers(0, 7000)))
+        np.testing.assert_array_equal(index.query(tuple(lat), lon, start, end), brute_force(frame, lat, lon, start, end))
+
+
+def test_aligned_series_from_rollups_equal_the_query_path():
+    frame = catalogue()
+    index = SpatioTemporalIndex(frame).precompute(levels=(5, 30), freqs=('M',))
+    box = ((0, 30), (-120, -60))
+    for value in ['count', 'magnitude_mean', 'magnitude_max', 'depth_mean']:
+        from_rollup = index.series(*box, freq='M', value=value)
+        # A box just inside the grid lines misses the rollups and aggregates queried events
+        from_query = index.series((0, 30 - 1e-9), (-120, -60 - 1e-9), freq='M', value=value)
+        pd.testing.assert_series_equal(from_rollup, from_query, check_exact=False)
+
+
+def test_series_counts_match_a_groupby():
+    frame = catalogue()
+    index = SpatioTemporalIndex(frame)
+    counts = index.series((-45, 45), (0, 90), start='2000-01-01', freq='Y')
+    rows = brute_force(frame, (-45, 45), (0, 90), None, None)
+    expected = pd.Series(event_times(frame)[rows]).dt.year.value_counts()
+    assert counts.sum() == expected[expected.index >= 2000].sum()
+
+
+def test_regional_panel_totals_match_the_catalogue():
+    frame = catalogue()
+    panel = SpatioTemporalIndex(frame).regional_series(degrees=30, freq='M')
+    assert panel.to_numpy().sum() == len(frame)
+    assert panel.shape[1] == 6 * 12
@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor
+from sklearn.linear_model import Ridge
+from sklearn.model_selection import GridSearchCV, KFold
+
+from training_scheduler import HalvingTrainingScheduler, TrainingScheduler, budget_param
+
+
+def regression(n=120, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 4))
+    return X, X @ np.array([1.0, -2.0, 0.5, 0.0]) + rng.normal(0, 0.1, n)
+
+
+SPECS = {'ridge': {'estimator': Ridge(), 'params': {'alpha': [1e-3, 1e4]}, 'data': 'a'}}
+
+
+def test_best_parameters_match_grid_search():
+    X, y = regression()
+    estimators, report = TrainingScheduler(cpu_budget=1, n_iter=2, cv=3).fit(SPECS, {'a': (X, y)})
+    search = GridSearchCV(Ridge(), SPECS['ridge']['params'], cv=KFold(3)).fit(X, y)
+    assert report.loc['ridge', 'best_params'] == search.best_params_
+    assert report.loc['ridge', 'best_score'] == pytest.approx(search.best_score_)
+    assert report.loc['ridge', 'tasks'] == 2 * 3 + 1
+    np.testing.assert_allclose(estimators['ridge'].coef_, search.best_estimator_.coef_)
+
+
+def test_reruns_only_fit_tasks_they_have_not_seen(tmp_path):
+    X, y = regression()
+    datasets = {'a': (X, y)}
+    TrainingScheduler(cpu_budget=1, cache_dir=str(tmp_path), cv=2).fit(SPECS, datasets)
+    _, report = TrainingScheduler(cpu_budget=1, cache_dir=str(tmp_path), cv=2).fit(SPECS, datasets)
+    assert report.loc['ridge', 'cached_tasks'] == report.loc['ridge', 'tasks']
+
+    grown = {'ridge': dict(SPECS['ridge'], params={'alpha': [1e-3, 1e4, 1.0]})}
+    _, report = TrainingScheduler(cpu_budget=1, cache_dir=str(tmp_path), n_iter=3, cv=2).fit(grown, datasets)
+    # The two folds of the new alpha are fitted; the old folds and the unchanged refit come from the cache
+    assert report.loc['ridge', 'tasks'] - report.loc['ridge', 'cached_tasks'] == 2
+
+    _, report = TrainingScheduler(cpu_budget=1, cache_dir=str(tmp_path), cv=2).fit(SPECS, {'a': regression(seed=1)})
+    assert report.loc['ridge', 'cached_tasks'] == 0
+
+
+def test_a_failing_candidate_scores_nan_and_loses():
+    X, y = regression()
+    specs = {'ridge': {'estimator': Ridge(), 'params': {'alpha': [1.0], 'solver': ['auto', 'no-such-solver']},
+                       'data': 'a'}}
+    with pytest.warns(UserWarning, match='failed'):
+        _, report = TrainingScheduler(cpu_budget=1, n_iter=2, cv=2).fit(specs, {'a': (X, y)})
+    assert report.loc['ridge', 'best_params']['solver'] == 'auto'
+
+
+def test_models_share_one_task_list_across_datasets():
+    specs = dict(SPECS, other={'estimator': Ridge(), 'params': {}, 'data': 'b'})
+    estimators, report = TrainingScheduler(cpu_budget=2, cv=2).fit(specs, {'a': regression(), 'b': regression(seed=1)})
+    assert set(estimators) == {'ridge', 'other'}
+    assert report.loc['other', 'tasks'] == 2 + 1
+
+
+class RecordingScheduler(HalvingTrainingScheduler):
+    def _run(self, tasks, datasets, data_hashes):
+        self.batches = getattr(self, 'batches', []) + [tasks]
+        return super()._run(tasks, datasets, data_hashes)
+
+
+def test_budget_param_is_found_on_pipelines_and_estimators():
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+    assert budget_param(GradientBoostingRegressor()) == 'n_estimators'
+    assert budget_param(make_pipeline(StandardScaler(), GradientBoostingRegressor())) == 'gradientboostingregressor__n_estimators'
+    assert budget_param(Ridge()) is None
+
+
+def test_halving_keeps_the_best_third_and_fits_fewer_full_histories():
+    X, y = regression(n=150)
+    alphas = [1e-3, 1e-2, 1e-1, 1e2, 1e3, 1e4, 1e5, 1e6, 1e7]
+    specs = {'ridge': {'estimator': Ridge(), 'params': {'alpha': alphas}, 'data': 'a'}}
+    scheduler = RecordingScheduler(n_candidates=9, factor=3, n_splits=3, cpu_budget=1)
+    _, report = scheduler.fit(specs, {'a': (X, y)})
+    row = report.loc['ridge']
+    assert row['rounds'] == 2
+    assert row['full_resource_fits'] == 3 * 3 < row['exhaustive_fits'] == 9 * 3
+    assert row['best_params']['alpha'] <= 1e-1
+    first, last = scheduler.batches[0], scheduler.batches[1]
+    assert {task['params']['alpha'] for task in last} == {1e-3, 1e-2, 1e-1}
+    # Short round: the most recent third of each expanding-window training fold
+    for task in first:
+        train = task['split'][0]
+        assert task['fraction'] == pytest.approx(1 / 3)
+        assert train[-1] + 1 == task['split'][1][0]
+    assert all(len(task['split'][0]) < len(full['split'][0]) for task, full in zip(first, last * 3))
+
+
+def test_budget_parameter_is_scaled_in_early_rounds():
+    X, y = regression(n=90)
+    specs = {'gbr': {'estimator': GradientBoostingRegressor(n_estimators=30, random_state=0),
+                     'params': {'max_depth': [1, 2, 3]}, 'data': 'a'}}
+    scheduler = RecordingScheduler(n_candidates=3, factor=3, n_splits=2, cpu_budget=1)
+    estimators, report = scheduler.fit(specs, {'a': (X, y)})
+    assert {task['params'].get('n_estimators') for task in scheduler.batches[0]} == {None}
+    assert estimators['gbr'].n_estimators == 30
+    assert report.loc['gbr', 'rounds'] == 1
+
+    scheduler = RecordingScheduler(n_candidates=9, factor=3, n_splits=2, cpu_budget=1)
+    specs['gbr']['params'] = {'max_depth': [1, 2, 3], 'learning_rate': [0.05, 0.1, 0.2]}
+    estimators, _ = scheduler.fit(specs, {'a': (X, y)})
+    assert {task['params']['n_estimators'] for task in scheduler.batches[0]} == {10}
+    assert 'n_estimators' not in scheduler.batches[1][0]['params']
+    assert estimators['gbr'].n_estimators == 30
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from windowing import create_sliding_window, sliding_windows, steps_per_epoch, window_batches
+
+
+def reference_windows(data, window_size, horizon, stride, target):
+    X, y = [], []
+    for start in range(0, len(data) - window_size - horizon + 1, stride):
+        X.append(data[start:start + window_size])
+        y.append(target[start + window_size:start + window_size + horizon])
+    return np.array(X), np.array(y)
+
+
+@pytest.mark.parametrize('window_size,horizon,stride', [(5, 1, 1), (7, 3, 2), (10, 4, 3)])
+def test_windows_match_a_python_loop(window_size, horizon, stride):
+    data = np.arange(120, dtype=float).reshape(40, 3)
+    X, y = sliding_windows(data, window_size, horizon, stride, target=2)
+    expected_X, expected_y = reference_windows(data, window_size, horizon, stride, data[:, 2])
+    np.testing.assert_array_equal(X, expected_X)
+    np.testing.assert_array_equal(y, expected_y)
+
+
+def test_windows_are_read_only_views():
+    data = np.arange(50, dtype=float)
+    X, y = sliding_windows(data, 5)
+    assert np.shares_memory(X, data) and np.shares_memory(y, data)
+    assert not X.flags.writeable
+
+
+def test_separate_target_and_errors():
+    data = np.arange(20, dtype=float)
+    _, y = sliding_windows(data, 4, target=-data)
+    np.testing.assert_array_equal(y[:, 0], -data[4:])
+    with pytest.raises(ValueError):
+        sliding_windows(data, 4, target=data[:-1])
+    with pytest.raises(ValueError):
+        sliding_windows(data, 20)
+
+
+def test_create_sliding_window_matches_the_notebook_helper():
+    data = np.random.default_rng(0).normal(size=30)
+    X, y = create_sliding_window(data, 6)
+    assert X.shape == (24, 6) and y.shape == (24,)
+    np.testing.assert_array_equal(X[3], data[3:9])
+    assert y[3] == data[9]
+
+
+def test_batches_cover_every_window_once_per_epoch():
+    X, y = sliding_windows(np.arange(100, dtype=float), 5)
+    for shuffle in [False, True]:
+        batches = list(window_batches(X, y, batch_size=16, shuffle=shuffle, seed=0))
+        assert len(batches) == steps_per_epoch(len(X), 16)
+        assert all(batch.dtype == np.float32 and batch.flags.c_contiguous for batch, _ in batches)
+        seen = np.concatenate([batch[:, 0, 0] for batch, _ in batches])
+        np.testing.assert_array_equal(np.sort(seen), X[:, 0, 0])
+        targets = np.concatenate([target[:, 0] for _, target in batches])
+        np.testing.assert_array_equal(targets, seen + 5)
+
+
+def test_repeat_cycles_forever():
+    X, y = sliding_windows(np.arange(20, dtype=float), 5)
+    batches = window_batches(X, y, batch_size=8, repeat=True)
+    first = [next(batches)[0] for _ in range(steps_per_epoch(len(X), 8))]
+    np.testing.assert_array_equal(next(batches)[0], first[0])